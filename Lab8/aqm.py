@@ -0,0 +1,276 @@
+import bisect
+import math
+import random
+from collections import deque
+
+# Sojourn-time histogram bucket upper bounds in seconds (1-2-5 series).
+SOJOURN_BUCKETS = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02,
+                   0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, math.inf)
+
+
+def packet_size(packet) -> int:
+    #Size used for byte accounting: the payload length.
+    return len(packet.payload)
+
+
+class TailDrop:
+    #Drops only when the queue is full, which BoundedQueue always enforces.
+
+    def on_enqueue(self, queue, packet, now: float) -> bool:
+        return False
+
+    def on_dequeue(self, queue, sojourn: float, now: float) -> bool:
+        return False
+
+
+class RED:
+    #Random Early Detection (Floyd & Jacobson). Arriving packets are dropped
+    #with a probability that grows with the EWMA of the queue length
+    #between min_threshold and max_threshold (in packets).
+
+    def __init__(self, min_threshold: float, max_threshold: float, max_probability: float = 0.1,
+                 weight: float = 0.002, rng: random.Random = None):
+        self.min_threshold = min_threshold
+        self.max_threshold = max_threshold
+        self.max_probability = max_probability
+        self.weight = weight
+        self.rng = rng or random.Random()
+        self.average = 0.0
+        self.count = -1  # Packets since the last early drop
+
+    def on_enqueue(self, queue, packet, now: float) -> bool:
+        self.average += self.weight * (len(queue) - self.average)
+        if self.average < self.min_threshold:
+            self.count = -1
+            return False
+        if self.average >= self.max_threshold:
+            self.count = 0
+            return True
+
+        self.count += 1
+        probability = (self.max_probability * (self.average - self.min_threshold)
+                       / (self.max_threshold - self.min_threshold))
+        # Spread drops out evenly instead of letting them cluster.
+        if (self.count * probability >= 1
+                or self.rng.random() < probability / (1 - self.count * probability)):
+            self.count = 0
+            return True
+        return False
+
+    def on_dequeue(self, queue, sojourn: float, now: float) -> bool:
+        return False
+
+
+class CoDel:
+    #Controlled Delay AQM (RFC 8289). Once the sojourn time of departing
+    #packets has stayed above `target` for a whole `interval`, CoDel drops
+    #at the head, with the gap between drops shrinking as
+    #interval / sqrt(count) until the delay falls back under target.
+
+    def __init__(self, target: float = 0.005, interval: float = 0.1, mtu: int = 1500):
+        self.target = target
+        self.interval = interval
+        self.mtu = mtu
+        self.first_above_time = 0.0
+        self.drop_next = 0.0
+        self.count = 0
+        self.last_count = 0
+        self.dropping = False
+
+    def on_enqueue(self, queue, packet, now: float) -> bool:
+        return False
+
+    def _ok_to_drop(self, queue, sojourn: float, now: float) -> bool:
+        if sojourn < self.target or queue.bytes <= self.mtu:
+            self.first_above_time = 0.0
+            return False
+        if self.first_above_time == 0.0:
+            self.first_above_time = now + self.interval
+            return False
+        return now >= self.first_above_time
+
+    def _control_law(self, t: float) -> float:
+        return t + self.interval / math.sqrt(self.count)
+
+    def on_dequeue(self, queue, sojourn: float, now: float) -> bool:
+        ok_to_drop = self._ok_to_drop(queue, sojourn, now)
+        if self.dropping:
+            if not ok_to_drop:
+                self.dropping = False
+                return False
+            if now >= self.drop_next:
+                self.count += 1
+                self.drop_next = self._control_law(self.drop_next)
+                return True
+            return False
+
+        if ok_to_drop:
+            self.dropping = True
+            # Resume near the previous drop rate if we were dropping recently.
+            delta = self.count - self.last_count
+            if delta > 1 and now - self.drop_next < 16 * self.interval:
+                self.count = delta
+            else:
+                self.count = 1
+            self.last_count = self.count
+            self.drop_next = self._control_law(now)
+            return True
+        return False
+
+
+class BoundedQueue:
+    #Time-stamped FIFO with an optional packet/byte limit and an AQM policy.
+    #Tracks drops, occupancy over time and a sojourn-time histogram, all in
+    #constant memory.
+
+    def __init__(self, max_packets: int = None, max_bytes: int = None, policy=None,
+                 size=packet_size):
+        self.max_packets = max_packets
+        self.max_bytes = max_bytes
+        self.policy = policy or TailDrop()
+        self._size = size
+        self._items = deque()  # (arrival time, packet)
+        self._head_checked = False
+        self.bytes = 0
+
+        self.enqueued = 0
+        self.dequeued = 0
+        self.tail_drops = 0
+        self.aqm_drops = 0
+        self.max_occupancy = 0
+        self._occupancy_area = 0.0
+        self._first_time = None
+        self._last_time = None
+        self._histogram = [0] * len(SOJOURN_BUCKETS)
+        self._sojourn_total = 0.0
+        self._sojourn_max = 0.0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _advance(self, now: float):
+        #Integrates occupancy over time for the time-average.
+        if self._last_time is None:
+            self._first_time = now
+        else:
+            self._occupancy_area += len(self._items) * (now - self._last_time)
+        self._last_time = now
+
+    def enqueue(self, packet, now: float) -> bool:
+        #Returns False if the packet was dropped.
+        self._advance(now)
+        size = self._size(packet)
+        if ((self.max_packets is not None and len(self._items) >= self.max_packets)
+                or (self.max_bytes is not None and self.bytes + size > self.max_bytes)):
+            self.tail_drops += 1
+            return False
+        if self.policy.on_enqueue(self, packet, now):
+            self.aqm_drops += 1
+            return False
+
+        self._items.append((now, packet))
+        self.bytes += size
+        self.enqueued += 1
+        if len(self._items) > self.max_occupancy:
+            self.max_occupancy = len(self._items)
+        return True
+
+    def peek(self):
+        #The packet at the head, without applying dequeue-time drops, or None.
+        return self._items[0][1] if self._items else None
+
+    def head(self, now: float):
+        #Returns the packet the next dequeue() will return, applying any
+        #dequeue-time drops first, or None if the queue drained.
+        self._advance(now)
+        while self._items and not self._head_checked:
+            arrival, packet = self._items[0]
+            if self.policy.on_dequeue(self, now - arrival, now):
+                self._items.popleft()
+                self.bytes -= self._size(packet)
+                self.aqm_drops += 1
+            else:
+                self._head_checked = True
+        return self._items[0][1] if self._items else None
+
+    def dequeue(self, now: float):
+        #Removes and returns the next packet, or None if the queue is empty.
+        if self.head(now) is None:
+            return None
+        arrival, packet = self._items.popleft()
+        self._head_checked = False
+        self.bytes -= self._size(packet)
+        self.dequeued += 1
+
+        sojourn = now - arrival
+        self._histogram[bisect.bisect_left(SOJOURN_BUCKETS, sojourn)] += 1
+        self._sojourn_total += sojourn
+        if sojourn > self._sojourn_max:
+            self._sojourn_max = sojourn
+        return packet
+
+    def sojourn_percentile(self, fraction: float) -> float:
+        #Upper bound of the histogram bucket holding the given fraction.
+        target = fraction * self.dequeued
+        seen = 0
+        for bound, count in zip(SOJOURN_BUCKETS, self._histogram):
+            seen += count
+            if count and seen >= target:
+                return min(bound, self._sojourn_max)
+        return 0.0
+
+    def stats(self) -> dict:
+        elapsed = (self._last_time - self._first_time) if self._last_time is not None else 0.0
+        return {
+            "enqueued": self.enqueued,
+            "dequeued": self.dequeued,
+            "tail_drops": self.tail_drops,
+            "aqm_drops": self.aqm_drops,
+            "occupancy": len(self._items),
+            "max_occupancy": self.max_occupancy,
+            "mean_occupancy": self._occupancy_area / elapsed if elapsed else float(len(self._items)),
+            "bytes": self.bytes,
+            "sojourn_mean": self._sojourn_total / self.dequeued if self.dequeued else 0.0,
+            "sojourn_p50": self.sojourn_percentile(0.5),
+            "sojourn_p99": self.sojourn_percentile(0.99),
+            "sojourn_max": self._sojourn_max,
+            "sojourn_histogram": dict(zip(SOJOURN_BUCKETS, self._histogram)),
+        }
+
+
+# Overload a VOIP class queue and compare drop policies in virtual time
+if __name__ == "__main__":
+    from scheduler import DRRScheduler, Packet
+
+    link_rate = 125000.0  # Bytes per second (1 Mbit/s)
+    voip_size = 200
+    policies = {
+        "tail-drop": lambda: BoundedQueue(max_packets=200),
+        "RED": lambda: BoundedQueue(max_packets=200, policy=RED(10, 40, rng=random.Random(1))),
+        "CoDel": lambda: BoundedQueue(max_packets=200, policy=CoDel(target=0.005, interval=0.1)),
+    }
+
+    for name, make_queue in policies.items():
+        rng = random.Random(7)
+        scheduler = DRRScheduler(queue_factory=lambda cls: make_queue())
+        now = 0.0
+        next_arrival = 0.0
+        link_free_at = 0.0
+        # 20% overload for 10 s, then 50% load for 5 s to drain.
+        while now < 15.0:
+            load = 1.2 if now < 10.0 else 0.5
+            if len(scheduler) and link_free_at <= next_arrival:
+                now = max(now, link_free_at)
+                if scheduler.dequeue(now) is not None:
+                    link_free_at = now + voip_size / link_rate
+            else:
+                now = next_arrival
+                scheduler.enqueue(Packet("10.0.1.1", "10.0.1.2", "v" * voip_size, 0), now)
+                next_arrival = now + rng.expovariate(load * link_rate / voip_size)
+
+        stats = scheduler.queue_stats()[0]
+        print(f"--- {name} ---")
+        print(f"drops: {stats['tail_drops']} tail + {stats['aqm_drops']} AQM, "
+              f"mean occupancy {stats['mean_occupancy']:.1f} (max {stats['max_occupancy']})")
+        print(f"sojourn mean {stats['sojourn_mean'] * 1000:.1f} ms, "
+              f"p50 <= {stats['sojourn_p50'] * 1000:.1f} ms, p99 <= {stats['sojourn_p99'] * 1000:.1f} ms\n")
@@ -0,0 +1,275 @@
+import argparse
+import json
+import platform
+import time
+
+import numpy as np
+
+from ip_utils import format_prefix, ip_to_int, parse_cidr
+from router import Router
+from scheduler import DRRScheduler, Packet, WFQScheduler
+
+# Share of each prefix length in a full IPv4 BGP table (rounded from public
+# RIB snapshots); /24s dominate and there is a long tail of short prefixes.
+PREFIX_LENGTH_DISTRIBUTION = {
+    8: 0.0002, 9: 0.0002, 10: 0.0004, 11: 0.001, 12: 0.003, 13: 0.006,
+    14: 0.01, 15: 0.015, 16: 0.02, 17: 0.012, 18: 0.02, 19: 0.035,
+    20: 0.05, 21: 0.06, 22: 0.11, 23: 0.09, 24: 0.5674,
+}
+
+
+def generate_routes(count: int, link_count: int = 64, seed: int = 0) -> list:
+    #Returns `count` distinct (cidr, link) routes with a BGP-like
+    #prefix-length distribution.
+    rng = np.random.default_rng(seed)
+    lengths = np.array(list(PREFIX_LENGTH_DISTRIBUTION), dtype=np.uint32)
+    weights = np.array(list(PREFIX_LENGTH_DISTRIBUTION.values()))
+    weights /= weights.sum()
+
+    routes = {}
+    while len(routes) < count:
+        needed = count - len(routes)
+        chosen = rng.choice(lengths, size=needed, p=weights)
+        # Keep to unicast space (1.0.0.0 - 223.255.255.255).
+        networks = rng.integers(1 << 24, 224 << 24, size=needed, dtype=np.uint64)
+        masks = (0xFFFFFFFF << (32 - chosen.astype(np.uint64))) & 0xFFFFFFFF
+        links = rng.integers(0, link_count, size=needed)
+        for network, prefix_len, link in zip((networks & masks).tolist(), chosen.tolist(),
+                                             links.tolist()):
+            routes.setdefault((network, prefix_len), f"Link {link}")
+    return [(format_prefix(network, prefix_len), link)
+            for (network, prefix_len), link in routes.items()]
+
+def generate_destinations(routes: list, count: int, skew: float = None, seed: int = 0) -> np.ndarray:
+    #Returns a uint32 destination stream. Each destination falls inside a
+    #random route. With skew=None the routes are picked uniformly; otherwise
+    #a pool of destinations is ranked and drawn with Zipf exponent `skew`.
+    rng = np.random.default_rng(seed)
+    networks = np.empty(len(routes), dtype=np.uint64)
+    host_bits = np.empty(len(routes), dtype=np.uint64)
+    for index, (cidr, _) in enumerate(routes):
+        network, prefix_len = parse_cidr(cidr)
+        networks[index] = network
+        host_bits[index] = 32 - prefix_len
+
+    def inside_random_routes(size):
+        picked = rng.integers(0, len(routes), size=size)
+        hosts = rng.integers(0, 1 << 32, size=size, dtype=np.uint64)
+        hosts &= (np.uint64(1) << host_bits[picked]) - np.uint64(1)
+        return (networks[picked] | hosts).astype(np.uint32)
+
+    if skew is None:
+        return inside_random_routes(count)
+
+    pool = inside_random_routes(min(count, 100000))
+    ranks = np.arange(1, len(pool) + 1, dtype=np.float64)
+    weights = ranks ** -skew
+    weights /= weights.sum()
+    return pool[rng.choice(len(pool), size=count, p=weights)]
+
+
+def _rate(count: int, seconds: float) -> float:
+    return count / seconds if seconds > 0 else float('inf')
+
+def bench_router(routes: list, streams: dict, engine: str, single_lookups: int) -> list:
+    #Builds one engine over `routes` and measures it on every stream.
+    #Engines: trie, trie+cache, compressed (ORTC FIB in the trie) and
+    #dir24_8 (batch lookups through the flat table).
+    start = time.perf_counter()
+    router = Router(routes, cache_size=65536 if engine == "trie+cache" else None,
+                    compress=engine == "compressed")
+    build_seconds = time.perf_counter() - start
+    if engine == "dir24_8":
+        start = time.perf_counter()
+        router.compile_flat_table()
+        build_seconds += time.perf_counter() - start
+
+    results = []
+    for stream_name, destinations in streams.items():
+        record = {
+            "engine": engine,
+            "routes": len(routes),
+            "stream": stream_name,
+            "build_seconds": build_seconds,
+            "fib_prefixes": len(router.table),
+            "memory_bytes": router.memory_usage(),
+        }
+        if engine == "dir24_8":
+            start = time.perf_counter()
+            router.route_packets(destinations)
+            record["batch_lookups_per_second"] = _rate(len(destinations), time.perf_counter() - start)
+        else:
+            sample = destinations[:single_lookups].tolist()
+            if router.cache is not None:
+                router.cache.clear()
+            start = time.perf_counter()
+            for dest in sample:
+                router.route_packet(dest)
+            record["single_lookups_per_second"] = _rate(len(sample), time.perf_counter() - start)
+            if router.cache is not None:
+                record["cache_hit_rate"] = router.cache.stats()["hit_rate"]
+        results.append(record)
+    return results
+
+def bench_schedulers(packet_count: int, seed: int = 0) -> list:
+    #Measures enqueue and dequeue rates of the streaming schedulers.
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(64, 1500, packet_count).tolist()
+    classes = rng.integers(0, 3, packet_count).tolist()
+    packets = [Packet("10.0.0.1", "10.0.0.2", "x" * size, cls) for size, cls in zip(sizes, classes)]
+
+    results = []
+    for scheduler in (DRRScheduler(), WFQScheduler()):
+        now = 0.0
+        start = time.perf_counter()
+        for packet in packets:
+            scheduler.enqueue(packet, now)
+        enqueue_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        while scheduler.dequeue(now) is not None:
+            pass
+        dequeue_seconds = time.perf_counter() - start
+        results.append({
+            "engine": type(scheduler).__name__,
+            "packets": packet_count,
+            "enqueues_per_second": _rate(packet_count, enqueue_seconds),
+            "dequeues_per_second": _rate(packet_count, dequeue_seconds),
+        })
+    return results
+
+
+def run(sizes: list, engines: list, lookups: int, single_lookups: int, packets: int,
+        skew: float, seed: int) -> dict:
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "seed": seed,
+        "router": [],
+        "scheduler": bench_schedulers(packets, seed),
+    }
+    for size in sizes:
+        routes = generate_routes(size, seed=seed)
+        streams = {
+            "uniform": generate_destinations(routes, lookups, seed=seed),
+            f"zipf-{skew}": generate_destinations(routes, lookups, skew=skew, seed=seed),
+        }
+        for engine in engines:
+            # A full-table ORTC run is slow in pure Python; skip it beyond 100k.
+            if engine == "compressed" and size > 100000:
+                continue
+            report["router"].extend(bench_router(routes, streams, engine, single_lookups))
+    return report
+
+def check_updates(steps: int = 200, batch_size: int = 8, compress: bool = False, seed: int = 0):
+    #Randomized route churn against a Router with a compiled DIR-24-8 table.
+    #Routes are drawn inside one /16 with lengths /16-/28, so batches keep
+    #moving overflow blocks between /24s. After every update the batch
+    #lookup must agree with the trie and with a freshly built Router.
+    #With compress=True one update can change several ORTC FIB prefixes.
+    # A batch that moves the only overflow block to another /24 needs a
+    # fresh block before the old one is freed.
+    router = Router([("10.0.0.0/16", "A"), ("10.0.1.0/25", "B")], compress=compress)
+    router.compile_flat_table()
+    router.update_routes([("10.0.2.0/25", "C")], ["10.0.0.0/16", "10.0.1.0/25"])
+    probes = np.array([ip_to_int(ip) for ip in ("10.0.1.1", "10.0.2.1", "10.0.2.200")], dtype=np.uint32)
+    if [router.links[i] for i in router.route_packets(probes)] != ["Default Gateway", "C", "Default Gateway"]:
+        raise AssertionError("overflow block moved across /24s was not rewritten")
+
+    rng = np.random.default_rng(seed)
+    base = 10 << 24
+
+    def random_route():
+        prefix_len = int(rng.integers(16, 29))
+        network = (base | int(rng.integers(0, 1 << 16))) & (0xFFFFFFFF << (32 - prefix_len)) & 0xFFFFFFFF
+        return format_prefix(network, prefix_len), f"Link {int(rng.integers(0, 8))}"
+
+    installed = dict(random_route() for _ in range(32))
+    router = Router(list(installed.items()), compress=compress)
+    router.compile_flat_table()
+    probes = (base | rng.integers(0, 1 << 16, size=4096)).astype(np.uint32)
+    for step in range(steps):
+        withdrawals = [cidr for cidr in installed if rng.random() < batch_size / len(installed)]
+        updates = [random_route() for _ in range(int(rng.integers(0, batch_size + 1)))]
+        if step % 2:
+            router.update_routes(updates, withdrawals)
+        else:
+            for cidr in withdrawals:
+                router.withdraw_route(cidr)
+            for cidr, link in updates:
+                router.add_route(cidr, link)
+        for cidr in withdrawals:
+            del installed[cidr]
+        installed.update(updates)
+
+        reference = Router(list(installed.items()))
+        expected = [reference.route_packet(dest) for dest in probes.tolist()]
+        if ([router.links[i] for i in router.route_packets(probes)] != expected
+                or [router.route_packet(dest) for dest in probes.tolist()] != expected):
+            raise AssertionError(f"DIR-24-8 table differs from the trie at seed {seed}, step {step}"
+                                 f"{' (compressed)' if compress else ''}")
+
+
+def _metric_keys(record: dict) -> list:
+    return [key for key in record if key.endswith("_per_second")]
+
+def _record_key(record: dict) -> tuple:
+    return record["engine"], record.get("routes"), record.get("stream"), record.get("packets")
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list:
+    #Returns human-readable regressions where a rate fell by more than
+    #`tolerance` (a fraction) relative to the baseline report.
+    regressions = []
+    for section in ("router", "scheduler"):
+        previous = {_record_key(record): record for record in baseline.get(section, [])}
+        for record in current.get(section, []):
+            old = previous.get(_record_key(record))
+            if old is None:
+                continue
+            for key in _metric_keys(record):
+                if key in old and record[key] < old[key] * (1 - tolerance):
+                    regressions.append(f"{_record_key(record)} {key}: "
+                                       f"{old[key]:,.0f} -> {record[key]:,.0f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Lab8 forwarding plane.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--engines", nargs="+", default=["trie", "trie+cache", "compressed", "dir24_8"])
+    parser.add_argument("--lookups", type=int, default=1000000, help="destinations per stream")
+    parser.add_argument("--single-lookups", type=int, default=200000,
+                        help="destinations used for per-packet lookups")
+    parser.add_argument("--packets", type=int, default=200000, help="packets per scheduler run")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of the skewed stream")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report to check for regressions against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--check-steps", type=int, default=200,
+                        help="randomized route updates checked before benchmarking (0 to skip)")
+    args = parser.parse_args()
+
+    if args.check_steps:
+        for compress in (False, True):
+            check_updates(args.check_steps, compress=compress, seed=args.seed)
+
+    report = run(args.sizes, args.engines, args.lookups, args.single_lookups, args.packets,
+                 args.skew, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
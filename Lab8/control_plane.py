@@ -0,0 +1,240 @@
+import time
+
+import numpy as np
+
+from ip_utils import format_prefix, int_to_ip, ip_to_int
+from router import Router
+
+
+def spf_routes(routing_table: dict, prefixes: dict, max_cost: float = None) -> dict:
+    #Maps a Lab_7 {destination router: (next hop, cost)} table (OSPF, IS-IS
+    #or RIP) to {cidr: next hop} using the prefixes each router owns.
+    #Entries at or above max_cost (16 for RIP) are unreachable.
+    routes = {}
+    for dest, (next_hop, cost) in routing_table.items():
+        if max_cost is not None and cost >= max_cost:
+            continue
+        for cidr in prefixes.get(dest, ()):
+            routes[cidr] = next_hop
+    return routes
+
+def bgp_routes(routing_table: dict) -> dict:
+    #Maps a Lab_7 BGP {prefix: AS path} Loc-RIB to {prefix: next-hop AS}.
+    #The path starts with the local AS, so the next hop is its second AS;
+    #locally originated prefixes map to the local AS itself.
+    return {prefix: path[1] if len(path) > 1 else path[0]
+            for prefix, path in routing_table.items()}
+
+
+class FibCompiler:
+    #Keeps a Lab8 Router's FIB in step with a control-plane result.
+    #Remembers what it installed and pushes only differences, as one
+    #Router.update_routes batch, so an SPF or BGP reconvergence that moves a
+    #handful of destinations costs a handful of trie paths and DIR-24-8
+    #regions instead of a rebuild.
+
+    def __init__(self, router: Router, link_names: dict = None):
+        self.router = router
+        #Next hop -> link name on this router; unknown next hops get
+        #"Link to <next hop>".
+        self.link_names = link_names or {}
+        self.installed = {}  # cidr -> link
+        self.pushed = 0
+
+    def link_for(self, next_hop) -> str:
+        link = self.link_names.get(next_hop)
+        return f"Link to {next_hop}" if link is None else link
+
+    def apply(self, routes: dict) -> dict:
+        #Makes the FIB match routes ({cidr: next hop}); anything installed
+        #earlier and missing from routes is withdrawn.
+        withdrawals = [cidr for cidr in self.installed if cidr not in routes]
+        return self._push(routes, withdrawals)
+
+    def apply_deltas(self, deltas: dict, prefixes: dict) -> dict:
+        #Applies routing-table deltas as returned by Lab_7 incremental SPF,
+        #{destination router: (next hop, cost) or None when unreachable},
+        #touching only the prefixes of those destinations.
+        routes, withdrawals = {}, []
+        for dest, entry in deltas.items():
+            for cidr in prefixes.get(dest, ()):
+                if entry is None:
+                    withdrawals.append(cidr)
+                else:
+                    routes[cidr] = entry[0]
+        return self._push(routes, withdrawals)
+
+    def _push(self, routes: dict, withdrawals: list) -> dict:
+        updates = []
+        for cidr, next_hop in routes.items():
+            link = self.link_for(next_hop)
+            if self.installed.get(cidr) != link:
+                updates.append((cidr, link))
+        withdrawals = [cidr for cidr in withdrawals if cidr in self.installed]
+        if updates or withdrawals:
+            self.router.update_routes(updates, withdrawals)
+        for cidr, link in updates:
+            self.installed[cidr] = link
+        for cidr in withdrawals:
+            del self.installed[cidr]
+        self.pushed += len(updates) + len(withdrawals)
+        return {"updated": len(updates), "withdrawn": len(withdrawals)}
+
+
+def assign_prefixes(nodes, per_node: int = 4, base: int = 10 << 24) -> dict:
+    #Gives every router per_node consecutive /24s starting at base.
+    prefixes = {}
+    for index, node in enumerate(nodes):
+        first = base + (index * per_node << 8)
+        prefixes[node] = [format_prefix(first + (k << 8), 24) for k in range(per_node)]
+    return prefixes
+
+def check_batches(steps: int = 50, router_count: int = 50, seed: int = 0):
+    #Pushes random routing tables through a FibCompiler and checks the
+    #Router's DIR-24-8 table against its trie and a rebuilt Router. Routers
+    #own prefixes from /22 to /28 in one /18, so every batch mixes
+    #withdrawals and adds across /24 overflow blocks.
+    import random
+
+    rng = random.Random(seed)
+    base = 10 << 24
+
+    def random_prefix():
+        prefix_len = rng.randint(22, 28)
+        mask = (0xFFFFFFFF << (32 - prefix_len)) & 0xFFFFFFFF
+        return format_prefix((base | rng.getrandbits(14)) & mask, prefix_len)
+
+    prefixes = {node: [random_prefix() for _ in range(rng.randint(1, 3))]
+                for node in range(router_count)}
+    #A long-lived FIB, and one recompiled before every batch so that its
+    #DIR-24-8 table has no spare overflow blocks
+    compiler = FibCompiler(Router([]))
+    compiler.router.compile_flat_table()
+    probes = np.array([base | rng.getrandbits(14) for _ in range(2048)], dtype=np.uint32)
+    for step in range(steps):
+        fresh = FibCompiler(Router(list(compiler.installed.items())))
+        fresh.router.compile_flat_table()
+        fresh.installed = dict(compiler.installed)
+        #Each step some destinations become unreachable and the rest may move
+        table = {node: (rng.randrange(8), 1) for node in prefixes if rng.random() < 0.7}
+        routes = spf_routes(table, prefixes)
+        rebuilt = Router([(cidr, compiler.link_for(next_hop)) for cidr, next_hop in routes.items()])
+        expected = [rebuilt.route_packet(dest) for dest in probes.tolist()]
+        for fib in (compiler, fresh):
+            fib.apply(routes)
+            router = fib.router
+            if ([router.links[i] for i in router.route_packets(probes)] != expected
+                    or [router.route_packet(dest) for dest in probes.tolist()] != expected):
+                raise AssertionError(f"FIB batch differs from a rebuild at seed {seed}, step {step}")
+
+def benchmark(router_count: int = 2000, per_node: int = 4, failures: int = 20, seed: int = 0) -> dict:
+    #End-to-end time from a link failure in the Lab_7 LSDB to the new
+    #next hop being live in one Router's trie and DIR-24-8 table: incremental
+    #SPF plus an incremental FIB push, against a full SPF plus a Router
+    #rebuild. Needs Lab_7 on sys.path.
+    import random
+
+    from spf import LinkStateGraph, change_link, shortest_path_tree
+    from topologies import isp_graph
+
+    check_batches(seed=seed)
+
+    rng = random.Random(seed)
+    graph = isp_graph(router_count, seed=seed)
+    prefixes = assign_prefixes(graph, per_node)
+    lsdb = LinkStateGraph.from_dict(graph)
+    #A well-connected core router, whose next hops actually vary
+    source = max(graph, key=lambda node: len(graph[node]))
+    tree = shortest_path_tree(lsdb, lsdb.ids[source])
+
+    router = Router([])
+    router.compile_flat_table()
+    compiler = FibCompiler(router)
+    start = time.perf_counter()
+    compiler.apply(spf_routes(tree.routing_table(), prefixes))
+    initial_seconds = time.perf_counter() - start
+
+    #One address inside every prefix, to check the result against a rebuild
+    probe_ips = [cidr.split('/')[0] for cidrs in prefixes.values() for cidr in cidrs]
+    probes = np.array([ip_to_int(address) + 1 for address in probe_ips], dtype=np.uint32)
+    probe_ips = [int_to_ip(int(address)) for address in probes]
+
+    incremental, full, changed, pushed = [], [], [], []
+    for _ in range(failures):
+        #Fail one of the source's links, then restore it once the FIB has
+        #been checked
+        a, b = source, rng.choice(sorted(graph[source]))
+        cost = graph[a][b]
+        start = time.perf_counter()
+        deltas = {}
+        for u, v in ((a, b), (b, a)):
+            deltas.update(change_link(lsdb, [tree], u, v, None).get(source, {}))
+        result = compiler.apply_deltas(deltas, prefixes)
+        incremental.append(time.perf_counter() - start)
+        changed.append(len(deltas))
+        pushed.append(result["updated"] + result["withdrawn"])
+
+        start = time.perf_counter()
+        fresh = shortest_path_tree(lsdb, lsdb.ids[source])
+        rebuilt = Router([(cidr, compiler.link_for(next_hop)) for cidr, next_hop
+                          in spf_routes(fresh.routing_table(), prefixes).items()])
+        rebuilt.compile_flat_table()
+        full.append(time.perf_counter() - start)
+
+        #Equal-cost ties may resolve to a different next hop than a fresh
+        #SPF, so compare costs with it and next hops with the tree followed
+        routes = spf_routes(tree.routing_table(), prefixes)
+        expected = [compiler.link_for(routes[cidr]) if cidr in routes else "Default Gateway"
+                    for cidrs in prefixes.values() for cidr in cidrs]
+        if tree.dist != fresh.dist or [router.links[i] for i in router.route_packets(probes)] != expected or any(
+                router.route_packet(address) != link for address, link in zip(probe_ips, expected)):
+            raise AssertionError("incremental FIB differs from a rebuild")
+
+        for u, v in ((a, b), (b, a)):
+            compiler.apply_deltas(change_link(lsdb, [tree], u, v, cost).get(source, {}), prefixes)
+
+    return {
+        "routers": router_count,
+        "fib_routes": len(router.table),
+        "initial_compile_seconds": initial_seconds,
+        "failures": failures,
+        "mean_spf_deltas": sum(changed) / failures,
+        "mean_routes_pushed": sum(pushed) / failures,
+        "incremental_ms": 1000 * sum(incremental) / failures,
+        "full_rebuild_ms": 1000 * sum(full) / failures,
+    }
+
+
+# Main test case
+if __name__ == "__main__":
+    import os
+    import sys
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Lab_7"))
+    from spf import LinkStateGraph, change_link, shortest_path_tree
+
+    # The Lab_7 OSPF network; router A's FIB is compiled from its SPF table
+    network_graph = {
+        'A': {'B': 1, 'C': 5},
+        'B': {'A': 1, 'C': 2, 'D': 1},
+        'C': {'A': 5, 'B': 2, 'D': 4},
+        'D': {'B': 1, 'C': 4}
+    }
+    prefixes = assign_prefixes(network_graph, per_node=1)
+    lsdb = LinkStateGraph.from_dict(network_graph)
+    tree = shortest_path_tree(lsdb, lsdb.ids['A'])
+    router = Router([])
+    compiler = FibCompiler(router, link_names={'A': "Local", 'B': "Link 0", 'C': "Link 1"})
+    print(f"Initial push: {compiler.apply(spf_routes(tree.routing_table(), prefixes))}")
+    for dest, cidrs in prefixes.items():
+        print(f"  {cidrs[0]} ({dest}) -> {router.route_packet(cidrs[0].split('/')[0])}")
+
+    # A-B fails: only the destinations whose next hop moved are pushed
+    deltas = change_link(lsdb, [tree], 'A', 'B', None).get('A', {})
+    print(f"A-B down, SPF deltas {deltas}: {compiler.apply_deltas(deltas, prefixes)}")
+    for dest, cidrs in prefixes.items():
+        print(f"  {cidrs[0]} ({dest}) -> {router.route_packet(cidrs[0].split('/')[0])}")
+
+    print("\n--- Link change to forwarding update (ISP-like, 2000 routers) ---")
+    for key, value in benchmark().items():
+        print(f"{key}: {value:,.3f}" if isinstance(value, float) else f"{key}: {value}")
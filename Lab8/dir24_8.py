@@ -0,0 +1,112 @@
+import numpy as np
+
+# Entries are 16 bits wide. The top bit marks a tbl24 entry that points into
+# tbl_long instead of holding a next-hop index, as in Gupta et al.'s DIR-24-8.
+OVERFLOW_FLAG = 0x8000
+MAX_INDEX = OVERFLOW_FLAG - 1
+NO_ROUTE = 0
+
+
+def lookup(tbl24: np.ndarray, tbl_long: np.ndarray, addresses: np.ndarray) -> np.ndarray:
+    #Vectorized longest prefix match over plain tbl24/tbl_long arrays, so a
+    #copy of a table (e.g. in shared memory) is read the same way.
+    #addresses is a uint32 array; returns uint16 next-hop indices, 0 where
+    #nothing matched.
+    entries = tbl24[addresses >> 8]
+    overflow = (entries & OVERFLOW_FLAG) != 0
+    if overflow.any():
+        blocks = (entries[overflow] & MAX_INDEX).astype(np.uint32)
+        entries[overflow] = tbl_long[blocks * 256 + (addresses[overflow] & 0xFF)]
+    return entries
+
+
+class Dir24_8Table:
+    #Flat two-level forwarding table.
+    #tbl24 has one entry for every /24; prefixes longer than /24 get a
+    #256-entry block in tbl_long. Any lookup costs at most two array reads.
+
+    def __init__(self, routes):
+        #routes: iterable of (network as 32-bit int, prefix length, next-hop index).
+        #Next-hop index 0 is reserved for "no route".
+        self.tbl24 = np.zeros(1 << 24, dtype=np.uint16)
+        self.tbl_long = np.zeros(0, dtype=np.uint16)
+        self.block_count = 0
+        self._free_blocks = []
+        self.version = 0
+        self.update_region(0, 0, NO_ROUTE, routes)
+
+    def update_region(self, network: int, prefix_len: int, default_index: int, routes):
+        #Rewrites every entry covered by network/prefix_len.
+        #default_index is the next hop of the longest route covering the
+        #region (including network/prefix_len itself); routes are all routes
+        #strictly inside it. Regions longer than /24 are widened to their /24.
+        #
+        #New overflow blocks are filled before tbl24 points at them, so a
+        #concurrent lookup always reads either the old or the new next hop.
+        if prefix_len > 24:
+            raise ValueError("regions must be /24 or shorter")
+        first_slot = network >> 8
+        slot_count = 1 << (24 - prefix_len)
+
+        routes = sorted(routes, key=lambda route: route[1])
+        for _, _, index in routes:
+            if not 0 < index <= MAX_INDEX:
+                raise ValueError(f"next-hop index {index} does not fit in a DIR-24-8 entry")
+
+        region = np.full(slot_count, default_index, dtype=np.uint16)
+        long_routes = {}
+        # Shorter prefixes are written first so longer ones overwrite them.
+        for route_network, route_len, index in routes:
+            if route_len <= 24:
+                start = (route_network >> 8) - first_slot
+                region[start:start + (1 << (24 - route_len))] = index
+            else:
+                long_routes.setdefault(route_network >> 8, []).append((route_network, route_len, index))
+
+        old = self.tbl24[first_slot:first_slot + slot_count]
+        old_blocks = {first_slot + int(offset): int(old[offset] & MAX_INDEX)
+                      for offset in np.flatnonzero(old & OVERFLOW_FLAG)}
+        # Slots that already own a block reuse it; only the others need new ones.
+        self._reserve(sum(1 for slot in long_routes if slot not in old_blocks))
+
+        for slot, slot_routes in long_routes.items():
+            block = old_blocks.pop(slot, None)
+            if block is None:
+                block = self._free_blocks.pop()
+            # Addresses in the block not covered by a long prefix keep the /24 result.
+            contents = np.full(256, region[slot - first_slot], dtype=np.uint16)
+            for route_network, route_len, index in slot_routes:
+                start = route_network & 0xFF
+                contents[start:start + (1 << (32 - route_len))] = index
+            self.tbl_long[block * 256:(block + 1) * 256] = contents
+            region[slot - first_slot] = OVERFLOW_FLAG | block
+
+        self.tbl24[first_slot:first_slot + slot_count] = region
+        # Blocks of slots that no longer overflow are only freed once tbl24
+        # stops pointing at them.
+        self._free_blocks.extend(old_blocks.values())
+
+    def _reserve(self, extra_blocks: int):
+        #Makes sure at least extra_blocks free overflow blocks exist.
+        missing = extra_blocks - len(self._free_blocks)
+        if missing <= 0:
+            return
+        new_count = max(self.block_count + missing, self.block_count * 2)
+        new_count = min(new_count, MAX_INDEX + 1)
+        if new_count - self.block_count < missing:
+            raise ValueError("overflow blocks exceed the DIR-24-8 limit")
+
+        grown = np.zeros(new_count * 256, dtype=np.uint16)
+        grown[:self.tbl_long.size] = self.tbl_long
+        self.tbl_long = grown
+        # Hand out low-numbered blocks first.
+        self._free_blocks.extend(range(new_count - 1, self.block_count - 1, -1))
+        self.block_count = new_count
+
+    def lookup(self, addresses) -> np.ndarray:
+        #Vectorized longest prefix match over a uint32 array of addresses.
+        #Returns a uint16 array of next-hop indices, 0 where nothing matched.
+        return lookup(self.tbl24, self.tbl_long, np.asarray(addresses, dtype=np.uint32))
+
+    def memory_usage(self) -> int:
+        return self.tbl24.nbytes + self.tbl_long.nbytes
@@ -0,0 +1,170 @@
+from ip_utils import IPV4_BITS, prefix_mask
+from patricia import PatriciaTrie
+
+# Next-hop set of a subtree that contains addresses with no route. Such a
+# subtree can never be covered by a single installed prefix.
+_HOLE = frozenset((None,))
+
+
+def _build(routes: list, network: int, length: int, inherited, width: int) -> tuple:
+    #ORTC passes 1 and 2 over the region network/length.
+    #Leaf-pushes `inherited` (the next hop covering the region) down to the
+    #leaves and returns (candidate next-hop set, left subtree, right subtree),
+    #or a 1-tuple for a leaf. Sets are intersected where the children agree
+    #and unioned where they do not.
+    inner = []
+    for route in routes:
+        if route[1] == length:
+            inherited = route[2]
+        else:
+            inner.append(route)
+    if not inner:
+        return (frozenset((inherited,)),)
+
+    shift = width - length - 1
+    left = _build([route for route in inner if not route[0] >> shift & 1],
+                  network, length + 1, inherited, width)
+    right = _build([route for route in inner if route[0] >> shift & 1],
+                   network | (1 << shift), length + 1, inherited, width)
+    a, b = left[0], right[0]
+    if None in a or None in b:
+        candidates = _HOLE
+    else:
+        candidates = (a & b) or (a | b)
+    return candidates, left, right
+
+def _emit(node: tuple, network: int, length: int, parent_choice, out: dict, width: int):
+    #ORTC pass 3: a node only needs a prefix if the next hop it inherits from
+    #its nearest installed ancestor is not one of its candidates.
+    candidates = node[0]
+    if parent_choice in candidates:
+        choice = parent_choice
+    else:
+        choice = min(candidates, key=str)
+        out[(network, length)] = choice
+    if len(node) > 1:
+        shift = width - length - 1
+        _emit(node[1], network, length + 1, choice, out, width)
+        _emit(node[2], network | (1 << shift), length + 1, choice, out, width)
+
+
+class FibCompressor:
+    #Keeps the original routes (the RIB) and a smaller set of prefixes with
+    #identical longest-prefix-match behaviour (the FIB), built with ORTC
+    #(Draves et al., "Constructing Optimal IP Routing Tables").
+    #
+    #Routes at least block_len bits long are compressed per block so that an
+    #update only re-runs ORTC on the block it touches. Shorter routes are
+    #installed unchanged and act as the inherited next hop of the blocks
+    #below them.
+
+    def __init__(self, routes=(), width: int = IPV4_BITS, block_len: int = None):
+        #routes: iterable of (network, prefix length, link).
+        self.width = width
+        if block_len is None:
+            block_len = 8 if width == IPV4_BITS else 32
+        self.block_len = block_len
+        self.routes = {}
+        self.fib = {}
+        self._blocks = {}
+        self._block_output = {}
+
+        for network, prefix_len, link in routes:
+            network &= prefix_mask(prefix_len, width)
+            self.routes[(network, prefix_len)] = link
+            if prefix_len < block_len:
+                self.fib[(network, prefix_len)] = link
+            else:
+                self._blocks.setdefault(self._block_of(network), {})[(network, prefix_len)] = link
+        for block in list(self._blocks):
+            self._recompress(block)
+
+    def _block_of(self, network: int) -> int:
+        return network >> (self.width - self.block_len)
+
+    def _covering_short_route(self, network: int):
+        #Next hop of the longest route shorter than block_len covering network.
+        for prefix_len in range(self.block_len - 1, -1, -1):
+            link = self.routes.get((network & prefix_mask(prefix_len, self.width), prefix_len))
+            if link is not None:
+                return link
+        return None
+
+    def _recompress(self, block: int) -> list:
+        #Re-runs ORTC for one block and returns the FIB changes it caused as
+        #(network, prefix length, link or None for a removal).
+        old = self._block_output.pop(block, {})
+        new = {}
+        block_routes = self._blocks.get(block)
+        if block_routes:
+            block_network = block << (self.width - self.block_len)
+            inherited = self._covering_short_route(block_network)
+            routes = [(network, prefix_len, link)
+                      for (network, prefix_len), link in block_routes.items()]
+            root = _build(routes, block_network, self.block_len, inherited, self.width)
+            _emit(root, block_network, self.block_len, inherited, new, self.width)
+            self._block_output[block] = new
+
+        changes = []
+        for key, link in new.items():
+            if old.get(key) != link:
+                self.fib[key] = link
+                changes.append((key[0], key[1], link))
+        for key in old:
+            if key not in new:
+                del self.fib[key]
+                changes.append((key[0], key[1], None))
+        return changes
+
+    def _update_short_route(self, network: int, prefix_len: int, link) -> list:
+        #A route shorter than block_len is installed as-is but changes the
+        #inherited next hop of every populated block beneath it.
+        if link is None:
+            del self.fib[(network, prefix_len)]
+        else:
+            self.fib[(network, prefix_len)] = link
+        changes = [(network, prefix_len, link)]
+        shift = self.block_len - prefix_len
+        top = network >> (self.width - prefix_len)
+        for block in list(self._blocks):
+            if block >> shift == top:
+                changes.extend(self._recompress(block))
+        return changes
+
+    def update(self, network: int, prefix_len: int, link) -> list:
+        #Adds or replaces a route and returns the resulting FIB changes.
+        network &= prefix_mask(prefix_len, self.width)
+        self.routes[(network, prefix_len)] = link
+        if prefix_len < self.block_len:
+            return self._update_short_route(network, prefix_len, link)
+        block = self._block_of(network)
+        self._blocks.setdefault(block, {})[(network, prefix_len)] = link
+        return self._recompress(block)
+
+    def withdraw(self, network: int, prefix_len: int) -> list:
+        #Removes a route and returns the resulting FIB changes.
+        #Raises KeyError if the route is not in the RIB.
+        network &= prefix_mask(prefix_len, self.width)
+        del self.routes[(network, prefix_len)]
+        if prefix_len < self.block_len:
+            return self._update_short_route(network, prefix_len, None)
+        block = self._block_of(network)
+        del self._blocks[block][(network, prefix_len)]
+        if not self._blocks[block]:
+            del self._blocks[block]
+        return self._recompress(block)
+
+    def report(self) -> dict:
+        #Prefix counts and trie memory before and after compression.
+        return {
+            "rib_prefixes": len(self.routes),
+            "fib_prefixes": len(self.fib),
+            "rib_memory": self._trie_memory(self.routes),
+            "fib_memory": self._trie_memory(self.fib),
+        }
+
+    def _trie_memory(self, routes: dict) -> int:
+        trie = PatriciaTrie(self.width)
+        for (network, prefix_len), link in routes.items():
+            trie.insert(network, prefix_len, link)
+        return trie.memory_usage()
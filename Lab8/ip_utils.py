@@ -1,3 +1,9 @@
+import socket
+
+IPV4_BITS = 32
+IPV6_BITS = 128
+
+
 def ip_to_binary(ip_address: str) -> str:
     #Converts a dotted-decimal IP address string to a 32-bit binary string.
     octets = ip_address.split('.')
@@ -10,3 +16,65 @@ def get_network_prefix(ip_cidr: str) -> str:
     prefix_length = int(prefix_length)
     binary_ip = ip_to_binary(ip_address)
     return binary_ip[:prefix_length]
+
+
+# Integer and packed-bytes helpers. Addresses are parsed once into ints and
+# all prefix work is done with masks, so no per-packet strings are built.
+
+def ip_to_bytes(ip_address: str) -> bytes:
+    #Packs an IPv4 or IPv6 address string into 4 or 16 network-order bytes.
+    if ':' in ip_address:
+        return socket.inet_pton(socket.AF_INET6, ip_address)
+    return socket.inet_pton(socket.AF_INET, ip_address)
+
+def bytes_to_int(packed: bytes) -> tuple:
+    #Converts packed address bytes to (IP version, integer value).
+    if len(packed) == 4:
+        return 4, int.from_bytes(packed, 'big')
+    if len(packed) == 16:
+        return 6, int.from_bytes(packed, 'big')
+    raise ValueError(f"packed address must be 4 or 16 bytes, got {len(packed)}")
+
+def parse_ip(ip_address: str) -> tuple:
+    #Converts an IPv4 or IPv6 address string to (IP version, integer value).
+    if ':' in ip_address:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, ip_address), 'big')
+    return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip_address), 'big')
+
+def ip_to_int(ip_address: str) -> int:
+    #Converts a dotted-decimal IP address string to a 32-bit integer.
+    return int.from_bytes(socket.inet_pton(socket.AF_INET, ip_address), 'big')
+
+def int_to_ip(value: int, version: int = 4) -> str:
+    #Converts an integer back to dotted-decimal (IPv4) or colon-hex (IPv6) notation.
+    if version == 6:
+        return socket.inet_ntop(socket.AF_INET6, value.to_bytes(16, 'big'))
+    return socket.inet_ntop(socket.AF_INET, value.to_bytes(4, 'big'))
+
+def address_bits(version: int) -> int:
+    return IPV6_BITS if version == 6 else IPV4_BITS
+
+def prefix_mask(prefix_length: int, bits: int = IPV4_BITS) -> int:
+    #Integer netmask with the top prefix_length of `bits` bits set.
+    if not 0 <= prefix_length <= bits:
+        raise ValueError(f"prefix length {prefix_length} out of range for {bits}-bit addresses")
+    return ((1 << bits) - 1) ^ ((1 << (bits - prefix_length)) - 1)
+
+def parse_prefix(ip_cidr: str) -> tuple:
+    #Converts an IPv4 or IPv6 CIDR string to (IP version, network, prefix length).
+    #Host bits beyond the prefix length are cleared.
+    ip_address, prefix_length = ip_cidr.split('/')
+    prefix_length = int(prefix_length)
+    version, value = parse_ip(ip_address)
+    return version, value & prefix_mask(prefix_length, address_bits(version)), prefix_length
+
+def parse_cidr(ip_cidr: str) -> tuple:
+    #Converts an IPv4 CIDR string to (network as 32-bit integer, prefix length).
+    #Host bits beyond the prefix length are cleared.
+    ip_address, prefix_length = ip_cidr.split('/')
+    prefix_length = int(prefix_length)
+    return ip_to_int(ip_address) & prefix_mask(prefix_length), prefix_length
+
+def format_prefix(network: int, prefix_length: int, version: int = 4) -> str:
+    #Inverse of parse_prefix: builds the CIDR string for an integer network.
+    return f'{int_to_ip(network, version)}/{prefix_length}'
@@ -0,0 +1,92 @@
+import numpy as np
+
+from ip_utils import int_to_ip, ip_to_int
+
+
+class PacketBatch:
+    #Struct-of-arrays packet trace: one NumPy array per header field and all
+    #payloads concatenated into a single shared buffer. A packet costs 26
+    #bytes plus its payload instead of several hundred for a Packet object,
+    #and schedulers and Router can work on whole columns at once.
+    #
+    #Reordering (take) copies the small per-packet columns but keeps sharing
+    #the payload buffer, so payloads are addressed by (start, length).
+
+    __slots__ = ('src', 'dst', 'priority', 'protocol', 'src_port', 'dst_port',
+                 'payload_start', 'payload_length', 'payload_buffer')
+
+    def __init__(self, src, dst, priority, payload_start, payload_length, payload_buffer,
+                 protocol=None, src_port=None, dst_port=None):
+        count = len(src)
+        self.src = np.asarray(src, dtype=np.uint32)
+        self.dst = np.asarray(dst, dtype=np.uint32)
+        self.priority = np.asarray(priority, dtype=np.uint8)
+        self.payload_start = np.asarray(payload_start, dtype=np.uint64)
+        self.payload_length = np.asarray(payload_length, dtype=np.uint32)
+        self.payload_buffer = payload_buffer
+        self.protocol = (np.zeros(count, dtype=np.uint8) if protocol is None
+                         else np.asarray(protocol, dtype=np.uint8))
+        self.src_port = (np.zeros(count, dtype=np.uint16) if src_port is None
+                         else np.asarray(src_port, dtype=np.uint16))
+        self.dst_port = (np.zeros(count, dtype=np.uint16) if dst_port is None
+                         else np.asarray(dst_port, dtype=np.uint16))
+
+    @classmethod
+    def from_packets(cls, packets: list) -> 'PacketBatch':
+        #Packs Packet/SlottedPacket objects (IPv4 only) into a batch.
+        payloads = [packet.payload.encode() for packet in packets]
+        lengths = np.fromiter((len(payload) for payload in payloads), dtype=np.uint32,
+                              count=len(payloads))
+        starts = np.zeros(len(payloads), dtype=np.uint64)
+        if len(payloads):
+            np.cumsum(lengths[:-1], out=starts[1:])
+        return cls(
+            src=[ip_to_int(packet.source_ip) for packet in packets],
+            dst=[ip_to_int(packet.dest_ip) for packet in packets],
+            priority=[packet.priority for packet in packets],
+            payload_start=starts,
+            payload_length=lengths,
+            payload_buffer=b"".join(payloads),
+            protocol=[packet.protocol for packet in packets],
+            src_port=[packet.src_port for packet in packets],
+            dst_port=[packet.dst_port for packet in packets],
+        )
+
+    def __len__(self) -> int:
+        return len(self.src)
+
+    def payload(self, index: int) -> str:
+        start = int(self.payload_start[index])
+        return self.payload_buffer[start:start + int(self.payload_length[index])].decode()
+
+    def packet(self, index: int):
+        #Materializes one packet as a SlottedPacket for per-packet code.
+        from scheduler import SlottedPacket
+
+        return SlottedPacket(
+            int_to_ip(int(self.src[index])), int_to_ip(int(self.dst[index])),
+            self.payload(index), int(self.priority[index]), int(self.protocol[index]),
+            int(self.src_port[index]), int(self.dst_port[index]),
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.packet(index)
+
+    def take(self, indices) -> 'PacketBatch':
+        #Returns the packets at `indices`, in that order, sharing payloads.
+        return PacketBatch(
+            self.src[indices], self.dst[indices], self.priority[indices],
+            self.payload_start[indices], self.payload_length[indices], self.payload_buffer,
+            self.protocol[indices], self.src_port[indices], self.dst_port[indices],
+        )
+
+    def copy(self) -> 'PacketBatch':
+        return self.take(np.arange(len(self)))
+
+    def memory_usage(self) -> int:
+        #Bytes held by the columns plus the shared payload buffer.
+        columns = (self.src, self.dst, self.priority, self.protocol, self.src_port,
+                   self.dst_port, self.payload_start, self.payload_length)
+        return sum(column.nbytes for column in columns) + len(self.payload_buffer)
+
@@ -0,0 +1,204 @@
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from dir24_8 import lookup
+from packet_batch import PacketBatch
+
+# Per-process map of shared segment name -> (SharedMemory, uint16 view).
+# Workers attach lazily and keep the mapping until the parent republishes.
+_attached = {}
+
+
+def _attach(name: str, entries: int) -> np.ndarray:
+    segment = _attached.get(name)
+    if segment is None:
+        shm = shared_memory.SharedMemory(name=name)
+        segment = _attached[name] = (shm, np.ndarray((entries,), dtype=np.uint16, buffer=shm.buf))
+    return segment[1]
+
+def _detach_except(names: tuple):
+    #Drops mappings of segments the parent has replaced.
+    for name in [name for name in _attached if name not in names]:
+        shm, _ = _attached.pop(name)
+        shm.close()
+
+def _lookup_shard(task: tuple) -> np.ndarray:
+    #Worker side: longest prefix match for one shard, in arrival order.
+    (tbl24_name, tbl_long_name, tbl_long_entries), addresses = task
+    _detach_except((tbl24_name, tbl_long_name))
+    tbl24 = _attach(tbl24_name, 1 << 24)
+    tbl_long = _attach(tbl_long_name, tbl_long_entries)
+    return lookup(tbl24, tbl_long, addresses)
+
+
+def flow_hash(batch) -> np.ndarray:
+    #Hashes each packet's 5-tuple (or just the destination for a bare
+    #address array) so every packet of a flow lands in the same shard.
+    if isinstance(batch, PacketBatch):
+        fields = (batch.src, batch.dst, batch.protocol, batch.src_port, batch.dst_port)
+    else:
+        fields = (np.asarray(batch, dtype=np.uint32),)
+    h = np.full(len(fields[0]), 0xCBF29CE484222325, dtype=np.uint64)
+    for field in fields:
+        # FNV-style mix; uint64 arithmetic wraps around.
+        h ^= field.astype(np.uint64)
+        h *= np.uint64(0x100000001B3)
+    return h ^ (h >> np.uint64(29))
+
+
+class ParallelForwarder:
+    #Shards a packet stream across a process pool. The router's DIR-24-8
+    #table is copied once into shared memory and every worker maps it by
+    #name, so the FIB is never pickled. Packets are sharded by flow hash and
+    #each shard is handed to one worker in arrival order, so packets of the
+    #same flow are never reordered.
+    #
+    #forward() publishes the router's current flat table before dispatching
+    #if a route changed since the last call. No worker is mid-task between
+    #calls, so the shared copy can be rewritten in place.
+
+    def __init__(self, router, workers: int = None, start_method: str = None):
+        self.router = router
+        self.workers = workers or os.cpu_count() or 1
+        self._tbl24 = None
+        self._tbl_long = None
+        self.version = None
+        # Create the segments before the pool so the workers share the
+        # parent's resource tracker instead of each starting one that would
+        # try to clean the segments up again at exit.
+        self.publish()
+        self._pool = multiprocessing.get_context(start_method).Pool(self.workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _allocate(self, entries: int) -> tuple:
+        shm = shared_memory.SharedMemory(create=True, size=max(entries, 1) * 2)
+        return shm, np.ndarray((entries,), dtype=np.uint16, buffer=shm.buf)
+
+    def _release(self, segment: tuple):
+        if segment is not None:
+            shm, _ = segment
+            shm.close()
+            shm.unlink()
+
+    def publish(self):
+        #Copies the router's flat table into shared memory if it changed.
+        if self.router.flat_table is None:
+            self.router.compile_flat_table()
+        flat_table = self.router.flat_table
+        if flat_table.version == self.version and self._tbl24 is not None:
+            return
+
+        if self._tbl24 is None:
+            self._tbl24 = self._allocate(1 << 24)
+        # tbl_long only grows; a bigger one gets a fresh segment (and name),
+        # which workers pick up from the next task descriptor.
+        if self._tbl_long is None or self._tbl_long[1].size != flat_table.tbl_long.size:
+            self._release(self._tbl_long)
+            self._tbl_long = self._allocate(flat_table.tbl_long.size)
+        # Overflow blocks first, so tbl24 never points at an unwritten block.
+        self._tbl_long[1][:] = flat_table.tbl_long
+        self._tbl24[1][:] = flat_table.tbl24
+        self.version = flat_table.version
+
+    def _descriptor(self) -> tuple:
+        return self._tbl24[0].name, self._tbl_long[0].name, self._tbl_long[1].size
+
+    def forward(self, batch) -> np.ndarray:
+        #Next-hop indices into router.links for a PacketBatch or a uint32
+        #address array, aligned with the input.
+        self.publish()
+        addresses = batch.dst if isinstance(batch, PacketBatch) else np.asarray(batch, dtype=np.uint32)
+        shards = flow_hash(batch) % np.uint64(self.workers)
+        # flatnonzero keeps each shard in arrival order.
+        positions = [np.flatnonzero(shards == shard) for shard in range(self.workers)]
+        descriptor = self._descriptor()
+        results = self._pool.map(_lookup_shard,
+                                 [(descriptor, addresses[shard]) for shard in positions])
+
+        next_hops = np.empty(len(addresses), dtype=np.uint16)
+        for shard, result in zip(positions, results):
+            next_hops[shard] = result
+        return next_hops
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        self._release(self._tbl24)
+        self._release(self._tbl_long)
+        self._tbl24 = self._tbl_long = None
+
+
+def benchmark(route_count: int = 100000, packet_count: int = 2000000,
+              worker_counts: list = None, seed: int = 0) -> list:
+    #Forwarding rate of ParallelForwarder for each worker count, with the
+    #speedup over one worker. The first row is the single-process
+    #route_packet loop the pool replaces.
+    from benchmark import generate_destinations, generate_routes
+    from router import Router
+
+    routes = generate_routes(route_count, seed=seed)
+    destinations = generate_destinations(routes, packet_count, seed=seed)
+    router = Router(routes)
+    router.compile_flat_table()
+
+    sample = destinations[:200000].tolist()
+    start = time.perf_counter()
+    for dest in sample:
+        router.route_packet(dest)
+    results = [{"mode": "route_packet", "workers": 1,
+                "packets_per_second": len(sample) / (time.perf_counter() - start)}]
+
+    expected = router.route_packets(destinations)
+    baseline = None
+    for workers in worker_counts or sorted({1, 2, 4, os.cpu_count() or 1}):
+        with ParallelForwarder(router, workers) as forwarder:
+            forwarder.forward(destinations[:1000])  # Warm up the workers
+            start = time.perf_counter()
+            next_hops = forwarder.forward(destinations)
+            rate = packet_count / (time.perf_counter() - start)
+        if not np.array_equal(next_hops, expected):
+            raise AssertionError("parallel forwarding disagrees with the flat table")
+        baseline = baseline or rate
+        results.append({"mode": "parallel", "workers": workers,
+                        "packets_per_second": rate, "speedup": rate / baseline})
+    return results
+
+
+# Main test case
+if __name__ == "__main__":
+    from router import Router
+
+    router = Router([
+        ("223.1.1.0/24", "Link 0"),
+        ("223.1.2.0/24", "Link 1"),
+        ("223.1.3.0/24", "Link 2"),
+        ("223.1.0.0/16", "Link 4 (ISP)"),
+    ])
+    packets = PacketBatch(
+        src=[0x0A000001, 0x0A000002, 0x0A000001, 0x0A000003],
+        dst=[0xDF010164, 0xDF010205, 0xDF01FA01, 0xC6336401],  # 223.1.1.100, 223.1.2.5, 223.1.250.1, 198.51.100.1
+        priority=[0, 0, 0, 0], payload_start=[0, 0, 0, 0], payload_length=[0, 0, 0, 0],
+        payload_buffer=b"",
+    )
+
+    with ParallelForwarder(router, workers=2) as forwarder:
+        print(f'Parallel lookup -> {[router.links[i] for i in forwarder.forward(packets)]}')
+        router.add_route("223.1.250.0/24", "Link 3")
+        print(f'After update v{router.version} -> '
+              f'{[router.links[i] for i in forwarder.forward(packets)]}')
+
+    print(f"\n--- Forwarding scaling ({os.cpu_count()} CPUs) ---")
+    for row in benchmark():
+        speedup = f", speedup {row['speedup']:.2f}x" if "speedup" in row else ""
+        print(f"{row['mode']} x{row['workers']}: {row['packets_per_second']:,.0f} packets/s{speedup}")
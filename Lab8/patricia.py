@@ -0,0 +1,247 @@
+import sys
+
+from ip_utils import IPV4_BITS
+
+
+class _Node:
+    #A trie node covers the first `length` bits of `key`.
+    #`link` is None for pure branching nodes that carry no route.
+    __slots__ = ('key', 'length', 'link', 'left', 'right')
+
+    def __init__(self, key: int, length: int, link=None):
+        self.key = key
+        self.length = length
+        self.link = link
+        self.left = None
+        self.right = None
+
+
+def _bit(value: int, position: int, width: int) -> int:
+    #Returns bit `position` of a width-bit value, counting from the most significant bit.
+    return (value >> (width - 1 - position)) & 1
+
+def _common_length(a: int, b: int, limit: int, width: int) -> int:
+    #Number of leading bits shared by a and b, capped at limit.
+    diff = a ^ b
+    if diff == 0:
+        return limit
+    return min(limit, width - diff.bit_length())
+
+def _mask(length: int, width: int) -> int:
+    return ((1 << width) - 1) ^ ((1 << (width - length)) - 1)
+
+def _attach(parent: _Node, bit: int, child):
+    if bit:
+        parent.right = child
+    else:
+        parent.left = child
+
+def _copy(node: _Node) -> _Node:
+    copy = _Node(node.key, node.length, node.link)
+    copy.left = node.left
+    copy.right = node.right
+    return copy
+
+def _walk(node: _Node):
+    #Pre-order walk yielding (prefix, length, link) for route-carrying nodes.
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.link is not None:
+            yield node.key, node.length, node.link
+        if node.right is not None:
+            stack.append(node.right)
+        if node.left is not None:
+            stack.append(node.left)
+
+
+class PatriciaTrie:
+    #Path-compressed binary trie keyed on integers of `width` bits
+    #(32 for IPv4, 128 for IPv6).
+    #Only nodes that hold a route or split two subtrees are stored, so a
+    #lookup visits at most one node per distinct prefix length on its path.
+    #
+    #insert() mutates the trie and is meant for bulk loading. with_route()
+    #and without_route() are persistent: they copy only the nodes on the
+    #path to the changed prefix and return a new trie, leaving this one
+    #untouched for readers that still hold it.
+
+    def __init__(self, width: int = IPV4_BITS):
+        self.width = width
+        self.root = _Node(0, 0)
+        self.node_count = 1
+        self.route_count = 0
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self.route_count
+
+    def insert(self, prefix: int, length: int, link):
+        #Adds or replaces the route for prefix/length.
+        prefix &= _mask(length, self.width)
+        node = self.root
+        while True:
+            if node.length == length:
+                if node.link is None:
+                    self.route_count += 1
+                node.link = link
+                return
+
+            bit = _bit(prefix, node.length, self.width)
+            child = node.right if bit else node.left
+            if child is not None and _common_length(prefix, child.key, length, self.width) >= child.length:
+                node = child
+                continue
+
+            _attach(node, bit, self._splice(child, prefix, length, link))
+            return
+
+    def _splice(self, child, prefix: int, length: int, link) -> _Node:
+        #Returns the subtree that replaces `child` once prefix/length is added
+        #above or beside it. The caller has checked that child is not an
+        #ancestor of the new prefix.
+        self.route_count += 1
+        self.node_count += 1
+        leaf = _Node(prefix, length, link)
+        if child is None:
+            return leaf
+
+        common = _common_length(prefix, child.key, min(length, child.length), self.width)
+        if common == length:
+            # The new prefix sits between the parent and child.
+            _attach(leaf, _bit(child.key, length, self.width), child)
+            return leaf
+
+        # Prefix and child diverge: insert a branching node at the split.
+        branch = _Node(prefix & _mask(common, self.width), common)
+        _attach(branch, _bit(prefix, common, self.width), leaf)
+        _attach(branch, _bit(child.key, common, self.width), child)
+        self.node_count += 1
+        return branch
+
+    def _successor(self) -> 'PatriciaTrie':
+        trie = PatriciaTrie.__new__(PatriciaTrie)
+        trie.width = self.width
+        trie.root = self.root
+        trie.node_count = self.node_count
+        trie.route_count = self.route_count
+        trie.version = self.version + 1
+        return trie
+
+    def with_route(self, prefix: int, length: int, link) -> 'PatriciaTrie':
+        #Returns a new version of the trie with prefix/length added or replaced.
+        prefix &= _mask(length, self.width)
+        trie = self._successor()
+        trie.root = trie._insert_copy(self.root, prefix, length, link)
+        return trie
+
+    def _insert_copy(self, node: _Node, prefix: int, length: int, link) -> _Node:
+        copy = _copy(node)
+        if node.length == length:
+            if node.link is None:
+                self.route_count += 1
+            copy.link = link
+            return copy
+
+        bit = _bit(prefix, node.length, self.width)
+        child = node.right if bit else node.left
+        if child is not None and _common_length(prefix, child.key, length, self.width) >= child.length:
+            _attach(copy, bit, self._insert_copy(child, prefix, length, link))
+        else:
+            _attach(copy, bit, self._splice(child, prefix, length, link))
+        return copy
+
+    def without_route(self, prefix: int, length: int) -> 'PatriciaTrie':
+        #Returns a new version of the trie with prefix/length withdrawn.
+        #Raises KeyError if the route is not present.
+        prefix &= _mask(length, self.width)
+        trie = self._successor()
+        trie.root = trie._remove_copy(self.root, prefix, length)
+        return trie
+
+    def _remove_copy(self, node: _Node, prefix: int, length: int):
+        if node.length == length:
+            if node.link is None:
+                raise KeyError(f"no route for prefix length {length}")
+            self.route_count -= 1
+            if node.length > 0 and (node.left is None or node.right is None):
+                # A route node with at most one child is no longer needed.
+                self.node_count -= 1
+                return node.left if node.right is None else node.right
+            copy = _copy(node)
+            copy.link = None
+            return copy
+
+        bit = _bit(prefix, node.length, self.width)
+        child = node.right if bit else node.left
+        if child is None or _common_length(prefix, child.key, length, self.width) < child.length:
+            raise KeyError(f"no route for prefix length {length}")
+
+        new_child = self._remove_copy(child, prefix, length)
+        other = node.left if bit else node.right
+        if new_child is None and node.link is None and node.length > 0:
+            # A branching node left with one child collapses into that child.
+            self.node_count -= 1
+            return other
+
+        copy = _copy(node)
+        _attach(copy, bit, new_child)
+        return copy
+
+    def covering(self, prefix: int, length: int):
+        #Longest route of at most `length` bits that covers prefix/length.
+        node = self.root
+        best = node.link
+        while node.length < length:
+            child = node.right if _bit(prefix, node.length, self.width) else node.left
+            if (child is None or child.length > length
+                    or (prefix ^ child.key) >> (self.width - child.length)):
+                break
+            node = child
+            if node.link is not None:
+                best = node.link
+        return best
+
+    def subtree_items(self, prefix: int, length: int):
+        #Yields (prefix, length, link) for routes strictly inside prefix/length.
+        prefix &= _mask(length, self.width)
+        node = self.root
+        while node.length < length:
+            child = node.right if _bit(prefix, node.length, self.width) else node.left
+            if child is None or _common_length(prefix, child.key, length, self.width) < min(length, child.length):
+                return
+            node = child
+        for item in _walk(node):
+            if item[1] > length:
+                yield item
+
+    def lookup(self, address: int):
+        #Longest prefix match. Returns the link, or None if nothing matches.
+        width = self.width
+        node = self.root
+        best = node.link
+        while node.length < width:
+            child = node.right if (address >> (width - 1 - node.length)) & 1 else node.left
+            if child is None or (address ^ child.key) >> (width - child.length):
+                break
+            node = child
+            if node.link is not None:
+                best = node.link
+        return best
+
+    def items(self):
+        #Yields (prefix, length, link) for every stored route in address order.
+        return _walk(self.root)
+
+    def memory_usage(self) -> int:
+        #Approximate bytes held by trie nodes and their integer keys.
+        total = 0
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            total += sys.getsizeof(node) + sys.getsizeof(node.key)
+            if node.left is not None:
+                stack.append(node.left)
+            if node.right is not None:
+                stack.append(node.right)
+        return total
@@ -0,0 +1,124 @@
+import threading
+
+
+class ClockRouteCache:
+    #Bounded destination -> link cache with CLOCK (second chance) eviction.
+    #A hit is a dict read plus setting one reference bit, so it needs no
+    #lock. Inserts and invalidations happen only after a full lookup or a
+    #route change and are serialized by a small lock.
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("cache capacity must be positive")
+        self.capacity = capacity
+        self._entries = {}  # key -> (link, slot)
+        self._keys = [None] * capacity
+        self._referenced = bytearray(capacity)
+        self._hand = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key):
+        #Returns the cached link, or None on a miss.
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._referenced[entry[1]] = 1
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, link):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (link, entry[1])
+                return
+
+            # Advance the hand, clearing reference bits, to the first slot
+            # that has not been used since the last sweep.
+            hand = self._hand
+            while self._referenced[hand]:
+                self._referenced[hand] = 0
+                hand = (hand + 1) % self.capacity
+            victim = self._keys[hand]
+            if victim is not None:
+                del self._entries[victim]
+                self.evictions += 1
+
+            self._keys[hand] = key
+            self._entries[key] = (link, hand)
+            self._referenced[hand] = 1
+            self._hand = (hand + 1) % self.capacity
+
+    def discard(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._keys[entry[1]] = None
+            self._referenced[entry[1]] = 0
+
+    def invalidate(self, low: int, high: int):
+        #Drops every cached key in [low, high]. Called after a route for that
+        #address range changes; cost is linear in the cache size.
+        with self._lock:
+            stale = [key for key in self._entries if low <= key <= high]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Replay a Zipf-skewed destination trace with and without the cache
+if __name__ == "__main__":
+    import random
+    import time
+
+    from ip_utils import format_prefix
+    from router import Router
+
+    rng = random.Random(1)
+    route_list = []
+    for i in range(50000):
+        prefix_len = rng.choice((16, 20, 22, 24, 24, 24, 28))
+        network = rng.getrandbits(32) >> (32 - prefix_len) << (32 - prefix_len)
+        route_list.append((format_prefix(network, prefix_len), f"Link {i % 16}"))
+
+    destinations = [rng.getrandbits(32) for _ in range(20000)]
+    weights = [1 / rank ** 1.1 for rank in range(1, len(destinations) + 1)]
+    trace = rng.choices(destinations, weights, k=300000)
+
+    for cache_size in (None, 1024, 4096):
+        router = Router(route_list, cache_size=cache_size)
+        start = time.perf_counter()
+        for dest in trace:
+            router.route_packet(dest)
+        elapsed = time.perf_counter() - start
+        print(f"cache_size={cache_size}: {len(trace) / elapsed:,.0f} lookups/s")
+        if router.cache is not None:
+            print(f"    {router.cache.stats()}")
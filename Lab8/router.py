@@ -1,34 +1,249 @@
-from ip_utils import ip_to_binary
+import threading
+
+import numpy as np
+
+from dir24_8 import Dir24_8Table
+from fib_compression import FibCompressor
+from ip_utils import IPV4_BITS, IPV6_BITS, address_bits, bytes_to_int, ip_to_int, parse_ip, parse_prefix
+from packet_batch import PacketBatch
+from patricia import PatriciaTrie
+from route_cache import ClockRouteCache
+
+# Cache keys are plain ints; IPv6 destinations get this bit set so they never
+# collide with IPv4 ones.
+_V6_CACHE_KEY = 1 << IPV6_BITS
 
 class Router:
 
-    def __init__(self, routes: list):
-        self.table = []
-        self._build_forwarding_table(routes)
+    def __init__(self, routes: list, cache_size: int = None, compress: bool = False):
+        # self.table (IPv4) and self.table_v6 always refer to complete trie
+        # versions. Updates build a new version and swap the reference, so
+        # lookups never take a lock.
+        self.table = PatriciaTrie()
+        self.table_v6 = PatriciaTrie(IPV6_BITS)
+        # Index 0 of links is what route_packets returns for unmatched addresses.
+        self.links = ["Default Gateway"]
+        self._link_index = {}
+        self.flat_table = None
+        # Serializes writers only.
+        self._update_lock = threading.Lock()
+        # Optional destination cache in front of the longest prefix match.
+        self.cache = ClockRouteCache(cache_size) if cache_size else None
+        # With compress=True the tries hold an ORTC-aggregated FIB and these
+        # keep the original routes, keyed by IP version.
+        self.compressors = None
+        self._build_forwarding_table(routes, compress)
 
-    def _build_forwarding_table(self, routes: list):
-        #Processes the routes list and stores binary prefixes.
+    def _build_forwarding_table(self, routes: list, compress: bool = False):
+        #Processes the routes list into the integer-keyed Patricia tries.
+        parsed = {4: [], 6: []}
         for cidr_str, link in routes:
-            ip_address, prefix_len_str = cidr_str.split('/')
-            prefix_len = int(prefix_len_str)
-            
-            binary_ip = ip_to_binary(ip_address)
-            network_prefix = binary_ip[:prefix_len]
-            
-            self.table.append((network_prefix, link))
-        
-        # Sort the table by prefix length, longest to shortest
-        self.table.sort(key=lambda item: len(item[0]), reverse=True)
-
-    def route_packet(self, dest_ip: str) -> str:
+            ip_version, network, prefix_len = parse_prefix(cidr_str)
+            parsed[ip_version].append((network, prefix_len, link))
+
+        if compress:
+            self.compressors = {
+                4: FibCompressor(parsed[4], IPV4_BITS),
+                6: FibCompressor(parsed[6], IPV6_BITS),
+            }
+            for ip_version, compressor in self.compressors.items():
+                parsed[ip_version] = [(network, prefix_len, link)
+                                      for (network, prefix_len), link in compressor.fib.items()]
+
+        for network, prefix_len, link in parsed[4]:
+            self.table.insert(network, prefix_len, link)
+        for network, prefix_len, link in parsed[6]:
+            self.table_v6.insert(network, prefix_len, link)
+
+    def route_packet(self, dest_ip, ip_version: int = 4) -> str:
         #Performs a longest prefix match on the destination IP.
-        binary_dest_ip = ip_to_binary(dest_ip)
-        
-        for prefix, link in self.table:
-            if binary_dest_ip.startswith(prefix):
-                return link
-        
-        return "Default Gateway"
+        #dest_ip may be an IPv4/IPv6 string, packed 4- or 16-byte address,
+        #or an already parsed integer of family ip_version.
+        if isinstance(dest_ip, str):
+            ip_version, dest_ip = parse_ip(dest_ip)
+        elif isinstance(dest_ip, bytes):
+            ip_version, dest_ip = bytes_to_int(dest_ip)
+        table = self.table_v6 if ip_version == 6 else self.table
+        cache = self.cache
+        if cache is None:
+            link = table.lookup(dest_ip)
+            return "Default Gateway" if link is None else link
+
+        key = dest_ip | _V6_CACHE_KEY if ip_version == 6 else dest_ip
+        link = cache.get(key)
+        if link is not None:
+            return link
+        link = table.lookup(dest_ip)
+        if link is None:
+            link = "Default Gateway"
+        cache.put(key, link)
+        # If a route changed while we looked up the old version, the writer's
+        # invalidation may have run before our put, so drop the entry.
+        if (self.table_v6 if ip_version == 6 else self.table) is not table:
+            cache.discard(key)
+        return link
+
+    @property
+    def version(self) -> int:
+        #Number of trie versions published since the tables were built.
+        return self.table.version + self.table_v6.version
+
+    def add_route(self, cidr_str: str, link):
+        #Adds or replaces one route. Only the trie path to the prefix is copied.
+        ip_version, network, prefix_len = parse_prefix(cidr_str)
+        with self._update_lock:
+            if self.compressors is not None:
+                changes = self.compressors[ip_version].update(network, prefix_len, link)
+            else:
+                changes = [(network, prefix_len, link)]
+            self._apply_changes(ip_version, changes)
+
+    def withdraw_route(self, cidr_str: str) -> bool:
+        #Removes one route. Returns False if the route was not installed.
+        ip_version, network, prefix_len = parse_prefix(cidr_str)
+        with self._update_lock:
+            try:
+                if self.compressors is not None:
+                    changes = self.compressors[ip_version].withdraw(network, prefix_len)
+                else:
+                    changes = [(network, prefix_len, None)]
+                self._apply_changes(ip_version, changes)
+            except KeyError:
+                return False
+            return True
+
+    def update_routes(self, routes: list = (), withdrawals: list = ()) -> int:
+        #Adds or replaces (cidr, link) routes and removes withdrawn cidrs as
+        #one published version per IP family, so lookups see the whole batch
+        #or none of it. Withdrawals of routes that are not installed are
+        #ignored. Returns the number of FIB prefixes changed.
+        parsed_routes = [(parse_prefix(cidr_str), link) for cidr_str, link in routes]
+        parsed_withdrawals = [parse_prefix(cidr_str) for cidr_str in withdrawals]
+        changes = {4: [], 6: []}
+        with self._update_lock:
+            for ip_version, network, prefix_len in parsed_withdrawals:
+                if self.compressors is None:
+                    changes[ip_version].append((network, prefix_len, None))
+                    continue
+                try:
+                    changes[ip_version].extend(self.compressors[ip_version].withdraw(network, prefix_len))
+                except KeyError:
+                    pass
+            for (ip_version, network, prefix_len), link in parsed_routes:
+                if self.compressors is None:
+                    changes[ip_version].append((network, prefix_len, link))
+                else:
+                    changes[ip_version].extend(self.compressors[ip_version].update(network, prefix_len, link))
+            for ip_version, version_changes in changes.items():
+                if version_changes:
+                    self._apply_changes(ip_version, version_changes, ignore_missing=True)
+        return sum(len(version_changes) for version_changes in changes.values())
+
+    def _apply_changes(self, ip_version: int, changes: list, ignore_missing: bool = False):
+        #Applies (network, prefix length, link or None to remove) changes to a
+        #private trie version and publishes it with a single swap, so readers
+        #never see half of a multi-prefix update.
+        table = self.table_v6 if ip_version == 6 else self.table
+        for network, prefix_len, link in changes:
+            if link is None:
+                try:
+                    table = table.without_route(network, prefix_len)
+                except KeyError:
+                    if not ignore_missing:
+                        raise
+            else:
+                table = table.with_route(network, prefix_len, link)
+
+        if ip_version == 6:
+            self.table_v6 = table
+        else:
+            # The flat table is brought up to date before the trie is
+            # published, so a failed refresh leaves both on the old version.
+            refreshed = []
+            try:
+                for network, prefix_len, _ in changes:
+                    self._refresh_flat_table(table, network, prefix_len)
+                    refreshed.append((network, prefix_len))
+            except Exception:
+                for network, prefix_len in refreshed:
+                    self._refresh_flat_table(self.table, network, prefix_len)
+                raise
+            self.table = table
+        for network, prefix_len, _ in changes:
+            self._invalidate_cache(ip_version, network, prefix_len)
+
+    def compression_report(self) -> dict:
+        #Before/after prefix counts and memory per IP version, or None if the
+        #router was built without compress=True.
+        if self.compressors is None:
+            return None
+        return {f"ipv{ip_version}": compressor.report()
+                for ip_version, compressor in self.compressors.items()}
+
+    def _invalidate_cache(self, ip_version: int, network: int, prefix_len: int):
+        #Drops cached destinations inside a prefix whose route just changed.
+        if self.cache is None:
+            return
+        low = network | _V6_CACHE_KEY if ip_version == 6 else network
+        high = low | ((1 << (address_bits(ip_version) - prefix_len)) - 1)
+        self.cache.invalidate(low, high)
+
+    def _refresh_flat_table(self, table: PatriciaTrie, network: int, prefix_len: int):
+        #Rewrites only the DIR-24-8 entries covered by the changed prefix to
+        #match trie version `table`.
+        #Each entry is swapped individually, so a batch running concurrently
+        #sees the old or the new next hop per packet, never a torn entry.
+        if self.flat_table is None:
+            return
+        if prefix_len > 24:
+            network, prefix_len = network & 0xFFFFFF00, 24
+        default = table.covering(network, prefix_len)
+        self.flat_table.update_region(
+            network, prefix_len,
+            0 if default is None else self._index_of(default),
+            [(sub_network, sub_len, self._index_of(link))
+             for sub_network, sub_len, link in table.subtree_items(network, prefix_len)],
+        )
+        self.flat_table.version = table.version
+
+    def route_packets(self, dest_ips):
+        #Batch longest prefix match over a NumPy uint32 array of IPv4
+        #destinations, or over the dst column of a PacketBatch.
+        #Returns next-hop indices into self.links (0 = Default Gateway).
+        if isinstance(dest_ips, PacketBatch):
+            dest_ips = dest_ips.dst
+        if self.flat_table is None:
+            self.compile_flat_table()
+        return self.flat_table.lookup(dest_ips)
+
+    def compile_flat_table(self):
+        #Builds the DIR-24-8 table from the trie. This allocates 32 MB for
+        #tbl24, so it is only done once batch lookups are requested.
+        with self._update_lock:
+            if self.flat_table is not None:
+                return
+            table = self.table
+            flat_table = Dir24_8Table(
+                (network, prefix_len, self._index_of(link))
+                for network, prefix_len, link in table.items()
+            )
+            flat_table.version = table.version
+            self.flat_table = flat_table
+
+    def _index_of(self, link) -> int:
+        index = self._link_index.get(link)
+        if index is None:
+            index = len(self.links)
+            self._link_index[link] = index
+            self.links.append(link)
+        return index
+
+    def memory_usage(self) -> int:
+        #Approximate bytes used by the forwarding tables.
+        total = self.table.memory_usage() + self.table_v6.memory_usage()
+        if self.flat_table is not None:
+            total += self.flat_table.memory_usage()
+        return total
 
 # Main test case as described in the assignment
 if __name__ == "__main__":
@@ -36,7 +251,9 @@ if __name__ == "__main__":
         ("223.1.1.0/24", "Link 0"),
         ("223.1.2.0/24", "Link 1"),
         ("223.1.3.0/24", "Link 2"),
-        ("223.1.0.0/16", "Link 4 (ISP)")
+        ("223.1.0.0/16", "Link 4 (ISP)"),
+        ("2001:db8:1::/48", "Link 5"),
+        ("2001:db8::/32", "Link 6 (ISP v6)")
     ]
     
     router = Router(route_list)
@@ -46,3 +263,23 @@ if __name__ == "__main__":
     print(f'223.1.2.5 -> {router.route_packet("223.1.2.5")}')
     print(f'223.1.250.1 -> {router.route_packet("223.1.250.1")}')
     print(f'198.51.100.1 -> {router.route_packet("198.51.100.1")}')
+    print(f'2001:db8:1::7 -> {router.route_packet("2001:db8:1::7")}')
+    print(f'2001:db8:ff::1 -> {router.route_packet("2001:db8:ff::1")}')
+
+    # Batch lookup of the same destinations
+    batch = np.array([ip_to_int(ip) for ip in
+                      ("223.1.1.100", "223.1.2.5", "223.1.250.1", "198.51.100.1")], dtype=np.uint32)
+    print(f'Batch lookup -> {[router.links[i] for i in router.route_packets(batch)]}')
+
+    # Route churn: a more specific route appears, then the /24 is withdrawn
+    router.add_route("223.1.250.0/24", "Link 3")
+    router.withdraw_route("223.1.1.0/24")
+    print(f'After update v{router.version}: 223.1.250.1 -> {router.route_packet("223.1.250.1")}, '
+          f'223.1.1.100 -> {router.route_packet("223.1.1.100")}')
+    print(f'Batch lookup -> {[router.links[i] for i in router.route_packets(batch)]}')
+    print(f'Forwarding table: {len(router.table)} IPv4 + {len(router.table_v6)} IPv6 routes, '
+          f'{router.memory_usage()} bytes')
+
+    # FIB aggregation: the extra /24 has the same next hop as its covering /16
+    compressed = Router(route_list + [("223.1.4.0/24", "Link 4 (ISP)")], compress=True)
+    print(f'Compressed IPv4 FIB: {compressed.compression_report()["ipv4"]}')
@@ -1,22 +1,212 @@
+import heapq
+import time
+from collections import deque
 from dataclasses import dataclass
 
+import numpy as np
+
+from aqm import BoundedQueue, packet_size
+from packet_batch import PacketBatch
+
+# Default per-class weights for the streaming schedulers (0=High ... 2=Low).
+DEFAULT_WEIGHTS = {0: 4, 1: 2, 2: 1}
+
 @dataclass
 class Packet:
     source_ip: str
     dest_ip: str
     payload: str
     priority: int  # 0=High, 1=Medium, 2=Low
+    protocol: int = 0  # IP protocol number, used by the classifier
+    src_port: int = 0
+    dst_port: int = 0
+
+@dataclass(slots=True)
+class SlottedPacket:
+    #Same fields as Packet without a per-instance __dict__, for per-packet
+    #code handling large traces. PacketBatch is smaller still.
+    source_ip: str
+    dest_ip: str
+    payload: str
+    priority: int  # 0=High, 1=Medium, 2=Low
+    protocol: int = 0
+    src_port: int = 0
+    dst_port: int = 0
 
-def fifo_scheduler(packet_list: list) -> list:
+def fifo_scheduler(packet_list):
     #Simulates a First-Come, First-Served scheduler.
-    #The input list is already in arrival order.
+    #The input list (or PacketBatch) is already in arrival order.
     return packet_list.copy()
 
-def priority_scheduler(packet_list: list) -> list:
+def priority_scheduler(packet_list):
     #Simulates a Priority Scheduler.
     #Sorts by priority number (lower is higher priority).
+    if isinstance(packet_list, PacketBatch):
+        # A stable sort keeps arrival order within each priority, like sorted().
+        return packet_list.take(np.argsort(packet_list.priority, kind='stable'))
     return sorted(packet_list, key=lambda p: p.priority)
 
+class DRRScheduler:
+    #Streaming Deficit Round Robin scheduler (Shreedhar & Varghese).
+    #Each priority class has its own FIFO queue. Backlogged classes take turns
+    #and each turn adds quantum * weight bytes of credit, so low classes get
+    #their share instead of starving behind high ones. enqueue is O(1) and
+    #dequeue is amortized O(1) when the quantum covers the largest packet.
+    #
+    #queue_factory(cls) builds each class's BoundedQueue, which is where
+    #buffer limits and tail-drop/RED/CoDel policies are configured. The
+    #default queues are unbounded. Times default to time.monotonic().
+
+    def __init__(self, weights: dict = None, quantum: int = 1500, size=packet_size,
+                 queue_factory=None):
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self.quantum = quantum
+        self._size = size
+        self._queue_factory = queue_factory or (lambda cls: BoundedQueue(size=size))
+        self.queues = {}
+        self._deficit = {}
+        self._active = deque()  # Backlogged classes in round-robin order
+        self._turn_started = False
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def _queue(self, cls) -> BoundedQueue:
+        queue = self.queues.get(cls)
+        if queue is None:
+            queue = self.queues[cls] = self._queue_factory(cls)
+            self._deficit[cls] = 0
+        return queue
+
+    def enqueue(self, packet, now: float = None) -> bool:
+        #Returns False if the class queue dropped the packet.
+        if now is None:
+            now = time.monotonic()
+        cls = packet.priority
+        queue = self._queue(cls)
+        was_idle = not queue
+        if not queue.enqueue(packet, now):
+            return False
+        if was_idle:
+            self._active.append(cls)
+        return True
+
+    def dequeue(self, now: float = None):
+        #Returns the next packet to transmit, or None if all queues are empty.
+        if now is None:
+            now = time.monotonic()
+        while self._active:
+            cls = self._active[0]
+            queue = self.queues[cls]
+            head = queue.head(now)
+            if head is None:
+                # Dequeue-time AQM drops emptied the queue.
+                self._deficit[cls] = 0
+                self._active.popleft()
+                self._turn_started = False
+                continue
+
+            if not self._turn_started:
+                self._deficit[cls] += self.quantum * self.weights.get(cls, 1)
+                self._turn_started = True
+
+            size = self._size(head)
+            if size <= self._deficit[cls]:
+                self._deficit[cls] -= size
+                packet = queue.dequeue(now)
+                if not queue:
+                    # An idle class keeps no credit for later.
+                    self._deficit[cls] = 0
+                    self._active.popleft()
+                    self._turn_started = False
+                return packet
+
+            # Not enough credit left: end this class's turn.
+            self._active.rotate(-1)
+            self._turn_started = False
+        return None
+
+    def queue_stats(self) -> dict:
+        return {cls: queue.stats() for cls, queue in sorted(self.queues.items())}
+
+class WFQScheduler:
+    #Streaming Weighted Fair Queuing scheduler.
+    #Each class's head packet is stamped with a virtual finish time
+    #max(virtual clock, class's last finish) + size / weight, and classes
+    #are served in finish-time order from a heap, so both operations are
+    #O(log n). The virtual clock follows the finish tag of the packet last
+    #sent (self-clocked fair queuing), which avoids simulating the ideal
+    #fluid system that exact WFQ needs. Stamping heads rather than arrivals
+    #gives the same tags for FIFO classes and lets AQM drop at the head.
+    #Heads are stamped without running the AQM; CoDel judges a packet when
+    #its tag comes up and it actually leaves, so its sojourn includes the
+    #wait for its turn.
+
+    def __init__(self, weights: dict = None, size=packet_size, queue_factory=None):
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self._size = size
+        self._queue_factory = queue_factory or (lambda cls: BoundedQueue(size=size))
+        self.queues = {}
+        self._heap = []  # (finish time, sequence, class, start time) per backlogged class
+        self._last_finish = {}
+        self._virtual_time = 0.0
+        self._sequence = 0  # Keeps FIFO order between equal finish times
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def _stamp_head(self, cls):
+        #Schedules the class's next packet, if it still has one.
+        head = self.queues[cls].peek()
+        if head is None:
+            return
+        start = max(self._virtual_time, self._last_finish.get(cls, 0.0))
+        finish = start + self._size(head) / self.weights.get(cls, 1)
+        self._last_finish[cls] = finish
+        heapq.heappush(self._heap, (finish, self._sequence, cls, start))
+        self._sequence += 1
+
+    def enqueue(self, packet, now: float = None) -> bool:
+        #Returns False if the class queue dropped the packet.
+        if now is None:
+            now = time.monotonic()
+        cls = packet.priority
+        queue = self.queues.get(cls)
+        if queue is None:
+            queue = self.queues[cls] = self._queue_factory(cls)
+        was_idle = not queue
+        if not queue.enqueue(packet, now):
+            return False
+        if was_idle:
+            self._stamp_head(cls)
+        return True
+
+    def dequeue(self, now: float = None):
+        #Returns the next packet to transmit, or None if the queue is empty.
+        if now is None:
+            now = time.monotonic()
+        while self._heap:
+            finish, _, cls, start = heapq.heappop(self._heap)
+            queue = self.queues[cls]
+            stamped = queue.peek()
+            # Dequeue-time AQM runs here, on the packet that is leaving.
+            packet = queue.dequeue(now)
+            if packet is None:
+                # Every packet left in the class was dropped.
+                self._last_finish[cls] = start
+                continue
+            if packet is not stamped:
+                # The stamped packet was dropped; the next one takes its slot.
+                finish = start + self._size(packet) / self.weights.get(cls, 1)
+                self._last_finish[cls] = finish
+            self._virtual_time = finish
+            self._stamp_head(cls)
+            return packet
+        return None
+
+    def queue_stats(self) -> dict:
+        return {cls: queue.stats() for cls, queue in sorted(self.queues.items())}
+
 # Main test case
 if __name__ == "__main__":
     # Create packets in arrival order
@@ -37,3 +227,48 @@ if __name__ == "__main__":
     priority_result = priority_scheduler(packets)
     for p in priority_result:
         print(p.payload)
+
+    # Streaming schedulers: enqueue everything, then drain one packet at a time
+    for scheduler in (DRRScheduler(quantum=16), WFQScheduler()):
+        print(f"\n--- {type(scheduler).__name__} Output ---")
+        for p in packets:
+            scheduler.enqueue(p)
+        while (p := scheduler.dequeue()) is not None:
+            print(p.payload)
+
+    # Million-packet trace as a PacketBatch, scheduled and routed column-wise
+    import sys
+
+    from router import Router
+
+    count = 1_000_000
+    rng = np.random.default_rng(1)
+    lengths = rng.integers(64, 1500, count).astype(np.uint32)
+    starts = np.zeros(count, dtype=np.uint64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    batch = PacketBatch(
+        src=rng.integers(0, 2**32, count, dtype=np.uint64),
+        dst=rng.integers(0, 2**32, count, dtype=np.uint64),
+        priority=rng.integers(0, 3, count),
+        payload_start=starts,
+        payload_length=lengths,
+        payload_buffer=bytes(int(lengths.sum())),
+    )
+
+    print("\n--- PacketBatch (1M packets) ---")
+    header_bytes = batch.memory_usage() - len(batch.payload_buffer)
+    print(f"PacketBatch: {header_bytes / count:.0f} bytes per packet plus payload")
+    for p in (packets[0], SlottedPacket("10.0.0.1", "10.0.0.2", "Data Packet 1", 2)):
+        size = sys.getsizeof(p) + (sys.getsizeof(p.__dict__) if hasattr(p, '__dict__') else 0)
+        print(f"{type(p).__name__}: {size} bytes per object plus its strings")
+
+    start = time.perf_counter()
+    fifo_scheduler(batch)
+    ordered = priority_scheduler(batch)
+    print(f"FIFO + priority scheduling: {time.perf_counter() - start:.3f} s")
+
+    router = Router([("0.0.0.0/1", "Link 0"), ("128.0.0.0/2", "Link 1"), ("192.0.0.0/24", "Link 2")])
+    router.compile_flat_table()
+    start = time.perf_counter()
+    router.route_packets(ordered)
+    print(f"Router batch lookup: {count / (time.perf_counter() - start) / 1e6:.1f} M packets/s")
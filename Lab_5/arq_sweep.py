@@ -0,0 +1,177 @@
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+from typing import List
+
+import numpy as np
+
+from clock import VirtualClock
+from go_back_n import GoBackNARQ
+from selective_repeat import SelectiveRepeatARQ
+
+# Two-sided 95% normal quantile; replications are many, so the normal
+# approximation of the mean's confidence interval is good enough.
+Z_95 = 1.959963984540054
+
+# retransmissions counts frames sent more than once, for every protocol.
+METRICS = ("efficiency", "retransmissions", "throughput")
+
+# Sliding-window protocols, simulated frame by frame.
+WINDOW_PROTOCOLS = {
+    "go-back-n": GoBackNARQ,
+    "selective-repeat": SelectiveRepeatARQ,
+}
+PROTOCOLS = list(WINDOW_PROTOCOLS) + ["stop-and-wait"]
+
+
+class UniformStream:
+    # Stand-in for the random module in the ARQ simulators: uniform draws are made
+    # by NumPy a block at a time and handed out one per random() call.
+    def __init__(self, generator: np.random.Generator, block_size: int = 4096):
+        self.generator = generator
+        self.block_size = block_size
+        self.draws = iter(())
+
+    def random(self) -> float:
+        try:
+            return next(self.draws)
+        except StopIteration:
+            self.draws = iter(self.generator.random(self.block_size).tolist())
+            return next(self.draws)
+
+
+def window_replications(protocol: str, seed_sequence: np.random.SeedSequence, replications: int,
+                         frames: int, window_size: int, loss_probability: float, timeout: float,
+                         frame_delay: float, ack_delay: float) -> np.ndarray:
+    # Runs a sliding-window simulator on a virtual clock once per
+    # replication, each with its own child seed. Returns one row of METRICS
+    # per run.
+    simulator_class = WINDOW_PROTOCOLS[protocol]
+    results = np.empty((replications, len(METRICS)))
+    for row, child in enumerate(seed_sequence.spawn(replications)):
+        simulator = simulator_class(frames, window_size, loss_probability, timeout, frame_delay, ack_delay,
+                                    clock=VirtualClock(), verbose=False,
+                                    rng=UniformStream(np.random.default_rng(child)))
+        stats = simulator.run()
+        results[row] = [stats[metric] for metric in METRICS]
+    return results
+
+
+def stop_and_wait_replications(seed_sequence: np.random.SeedSequence, replications: int, frames: int,
+                               loss_probability: float, timeout: float,
+                               frame_delay: float, ack_delay: float) -> np.ndarray:
+    # StopAndWaitARQ in closed form, vectorized over replications. An attempt
+    # succeeds if neither the frame (loss_probability) nor its ACK (half of
+    # it) is lost, so the failed attempts before `frames` successes are
+    # negative binomial, and which of them lost the frame is binomial.
+    # Every attempt costs frame_delay, plus ack_delay if the frame arrived,
+    # plus the timeout if it failed.
+    rng = np.random.default_rng(seed_sequence)
+    success = (1 - loss_probability) * (1 - loss_probability * 0.5)
+    failures = rng.negative_binomial(frames, success, replications)
+    frames_lost = rng.binomial(failures, loss_probability / (1 - success) if success < 1 else 0.0)
+    transmissions = frames + failures
+    elapsed = (transmissions * frame_delay + (transmissions - frames_lost) * ack_delay
+               + failures * timeout)
+    return np.column_stack((frames / transmissions, failures, frames / elapsed))
+
+
+def _run_task(task: tuple) -> tuple:
+    cell, protocol, chunk, replications, frames, window_size, loss, timeout, frame_delay, ack_delay, seed = task
+    # The seed depends only on (seed, cell, chunk), never on which worker
+    # runs the task, so a sweep is reproducible for any worker count.
+    seed_sequence = np.random.SeedSequence(seed, spawn_key=(cell, chunk))
+    if protocol == "stop-and-wait":
+        results = stop_and_wait_replications(seed_sequence, replications, frames, loss, timeout,
+                                             frame_delay, ack_delay)
+    else:
+        results = window_replications(protocol, seed_sequence, replications, frames, window_size,
+                                      loss, timeout, frame_delay, ack_delay)
+    return cell, chunk, results
+
+
+def sweep(protocols: List[str], loss_probabilities: List[float], window_sizes: List[int],
+          timeouts: List[float], frames: int = 1000, replications: int = 1000, seed: int = 0,
+          frame_delay: float = 0.1, ack_delay: float = 0.05, workers: int = None,
+          chunk_size: int = 50) -> List[dict]:
+    # Mean and 95% confidence interval of every metric for each point of the
+    # grid. Stop-and-Wait has no window, so it gets one row per loss and
+    # timeout. Replications are split into chunks spread over a process pool.
+    cells = []
+    for protocol in protocols:
+        windows = [1] if protocol == "stop-and-wait" else window_sizes
+        for loss, window_size, timeout in itertools.product(loss_probabilities, windows, timeouts):
+            if not 0.0 <= loss < 1.0:
+                raise ValueError(f"loss probability must be in [0, 1), got {loss}")
+            cells.append((protocol, loss, window_size, timeout))
+
+    tasks = []
+    for cell, (protocol, loss, window_size, timeout) in enumerate(cells):
+        for chunk, start in enumerate(range(0, replications, chunk_size)):
+            tasks.append((cell, protocol, chunk, min(chunk_size, replications - start), frames,
+                          window_size, loss, timeout, frame_delay, ack_delay, seed))
+
+    results = [{} for _ in cells]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for cell, chunk, chunk_results in map(_run_task, tasks):
+            results[cell][chunk] = chunk_results
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            for cell, chunk, chunk_results in pool.imap_unordered(_run_task, tasks):
+                results[cell][chunk] = chunk_results
+
+    rows = []
+    for (protocol, loss, window_size, timeout), chunks in zip(cells, results):
+        samples = np.concatenate([chunks[chunk] for chunk in sorted(chunks)])
+        row = {"protocol": protocol, "loss_probability": loss, "window_size": window_size,
+               "timeout": timeout, "replications": len(samples)}
+        for column, metric in enumerate(METRICS):
+            values = samples[:, column]
+            std = values.std(ddof=1) if len(values) > 1 else 0.0
+            row[f"{metric}_mean"] = float(values.mean())
+            row[f"{metric}_ci"] = float(Z_95 * std / math.sqrt(len(values)))
+        rows.append(row)
+    return rows
+
+
+def print_table(rows: List[dict]):
+    print(f"{'protocol':<18}{'loss':>6}{'window':>8}{'timeout':>9}"
+          f"{'efficiency %':>20}{'retransmissions':>22}{'throughput (frames/s)':>26}")
+    print("-" * 109)
+    for row in rows:
+        print(f"{row['protocol']:<18}{row['loss_probability']:>6.2f}{row['window_size']:>8}"
+              f"{row['timeout']:>9.2f}"
+              f"{row['efficiency_mean'] * 100:>12.2f} ± {row['efficiency_ci'] * 100:<5.2f}"
+              f"{row['retransmissions_mean']:>14.1f} ± {row['retransmissions_ci']:<5.1f}"
+              f"{row['throughput_mean']:>18.3f} ± {row['throughput_ci']:<5.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo parameter sweep of the Lab_5 ARQ protocols.")
+    parser.add_argument("--protocols", nargs="+", default=PROTOCOLS, choices=PROTOCOLS)
+    parser.add_argument("--loss", type=float, nargs="+", default=[0.01, 0.05, 0.1, 0.2, 0.3])
+    parser.add_argument("--windows", type=int, nargs="+", default=[2, 4, 8, 16])
+    parser.add_argument("--timeouts", type=float, nargs="+", default=[0.5, 2.0])
+    parser.add_argument("--frames", type=int, default=1000, help="frames per replication")
+    parser.add_argument("--replications", type=int, default=1000)
+    parser.add_argument("--frame-delay", type=float, default=0.1)
+    parser.add_argument("--ack-delay", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the rows as JSON to this file")
+    args = parser.parse_args()
+
+    rows = sweep(args.protocols, args.loss, args.windows, args.timeouts, args.frames,
+                 args.replications, args.seed, args.frame_delay, args.ack_delay, args.workers)
+    print_table(rows)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
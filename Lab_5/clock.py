@@ -0,0 +1,23 @@
+import time
+
+
+class RealClock:
+    # Wall-clock time: delays really sleep.
+    def now(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+class VirtualClock:
+    # Simulated time: delays only advance the clock, so a run takes as long
+    # as its protocol logic, not as long as its link.
+    def __init__(self, start: float = 0.0):
+        self.time = start
+
+    def now(self) -> float:
+        return self.time
+
+    def sleep(self, seconds: float):
+        self.time += seconds
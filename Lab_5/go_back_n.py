@@ -1,44 +1,63 @@
 import random
-import time
 from typing import List, Optional
 
+from clock import RealClock, VirtualClock
+
 class GoBackNARQ:
-    def __init__(self, total_frames: int, window_size: int, loss_probability: float = 0.3, timeout_duration: float = 2.0):
+    def __init__(self, total_frames: int, window_size: int, loss_probability: float = 0.3, timeout_duration: float = 2.0,
+                 frame_delay: float = 0.1, ack_delay: float = 0.05, clock=None, verbose: bool = True, rng=None):
         self.total_frames = total_frames
         self.window_size = window_size
         self.loss_probability = loss_probability
         self.timeout_duration = timeout_duration
+        self.frame_delay = frame_delay
+        self.ack_delay = ack_delay
+        self.clock = clock or RealClock()
+        self.verbose = verbose
+        # Source of loss draws: anything with a random() method.
+        self.rng = rng or random
         
         self.window_start = 0
         self.next_frame_to_send = 0
         self.ack_received = [False] * total_frames
         self.last_ack_received = -1
+        # Receiver side: the next frame it will accept. Go-Back-N receivers
+        # discard anything out of order.
+        self.expected_frame = 0
         self.transmission_complete = False
         self.total_transmissions = 0
+        # Frames sent again after a go-back, and the timeouts that caused them.
         self.retransmissions = 0
+        self.timeouts = 0
+        self.highest_frame_sent = -1
+        self.elapsed_time = 0.0
 
     def get_window_end(self) -> int:
         return min(self.window_start + self.window_size - 1, self.total_frames - 1)
 
     def simulate_frame_transmission(self, frame_number: int) -> bool:
-        time.sleep(0.1)
+        self.clock.sleep(self.frame_delay)
         self.total_transmissions += 1
         
-        if random.random() < self.loss_probability:
-            print(f"Frame {frame_number} lost during transmission")
+        if self.rng.random() < self.loss_probability:
+            if self.verbose:
+                print(f"Frame {frame_number} lost during transmission")
             return False
         else:
-            print(f"Frame {frame_number} transmitted successfully")
+            if self.verbose:
+                print(f"Frame {frame_number} transmitted successfully")
             return True
 
     def simulate_ack_transmission(self, frame_number: int) -> bool:
-        time.sleep(0.05)
+        self.clock.sleep(self.ack_delay)
         
-        if random.random() < self.loss_probability * 0.3:
-            print(f"ACK {frame_number} lost during transmission")
+        if self.rng.random() < self.loss_probability * 0.3:
+            if self.verbose:
+                print(f"ACK {frame_number} lost during transmission")
             return False
         else:
-            print(f"ACK {frame_number} received")
+            if self.verbose:
+                print(f"ACK {frame_number} received")
             return True
 
     def send_frames_in_window(self) -> List[int]:
@@ -47,13 +66,22 @@ class GoBackNARQ:
         
         if self.next_frame_to_send <= window_end:
             frames_to_send = list(range(self.next_frame_to_send, window_end + 1))
-            print(f"Sending frames {frames_to_send[0]} to {frames_to_send[-1]}")
+            if self.verbose:
+                print(f"Sending frames {frames_to_send[0]} to {frames_to_send[-1]}")
             
+            # Frames after a lost one still go out but arrive out of order.
+            # Every arrival is answered with a cumulative ACK for the last
+            # in-order frame.
             for frame_num in frames_to_send:
-                if self.simulate_frame_transmission(frame_num):
-                    sent_frames.append(frame_num)
+                if frame_num <= self.highest_frame_sent:
+                    self.retransmissions += 1
                 else:
-                    break
+                    self.highest_frame_sent = frame_num
+                if self.simulate_frame_transmission(frame_num):
+                    if frame_num == self.expected_frame:
+                        self.expected_frame += 1
+                    if self.expected_frame > 0:
+                        sent_frames.append(self.expected_frame - 1)
             
             self.next_frame_to_send = window_end + 1
         
@@ -63,10 +91,11 @@ class GoBackNARQ:
         if not sent_frames:
             return False
         
-        for frame_num in sent_frames:
+        # The newest ACK that gets through covers all the earlier ones.
+        for frame_num in reversed(sent_frames):
             if self.simulate_ack_transmission(frame_num):
                 self.last_ack_received = frame_num
-                for i in range(frame_num + 1):
+                for i in range(self.window_start, frame_num + 1):
                     self.ack_received[i] = True
                 return True
         
@@ -79,14 +108,12 @@ class GoBackNARQ:
         
         if lost_frame < self.total_frames:
             window_end = self.get_window_end()
-            print(f"Timeout! Frame {lost_frame} lost, retransmitting frames {lost_frame} to {window_end}")
+            if self.verbose:
+                print(f"Timeout! Frame {lost_frame} lost, retransmitting frames {lost_frame} to {window_end}")
             
+            # The next send_frames_in_window goes back to lost_frame.
             self.next_frame_to_send = lost_frame
-            self.retransmissions += 1
-            
-            for frame_num in range(lost_frame, window_end + 1):
-                self.simulate_frame_transmission(frame_num)
-                self.total_transmissions += 1
+            self.timeouts += 1
 
     def slide_window(self):
         old_start = self.window_start
@@ -99,19 +126,14 @@ class GoBackNARQ:
         if self.window_start > old_start:
             window_end = self.get_window_end()
             if self.window_start < self.total_frames:
-                print(f"Window slides to {self.window_start} to {window_end}")
+                if self.verbose:
+                    print(f"Window slides to {self.window_start} to {window_end}")
 
-    def run_simulation(self):
-        print("Starting Go-Back-N ARQ Protocol Simulation")
-        print(f"Configuration:")
-        print(f"   Total frames: {self.total_frames}")
-        print(f"   Window size: {self.window_size}")
-        print(f"   Loss probability: {self.loss_probability * 100:.1f}%")
-        print(f"   Timeout duration: {self.timeout_duration} seconds")
-        print("=" * 60)
-        
+    def run(self) -> dict:
+        start_time = self.clock.now()
         while self.window_start < self.total_frames:
-            print(f"\nCurrent window: {self.window_start} to {self.get_window_end()}")
+            if self.verbose:
+                print(f"\nCurrent window: {self.window_start} to {self.get_window_end()}")
             
             sent_frames = self.send_frames_in_window()
             
@@ -119,18 +141,44 @@ class GoBackNARQ:
                 ack_received = self.process_acknowledgments(sent_frames)
                 
                 if ack_received:
-                    print(f"Cumulative ACK received up to frame {self.last_ack_received}")
+                    if self.verbose:
+                        print(f"Cumulative ACK received up to frame {self.last_ack_received}")
                     self.slide_window()
                 else:
-                    print(f"No ACK received, waiting for timeout...")
-                    time.sleep(self.timeout_duration)
+                    if self.verbose:
+                        print(f"No ACK received, waiting for timeout...")
+                    self.clock.sleep(self.timeout_duration)
                     self.handle_timeout_and_retransmit()
             else:
-                print(f"All frames in current window lost, waiting for timeout...")
-                time.sleep(self.timeout_duration)
+                if self.verbose:
+                    print(f"All frames in current window lost, waiting for timeout...")
+                self.clock.sleep(self.timeout_duration)
                 self.handle_timeout_and_retransmit()
         
         self.transmission_complete = True
+        self.elapsed_time = self.clock.now() - start_time
+        throughput = self.total_frames / self.elapsed_time if self.elapsed_time > 0 else float("inf")
+        return {
+            "frames": self.total_frames,
+            "transmissions": self.total_transmissions,
+            "retransmissions": self.retransmissions,
+            "timeouts": self.timeouts,
+            "efficiency": self.total_frames / self.total_transmissions,
+            "elapsed_time": self.elapsed_time,
+            "throughput": throughput,
+        }
+
+    def run_simulation(self):
+        print("Starting Go-Back-N ARQ Protocol Simulation")
+        print(f"Configuration:")
+        print(f"   Total frames: {self.total_frames}")
+        print(f"   Window size: {self.window_size}")
+        print(f"   Loss probability: {self.loss_probability * 100:.1f}%")
+        print(f"   Timeout duration: {self.timeout_duration} seconds")
+        print(f"   Clock: {'virtual' if isinstance(self.clock, VirtualClock) else 'real'}")
+        print("=" * 60)
+        
+        stats = self.run()
         
         print("\n" + "=" * 60)
         print("Simulation Complete!")
@@ -138,7 +186,12 @@ class GoBackNARQ:
         print(f"Statistics:")
         print(f"   Total transmissions: {self.total_transmissions}")
         print(f"   Retransmissions: {self.retransmissions}")
-        print(f"   Efficiency: {(self.total_frames / self.total_transmissions) * 100:.1f}%")
+        print(f"   Timeouts: {self.timeouts}")
+        print(f"   Efficiency: {stats['efficiency'] * 100:.1f}%")
+        print(f"   Elapsed time: {self.elapsed_time:.2f} seconds")
+        print(f"   Throughput: {stats['throughput']:.2f} frames/second")
+
+        return stats
 
 
 def main():
@@ -150,6 +203,8 @@ def main():
         window_size = int(input("Enter window size N (default: 4): ") or "4")
         loss_prob = float(input("Enter frame loss probability 0.0-1.0 (default: 0.3): ") or "0.3")
         timeout = float(input("Enter timeout duration in seconds (default: 2.0): ") or "2.0")
+        virtual = (input("Use a virtual clock instead of real delays? y/n (default: n): ") or "n").lower() == "y"
+        verbose = (input("Print every frame and ACK? y/n (default: y): ") or "y").lower() == "y"
         
         if total_frames <= 0:
             print("Total frames must be positive. Using default value of 10.")
@@ -173,8 +228,11 @@ def main():
         window_size = 4
         loss_prob = 0.3
         timeout = 2.0
+        virtual = False
+        verbose = True
     
-    simulator = GoBackNARQ(total_frames, window_size, loss_prob, timeout)
+    clock = VirtualClock() if virtual else RealClock()
+    simulator = GoBackNARQ(total_frames, window_size, loss_prob, timeout, clock=clock, verbose=verbose)
     simulator.run_simulation()
 
 
@@ -0,0 +1,418 @@
+import argparse
+import asyncio
+import os
+import random
+import struct
+import time
+from collections import deque
+from typing import List, Optional
+
+# Every datagram starts with its type, a sequence number and a timestamp.
+# DATA carries one chunk of the file, FIN (empty) marks its end, and ACK
+# carries the next sequence number the receiver expects, so it acknowledges
+# every frame before it (cumulative). Frames carry the sender's clock when
+# they were sent and ACKs echo one of them back (RFC 7323 timestamps), so
+# every ACK that acknowledges new data gives an RTT sample, even for a
+# retransmitted frame.
+HEADER = struct.Struct("!BId")
+DATA, FIN, ACK = 0, 1, 2
+
+
+class LossyLink:
+    # Optional impairment for the datagrams one side sends: each is dropped
+    # with loss_probability, otherwise delivered after delay plus up to
+    # jitter seconds. The link is FIFO, like a single path: a datagram is
+    # never delivered before one sent earlier. With reorder=True jitter can
+    # reorder datagrams, which the Go-Back-N receiver treats like loss.
+    # With the defaults, datagrams go straight to the socket.
+    def __init__(self, loss_probability: float = 0.0, delay: float = 0.0, jitter: float = 0.0, rng=None,
+                 reorder: bool = False):
+        self.loss_probability = loss_probability
+        self.delay = delay
+        self.jitter = jitter
+        self.rng = rng or random
+        self.reorder = reorder
+        self.dropped = 0
+        # (delivery time, transport, packet, address) in sending order, for
+        # a FIFO link. One timer drains it: asyncio does not keep timers
+        # due at the same time in the order they were set.
+        self._in_flight = deque()
+
+    def send(self, transport: asyncio.DatagramTransport, packet: bytes, address=None):
+        if self.loss_probability and self.rng.random() < self.loss_probability:
+            self.dropped += 1
+            return
+        delay = self.delay + (self.rng.uniform(0.0, self.jitter) if self.jitter else 0.0)
+        if self.reorder:
+            if delay > 0:
+                asyncio.get_running_loop().call_later(delay, self._deliver, transport, packet, address)
+            else:
+                transport.sendto(packet, address)
+        elif delay > 0 or self._in_flight:
+            deliver_at = asyncio.get_running_loop().time() + delay
+            if self._in_flight:
+                deliver_at = max(deliver_at, self._in_flight[-1][0])
+            else:
+                asyncio.get_running_loop().call_at(deliver_at, self._drain)
+            self._in_flight.append((deliver_at, transport, packet, address))
+        else:
+            transport.sendto(packet, address)
+
+    def _drain(self):
+        loop = asyncio.get_running_loop()
+        while self._in_flight and self._in_flight[0][0] <= loop.time():
+            self._deliver(*self._in_flight.popleft()[1:])
+        if self._in_flight:
+            loop.call_at(self._in_flight[0][0], self._drain)
+
+    @staticmethod
+    def _deliver(transport: asyncio.DatagramTransport, packet: bytes, address):
+        if not transport.is_closing():
+            transport.sendto(packet, address)
+
+
+class RTOEstimator:
+    # Retransmission timeout from RTT samples, as in TCP (Jacobson/Karels,
+    # RFC 6298): a smoothed RTT and its mean deviation, RTO = SRTT +
+    # max(G, 4 RTTVAR), doubled on every timeout. G is the timer
+    # granularity, here the event loop's scheduling slack: without it a
+    # constant delay drives RTTVAR to zero and every late callback fires a
+    # spurious timeout. The doubling is kept until the next RTT sample;
+    # echoed timestamps tell which copy of a retransmitted frame an ACK
+    # answers, so Karn's algorithm does not have to wait for a frame that
+    # was sent only once. The floor defaults to 200 ms, as in Linux TCP,
+    # instead of RFC 6298's one second.
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+
+    def __init__(self, initial_rto: float = 1.0, min_rto: float = 0.2, max_rto: float = 10.0,
+                 granularity: float = 0.005):
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.granularity = granularity
+        self.srtt: Optional[float] = None
+        self.rttvar: Optional[float] = None
+        self.base_rto = initial_rto
+        self.backoff = 0
+        self.samples = 0
+
+    @property
+    def rto(self) -> float:
+        return min(self.base_rto * 2 ** self.backoff, self.max_rto)
+
+    def add_sample(self, rtt: float):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.base_rto = min(max(self.srtt + max(self.granularity, 4 * self.rttvar), self.min_rto), self.max_rto)
+        self.backoff = 0
+        self.samples += 1
+
+    def back_off(self):
+        if self.rto < self.max_rto:
+            self.backoff += 1
+
+
+class GoBackNSender(asyncio.DatagramProtocol):
+    # The sending half of GoBackNARQ over a real socket: frames
+    # window_start..get_window_end() may be in flight, one timer runs for
+    # the oldest unacknowledged frame, and when it expires every frame in
+    # flight is sent again. dup_ack_threshold duplicate ACKs trigger the
+    # same go-back without waiting for the timer (fast retransmit; None
+    # turns it off). The last frame is the FIN.
+    DUP_ACK_THRESHOLD = 3
+
+    def __init__(self, data: bytes, window_size: int, chunk_size: int = 1024, link: LossyLink = None,
+                 rto: RTOEstimator = None, dup_ack_threshold: Optional[int] = DUP_ACK_THRESHOLD,
+                 verbose: bool = False):
+        self.data = data
+        self.window_size = window_size
+        self.chunk_size = chunk_size
+        self.total_frames = (len(data) + chunk_size - 1) // chunk_size + 1
+        self.link = link or LossyLink()
+        self.rto = rto or RTOEstimator()
+        self.dup_ack_threshold = dup_ack_threshold
+        self.verbose = verbose
+
+        self.window_start = 0
+        self.next_frame_to_send = 0
+        # Duplicate ACKs since the window last moved; None after a go-back,
+        # so duplicates caused by the frames already in flight are ignored.
+        self.dup_acks: Optional[int] = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.done = asyncio.get_running_loop().create_future()
+
+        self.total_transmissions = 0
+        self.retransmissions = 0
+        self.timeouts = 0
+        self.fast_retransmits = 0
+        self.start_time = 0.0
+
+    def connection_made(self, transport: asyncio.DatagramTransport):
+        self.transport = transport
+        self.start_time = time.perf_counter()
+        self.send_frames_in_window()
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self.stop_timer()
+        if not self.done.done():
+            self.done.set_exception(exc or ConnectionError("sender closed before the transfer finished"))
+
+    def error_received(self, exc: Exception):
+        # ICMP errors (e.g. the receiver is gone) surface here; the timer
+        # keeps retransmitting, as it would for a lost frame.
+        if self.verbose:
+            print(f"Socket error: {exc}")
+
+    def get_window_end(self) -> int:
+        return min(self.window_start + self.window_size - 1, self.total_frames - 1)
+
+    def frame(self, frame_number: int) -> bytes:
+        now = time.perf_counter()
+        if frame_number == self.total_frames - 1:
+            return HEADER.pack(FIN, frame_number, now)
+        offset = frame_number * self.chunk_size
+        return HEADER.pack(DATA, frame_number, now) + self.data[offset:offset + self.chunk_size]
+
+    def transmit(self, frame_number: int):
+        self.link.send(self.transport, self.frame(frame_number))
+        self.total_transmissions += 1
+
+    def start_timer(self):
+        self.stop_timer()
+        self.timer = asyncio.get_running_loop().call_later(self.rto.rto, self.handle_timeout_and_retransmit)
+
+    def stop_timer(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def send_frames_in_window(self):
+        window_end = self.get_window_end()
+        if self.next_frame_to_send > window_end:
+            return
+        for frame_num in range(self.next_frame_to_send, window_end + 1):
+            self.transmit(frame_num)
+        self.next_frame_to_send = window_end + 1
+        if self.timer is None:
+            self.start_timer()
+
+    def datagram_received(self, packet: bytes, address):
+        if len(packet) < HEADER.size:
+            return
+        kind, ack, echo = HEADER.unpack_from(packet)
+        if kind != ACK:
+            return
+        if ack == self.window_start and ack < self.next_frame_to_send:
+            # A frame after a lost one arrived out of order and was dropped.
+            if self.dup_acks is not None:
+                self.dup_acks += 1
+                if self.dup_ack_threshold is not None and self.dup_acks >= self.dup_ack_threshold:
+                    self.fast_retransmit()
+            return
+        # Stale ACKs acknowledge nothing new.
+        if not self.window_start < ack <= self.next_frame_to_send:
+            return
+        # The echo is the send time of the frame that let the receiver move
+        # on, whichever copy of it that was.
+        self.rto.add_sample(time.perf_counter() - echo)
+        self.slide_window(ack)
+
+    def slide_window(self, ack: int):
+        self.window_start = ack
+        self.dup_acks = 0
+
+        if self.window_start == self.total_frames:
+            self.finish()
+            return
+        # The timer now covers the new oldest frame in flight.
+        self.start_timer()
+        self.send_frames_in_window()
+
+    def handle_timeout_and_retransmit(self):
+        self.timer = None
+        self.timeouts += 1
+        self.rto.back_off()
+        if self.verbose:
+            print(f"Timeout! Retransmitting frames {self.window_start} to {self.next_frame_to_send - 1} "
+                  f"(RTO now {self.rto.rto * 1000:.1f} ms)")
+        self.go_back()
+        self.start_timer()
+
+    def fast_retransmit(self):
+        self.fast_retransmits += 1
+        if self.verbose:
+            print(f"{self.dup_ack_threshold} duplicate ACKs! Retransmitting frames "
+                  f"{self.window_start} to {self.next_frame_to_send - 1}")
+        self.go_back()
+        self.start_timer()
+
+    def go_back(self):
+        self.dup_acks = None
+        for frame_num in range(self.window_start, self.next_frame_to_send):
+            self.transmit(frame_num)
+            self.retransmissions += 1
+
+    def finish(self):
+        self.stop_timer()
+        elapsed = time.perf_counter() - self.start_time
+        self.done.set_result({
+            "bytes": len(self.data),
+            "frames": self.total_frames,
+            "transmissions": self.total_transmissions,
+            "retransmissions": self.retransmissions,
+            "timeouts": self.timeouts,
+            "fast_retransmits": self.fast_retransmits,
+            "elapsed_time": elapsed,
+            "goodput": len(self.data) / elapsed if elapsed > 0 else float("inf"),
+            "srtt": self.rto.srtt,
+            "rto": self.rto.rto,
+        })
+
+
+class GoBackNReceiver(asyncio.DatagramProtocol):
+    # Accepts frames only in order, like the receiver in GoBackNARQ, and
+    # answers every frame, in order or not, with a cumulative ACK. It keeps
+    # answering after the FIN in case that ACK was lost. Each ACK echoes
+    # the timestamp of the latest frame that reached the left edge of the
+    # window, in order or a copy of one already received, as TS.Recent in
+    # RFC 7323: an out-of-order frame's own timestamp would understate the
+    # time the sender waited for this ACK.
+    def __init__(self, link: LossyLink = None):
+        self.link = link or LossyLink()
+        self.expected_frame = 0
+        self.recent_timestamp = 0.0
+        self.chunks: List[bytes] = []
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.done = asyncio.get_running_loop().create_future()
+
+    def connection_made(self, transport: asyncio.DatagramTransport):
+        self.transport = transport
+
+    def datagram_received(self, packet: bytes, address):
+        if len(packet) < HEADER.size:
+            return
+        kind, frame_number, timestamp = HEADER.unpack_from(packet)
+        if frame_number <= self.expected_frame:
+            self.recent_timestamp = max(self.recent_timestamp, timestamp)
+        if frame_number == self.expected_frame and not self.done.done():
+            if kind == DATA:
+                self.chunks.append(packet[HEADER.size:])
+            elif kind == FIN:
+                self.done.set_result(b"".join(self.chunks))
+            self.expected_frame += 1
+        self.link.send(self.transport, HEADER.pack(ACK, self.expected_frame, self.recent_timestamp), address)
+
+
+async def transfer(data: bytes, window_size: int, chunk_size: int = 1024, loss_probability: float = 0.0,
+                   delay: float = 0.0, jitter: float = 0.0, seed: Optional[int] = None,
+                   reorder: bool = False, timeout: Optional[float] = None, min_rto: float = 0.2,
+                   dup_ack_threshold: Optional[int] = GoBackNSender.DUP_ACK_THRESHOLD,
+                   verbose: bool = False) -> dict:
+    # Sends data from a GoBackNSender to a GoBackNReceiver over loopback UDP
+    # and returns the sender's statistics plus the received bytes. The
+    # impairment applies to both directions, frames and ACKs, with
+    # independent draws.
+    if window_size <= 0:
+        raise ValueError(f"window size must be positive, got {window_size}")
+    if chunk_size <= 0 or chunk_size + HEADER.size > 65507:
+        raise ValueError(f"chunk size must fit in one UDP datagram, got {chunk_size}")
+
+    loop = asyncio.get_running_loop()
+    forward = LossyLink(loss_probability, delay, jitter, random.Random(seed), reorder)
+    reverse = LossyLink(loss_probability, delay, jitter, random.Random(None if seed is None else seed + 1),
+                        reorder)
+
+    receiver_transport, receiver = await loop.create_datagram_endpoint(
+        lambda: GoBackNReceiver(reverse), local_addr=("127.0.0.1", 0))
+    try:
+        sender_transport, sender = await loop.create_datagram_endpoint(
+            lambda: GoBackNSender(data, window_size, chunk_size, forward, RTOEstimator(min_rto=min_rto),
+                                  dup_ack_threshold, verbose=verbose),
+            remote_addr=receiver_transport.get_extra_info("sockname"))
+        try:
+            stats = await asyncio.wait_for(asyncio.shield(sender.done), timeout)
+        finally:
+            sender_transport.close()
+    finally:
+        receiver_transport.close()
+
+    received = receiver.done.result()
+    if received != data:
+        raise RuntimeError(f"received {len(received)} bytes that differ from the {len(data)} sent")
+    stats["window_size"] = window_size
+    stats["frames_dropped"] = forward.dropped
+    stats["acks_dropped"] = reverse.dropped
+    stats["data"] = received
+    return stats
+
+
+def print_table(rows: List[dict]):
+    print(f"{'window':>8}{'goodput (MB/s)':>16}{'time (s)':>10}{'transmissions':>15}"
+          f"{'retransmissions':>17}{'timeouts':>10}{'fast':>6}{'SRTT (ms)':>11}{'RTO (ms)':>10}")
+    print("-" * 103)
+    for row in rows:
+        srtt = f"{row['srtt'] * 1000:.3f}" if row["srtt"] is not None else "-"
+        print(f"{row['window_size']:>8}{row['goodput'] / 1e6:>16.2f}{row['elapsed_time']:>10.3f}"
+              f"{row['transmissions']:>15}{row['retransmissions']:>17}{row['timeouts']:>10}"
+              f"{row['fast_retransmits']:>6}"
+              f"{srtt:>11}{row['rto'] * 1000:>10.3f}")
+
+
+async def compare_windows(data: bytes, window_sizes: List[int], **options) -> List[dict]:
+    rows = []
+    for window_size in window_sizes:
+        rows.append(await transfer(data, window_size, **options))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Transfer a file over loopback UDP with Go-Back-N and compare goodput across window sizes.")
+    parser.add_argument("--file", help="file to send (default: random bytes)")
+    parser.add_argument("--size", type=int, default=1 << 20, help="random bytes to send without --file")
+    parser.add_argument("--windows", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--chunk-size", type=int, default=1024, help="payload bytes per frame")
+    parser.add_argument("--loss", type=float, default=0.0, help="drop probability for frames and ACKs")
+    parser.add_argument("--delay", type=float, default=0.0, help="added one-way delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay of up to this many seconds")
+    parser.add_argument("--reorder", action="store_true", help="let jitter reorder datagrams")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=None, help="give up on a transfer after this many seconds")
+    parser.add_argument("--min-rto", type=float, default=0.2, help="lower bound on the retransmission timeout in seconds")
+    parser.add_argument("--dup-acks", type=int, default=GoBackNSender.DUP_ACK_THRESHOLD,
+                        help="duplicate ACKs that trigger a fast retransmit (0 turns it off)")
+    parser.add_argument("--output", help="write the received copy of the last transfer to this file")
+    parser.add_argument("--verbose", action="store_true", help="print every timeout and fast retransmit")
+    args = parser.parse_args()
+
+    if not 0.0 <= args.loss < 1.0:
+        parser.error("--loss must be in [0, 1)")
+    if args.file:
+        with open(args.file, "rb") as f:
+            data = f.read()
+    else:
+        data = os.urandom(args.size)
+
+    print(f"Sending {len(data)} bytes in {args.chunk_size}-byte frames, loss {args.loss * 100:.1f}%, "
+          f"delay {args.delay * 1000:.1f} ms + up to {args.jitter * 1000:.1f} ms jitter")
+    try:
+        rows = asyncio.run(compare_windows(data, args.windows, chunk_size=args.chunk_size,
+                                           loss_probability=args.loss, delay=args.delay, jitter=args.jitter,
+                                           reorder=args.reorder, seed=args.seed, timeout=args.timeout,
+                                           min_rto=args.min_rto, dup_ack_threshold=args.dup_acks or None,
+                                           verbose=args.verbose))
+    except ValueError as e:
+        parser.error(str(e))
+    print_table(rows)
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(rows[-1]["data"])
+
+
+if __name__ == "__main__":
+    main()
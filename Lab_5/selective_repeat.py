@@ -0,0 +1,248 @@
+import random
+from collections import deque
+from typing import List
+
+from clock import RealClock, VirtualClock
+
+class SelectiveRepeatARQ:
+    # Same parameters, delays and statistics as GoBackNARQ so the two can be
+    # compared directly. All per-frame state lives in ring buffers indexed by
+    # sequence number modulo the window size, so memory is bounded by the
+    # window, not by total_frames.
+    def __init__(self, total_frames: int, window_size: int, loss_probability: float = 0.3, timeout_duration: float = 2.0,
+                 frame_delay: float = 0.1, ack_delay: float = 0.05, clock=None, verbose: bool = True, rng=None):
+        self.total_frames = total_frames
+        self.window_size = window_size
+        self.loss_probability = loss_probability
+        self.timeout_duration = timeout_duration
+        self.frame_delay = frame_delay
+        self.ack_delay = ack_delay
+        self.clock = clock or RealClock()
+        self.verbose = verbose
+        # Source of loss draws: anything with a random() method.
+        self.rng = rng or random
+
+        # Sender: ACK bitmap and retransmission deadline per window slot.
+        self.window_start = 0
+        self.next_frame_to_send = 0
+        self.acked = bytearray(window_size)
+        self.deadlines = [0.0] * window_size
+        # (deadline, frame) per transmission, in send order. The clock only
+        # moves forward, so the earliest timer is always at the left; entries
+        # for frames since acknowledged or resent are skipped when reached.
+        self.timers = deque()
+
+        # Receiver: frames buffered out of order, per window slot.
+        self.receive_base = 0
+        self.buffered = bytearray(window_size)
+
+        self.transmission_complete = False
+        self.total_transmissions = 0
+        self.retransmissions = 0
+        self.elapsed_time = 0.0
+
+    def get_window_end(self) -> int:
+        return min(self.window_start + self.window_size - 1, self.total_frames - 1)
+
+    def simulate_frame_transmission(self, frame_number: int) -> bool:
+        self.clock.sleep(self.frame_delay)
+        self.total_transmissions += 1
+
+        if self.rng.random() < self.loss_probability:
+            if self.verbose:
+                print(f"Frame {frame_number} lost during transmission")
+            return False
+        else:
+            if self.verbose:
+                print(f"Frame {frame_number} transmitted successfully")
+            return True
+
+    def simulate_ack_transmission(self, frame_number: int) -> bool:
+        if self.rng.random() < self.loss_probability * 0.3:
+            if self.verbose:
+                print(f"ACK {frame_number} lost during transmission")
+            return False
+        else:
+            if self.verbose:
+                print(f"ACK {frame_number} received")
+            return True
+
+    def transmit(self, frame_number: int, acks: List[int]):
+        # Sends one frame and starts its timer. The receiver buffers it if it
+        # falls in its window and acknowledges it individually, also when it
+        # is a duplicate of a frame already delivered.
+        slot = frame_number % self.window_size
+        if self.simulate_frame_transmission(frame_number):
+            if frame_number >= self.receive_base:
+                self.buffered[slot] = 1
+                while self.buffered[self.receive_base % self.window_size]:
+                    self.buffered[self.receive_base % self.window_size] = 0
+                    self.receive_base += 1
+            acks.append(frame_number)
+        deadline = self.clock.now() + self.timeout_duration
+        self.deadlines[slot] = deadline
+        self.timers.append((deadline, frame_number))
+
+    def send_frames_in_window(self) -> List[int]:
+        acks = []
+        window_end = self.get_window_end()
+
+        if self.next_frame_to_send <= window_end:
+            if self.verbose:
+                print(f"Sending frames {self.next_frame_to_send} to {window_end}")
+            for frame_num in range(self.next_frame_to_send, window_end + 1):
+                self.transmit(frame_num, acks)
+            self.next_frame_to_send = window_end + 1
+
+        return acks
+
+    def process_acknowledgments(self, acks: List[int]) -> bool:
+        # ACKs for one burst travel back together. Each one that arrives sets
+        # its frame's bit; no other frame is touched.
+        if not acks:
+            return False
+
+        self.clock.sleep(self.ack_delay)
+        received = False
+        for frame_num in acks:
+            if self.simulate_ack_transmission(frame_num) and frame_num >= self.window_start:
+                self.acked[frame_num % self.window_size] = 1
+                received = True
+        return received
+
+    def handle_timeout_and_retransmit(self, wait: bool = True) -> List[int]:
+        # Resends every frame whose timer has expired; acknowledged frames
+        # are left alone. With wait, first waits for the earliest running
+        # timer if none has expired yet. Timers that expire while these
+        # retransmissions go out are left for the next call, after the
+        # ACKs have been processed.
+        timers = self.timers
+        acks = []
+        now = None
+        while timers:
+            deadline, frame_num = timers[0]
+            slot = frame_num % self.window_size
+            if (frame_num < self.window_start or self.acked[slot]
+                    or self.deadlines[slot] != deadline):
+                timers.popleft()
+                continue
+            if now is None:
+                if wait and deadline > self.clock.now():
+                    self.clock.sleep(deadline - self.clock.now())
+                now = self.clock.now()
+            if deadline > now:
+                break
+            timers.popleft()
+            if self.verbose:
+                print(f"Timeout! Retransmitting frame {frame_num}")
+            self.retransmissions += 1
+            self.transmit(frame_num, acks)
+        return acks
+
+    def slide_window(self):
+        old_start = self.window_start
+
+        while (self.window_start < self.next_frame_to_send
+               and self.acked[self.window_start % self.window_size]):
+            self.acked[self.window_start % self.window_size] = 0
+            self.window_start += 1
+
+        if self.window_start > old_start and self.window_start < self.total_frames:
+            if self.verbose:
+                print(f"Window slides to {self.window_start} to {self.get_window_end()}")
+
+    def run(self) -> dict:
+        start_time = self.clock.now()
+        while self.window_start < self.total_frames:
+            if self.verbose:
+                print(f"\nCurrent window: {self.window_start} to {self.get_window_end()}")
+
+            transmissions = self.total_transmissions
+            acks = self.handle_timeout_and_retransmit(wait=False)
+            acks += self.send_frames_in_window()
+            if self.total_transmissions == transmissions:
+                acks = self.handle_timeout_and_retransmit()
+            if self.process_acknowledgments(acks):
+                self.slide_window()
+
+        self.transmission_complete = True
+        self.elapsed_time = self.clock.now() - start_time
+        throughput = self.total_frames / self.elapsed_time if self.elapsed_time > 0 else float("inf")
+        return {
+            "frames": self.total_frames,
+            "transmissions": self.total_transmissions,
+            "retransmissions": self.retransmissions,
+            "efficiency": self.total_frames / self.total_transmissions,
+            "elapsed_time": self.elapsed_time,
+            "throughput": throughput,
+        }
+
+    def run_simulation(self):
+        print("Starting Selective Repeat ARQ Protocol Simulation")
+        print("Configuration:")
+        print(f"   Total frames: {self.total_frames}")
+        print(f"   Window size: {self.window_size}")
+        print(f"   Loss probability: {self.loss_probability * 100:.1f}%")
+        print(f"   Timeout duration: {self.timeout_duration} seconds")
+        print(f"   Clock: {'virtual' if isinstance(self.clock, VirtualClock) else 'real'}")
+        print("=" * 60)
+
+        stats = self.run()
+
+        print("\n" + "=" * 60)
+        print("Simulation Complete!")
+        print(f"All {self.total_frames} frames successfully transmitted")
+        print("Statistics:")
+        print(f"   Total transmissions: {self.total_transmissions}")
+        print(f"   Retransmissions: {self.retransmissions}")
+        print(f"   Efficiency: {stats['efficiency'] * 100:.1f}%")
+        print(f"   Elapsed time: {self.elapsed_time:.2f} seconds")
+        print(f"   Throughput: {stats['throughput']:.2f} frames/second")
+
+        return stats
+
+
+def main():
+    print("Selective Repeat ARQ Protocol Simulator")
+    print("=" * 60)
+
+    try:
+        total_frames = int(input("Enter total number of frames to send (default: 10): ") or "10")
+        window_size = int(input("Enter window size N (default: 4): ") or "4")
+        loss_prob = float(input("Enter frame loss probability 0.0-1.0 (default: 0.3): ") or "0.3")
+        timeout = float(input("Enter timeout duration in seconds (default: 2.0): ") or "2.0")
+        virtual = (input("Use a virtual clock instead of real delays? y/n (default: n): ") or "n").lower() == "y"
+        verbose = (input("Print every frame and ACK? y/n (default: y): ") or "y").lower() == "y"
+
+        if total_frames <= 0:
+            print("Total frames must be positive. Using default value of 10.")
+            total_frames = 10
+
+        if window_size <= 0 or window_size > total_frames:
+            print(f"Window size must be between 1 and {total_frames}. Using default value of 4.")
+            window_size = min(4, total_frames)
+
+        if not 0.0 <= loss_prob <= 1.0:
+            print("Loss probability must be between 0.0 and 1.0. Using default value of 0.3.")
+            loss_prob = 0.3
+
+        if timeout <= 0:
+            print("Timeout must be positive. Using default value of 2.0 seconds.")
+            timeout = 2.0
+
+    except ValueError:
+        print("Invalid input. Using default values.")
+        total_frames = 10
+        window_size = 4
+        loss_prob = 0.3
+        timeout = 2.0
+        virtual = False
+        verbose = True
+
+    clock = VirtualClock() if virtual else RealClock()
+    simulator = SelectiveRepeatARQ(total_frames, window_size, loss_prob, timeout, clock=clock, verbose=verbose)
+    simulator.run_simulation()
+
+
+if __name__ == "__main__":
+    main()
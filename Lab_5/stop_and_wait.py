@@ -1,53 +1,73 @@
 import random
-import time
 import threading
 from typing import Optional
 
+from clock import RealClock, VirtualClock
+
 class StopAndWaitARQ:
-    def __init__(self, total_frames: int, loss_probability: float = 0.3, timeout_duration: float = 2.0):
+    def __init__(self, total_frames: int, loss_probability: float = 0.3, timeout_duration: float = 2.0,
+                 frame_delay: float = 0.5, ack_delay: float = 0.3, clock=None, verbose: bool = True, rng=None):
         self.total_frames = total_frames
         self.loss_probability = loss_probability
         self.timeout_duration = timeout_duration
+        self.frame_delay = frame_delay
+        self.ack_delay = ack_delay
+        self.clock = clock or RealClock()
+        self.verbose = verbose
+        # Source of loss draws: anything with a random() method.
+        self.rng = rng or random
         self.current_frame = 0
         self.ack_received = False
         self.transmission_complete = False
+        self.total_transmissions = 0
+        self.retransmissions = 0
+        self.elapsed_time = 0.0
         
     def simulate_frame_transmission(self, frame_number: int) -> bool:
-        time.sleep(0.5)
+        self.clock.sleep(self.frame_delay)
         
-        if random.random() < self.loss_probability:
-            print(f"Frame {frame_number} lost during transmission")
+        if self.rng.random() < self.loss_probability:
+            if self.verbose:
+                print(f"Frame {frame_number} lost during transmission")
             return False
         else:
-            print(f"Frame {frame_number} successfully transmitted")
+            if self.verbose:
+                print(f"Frame {frame_number} successfully transmitted")
             return True
     
     def simulate_ack_transmission(self, frame_number: int) -> bool:
-        time.sleep(0.3)
+        self.clock.sleep(self.ack_delay)
         
-        if random.random() < self.loss_probability * 0.5:
-            print(f"ACK {frame_number} lost during transmission")
+        if self.rng.random() < self.loss_probability * 0.5:
+            if self.verbose:
+                print(f"ACK {frame_number} lost during transmission")
             return False
         else:
-            print(f"ACK {frame_number} received")
+            if self.verbose:
+                print(f"ACK {frame_number} received")
             return True
     
     def sender_timeout_handler(self, frame_number: int):
-        time.sleep(self.timeout_duration)
+        self.clock.sleep(self.timeout_duration)
         if not self.ack_received and not self.transmission_complete:
-            print(f"Timeout for Frame {frame_number}! Retransmitting...")
+            if self.verbose:
+                print(f"Timeout for Frame {frame_number}! Retransmitting...")
     
     def send_frame(self, frame_number: int) -> bool:
-        print(f"\nSending Frame {frame_number}")
+        if self.verbose:
+            print(f"\nSending Frame {frame_number}")
         
         self.ack_received = False
         
-        timeout_thread = threading.Thread(
-            target=self.sender_timeout_handler, 
-            args=(frame_number,)
-        )
-        timeout_thread.daemon = True
-        timeout_thread.start()
+        # A virtual clock has no concurrent time to wait in; the timeout is
+        # accounted for in run_simulation instead.
+        if not isinstance(self.clock, VirtualClock):
+            timeout_thread = threading.Thread(
+                target=self.sender_timeout_handler, 
+                args=(frame_number,)
+            )
+            timeout_thread.daemon = True
+            timeout_thread.start()
         
         frame_transmitted = self.simulate_frame_transmission(frame_number)
         
@@ -56,49 +76,71 @@ class StopAndWaitARQ:
             
             if ack_received:
                 self.ack_received = True
-                print(f"ACK {frame_number} received - Frame {frame_number} confirmed")
+                if self.verbose:
+                    print(f"ACK {frame_number} received - Frame {frame_number} confirmed")
                 return True
             else:
-                print(f"ACK {frame_number} lost - will timeout and retransmit")
+                if self.verbose:
+                    print(f"ACK {frame_number} lost - will timeout and retransmit")
                 return False
         else:
-            print(f"Frame {frame_number} lost - will timeout and retransmit")
+            if self.verbose:
+                print(f"Frame {frame_number} lost - will timeout and retransmit")
             return False
     
-    def run_simulation(self):
-        print("Starting Stop-and-Wait ARQ Protocol Simulation")
-        print(f"Configuration:")
-        print(f"   Total frames to send: {self.total_frames}")
-        print(f"   Loss probability: {self.loss_probability * 100:.1f}%")
-        print(f"   Timeout duration: {self.timeout_duration} seconds")
-        print("=" * 60)
-        
+    def run(self) -> dict:
         frame_number = 0
-        total_transmissions = 0
-        retransmissions = 0
+        start_time = self.clock.now()
         
         while frame_number < self.total_frames:
-            total_transmissions += 1
+            self.total_transmissions += 1
             
             success = self.send_frame(frame_number)
             
             if success:
                 frame_number += 1
-                print(f"Frame {frame_number - 1} successfully delivered!")
+                if self.verbose:
+                    print(f"Frame {frame_number - 1} successfully delivered!")
             else:
-                retransmissions += 1
-                print(f"Frame {frame_number} lost, retransmitting...")
-                time.sleep(self.timeout_duration)
+                self.retransmissions += 1
+                if self.verbose:
+                    print(f"Frame {frame_number} lost, retransmitting...")
+                self.clock.sleep(self.timeout_duration)
         
         self.transmission_complete = True
+        self.elapsed_time = self.clock.now() - start_time
+        throughput = self.total_frames / self.elapsed_time if self.elapsed_time > 0 else float("inf")
+        return {
+            "frames": self.total_frames,
+            "transmissions": self.total_transmissions,
+            "retransmissions": self.retransmissions,
+            "efficiency": self.total_frames / self.total_transmissions,
+            "elapsed_time": self.elapsed_time,
+            "throughput": throughput,
+        }
+
+    def run_simulation(self):
+        print("Starting Stop-and-Wait ARQ Protocol Simulation")
+        print(f"Configuration:")
+        print(f"   Total frames to send: {self.total_frames}")
+        print(f"   Loss probability: {self.loss_probability * 100:.1f}%")
+        print(f"   Timeout duration: {self.timeout_duration} seconds")
+        print(f"   Clock: {'virtual' if isinstance(self.clock, VirtualClock) else 'real'}")
+        print("=" * 60)
+        
+        stats = self.run()
         
         print("\n" + "=" * 60)
         print("Simulation Complete!")
         print(f"All {self.total_frames} frames successfully transmitted")
         print(f"Statistics:")
-        print(f"   Total transmissions: {total_transmissions}")
-        print(f"   Retransmissions: {retransmissions}")
-        print(f"   Efficiency: {(self.total_frames / total_transmissions) * 100:.1f}%")
+        print(f"   Total transmissions: {self.total_transmissions}")
+        print(f"   Retransmissions: {self.retransmissions}")
+        print(f"   Efficiency: {stats['efficiency'] * 100:.1f}%")
+        print(f"   Elapsed time: {self.elapsed_time:.2f} seconds")
+        print(f"   Throughput: {stats['throughput']:.2f} frames/second")
+
+        return stats
 
 
 def main():
@@ -109,6 +151,8 @@ def main():
         total_frames = int(input("Enter the number of frames to transmit (default: 5): ") or "5")
         loss_prob = float(input("Enter frame loss probability 0.0-1.0 (default: 0.3): ") or "0.3")
         timeout = float(input("Enter timeout duration in seconds (default: 2.0): ") or "2.0")
+        virtual = (input("Use a virtual clock instead of real delays? y/n (default: n): ") or "n").lower() == "y"
+        verbose = (input("Print every frame and ACK? y/n (default: y): ") or "y").lower() == "y"
         
         if total_frames <= 0:
             print("Number of frames must be positive. Using default value of 5.")
@@ -127,8 +171,11 @@ def main():
         total_frames = 5
         loss_prob = 0.3
         timeout = 2.0
+        virtual = False
+        verbose = True
     
-    simulator = StopAndWaitARQ(total_frames, loss_prob, timeout)
+    clock = VirtualClock() if virtual else RealClock()
+    simulator = StopAndWaitARQ(total_frames, loss_prob, timeout, clock=clock, verbose=verbose)
     simulator.run_simulation()
 
 
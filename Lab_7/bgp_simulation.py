@@ -1,43 +1,299 @@
 # bgp_simulation.py
+import heapq
+from array import array
+from itertools import count
+
+# AS paths are interned: every distinct path is stored once, as an
+# immutable tuple in PATHS, and the RIBs hold its integer ID (0 = no route).
+# Prefixes get integer IDs too, so each RIB is a flat array of path IDs
+# indexed by prefix ID (4 bytes per entry) instead of a dict of lists.
+PATHS = [None]
+_path_ids = {}
+_prepended = {}  # (AS name, path ID) -> path ID
+PREFIXES = []
+_prefix_ids = {}
+
+def intern_path(path):
+    path = tuple(path)
+    path_id = _path_ids.get(path)
+    if path_id is None:
+        path_id = _path_ids[path] = len(PATHS)
+        PATHS.append(path)
+    return path_id
+
+def prepend(as_name, path_id):
+    # ID of (as_name,) + PATHS[path_id], memoized since every prefix learned
+    # over the same path prepends the same way.
+    key = (as_name, path_id)
+    result = _prepended.get(key)
+    if result is None:
+        result = _prepended[key] = intern_path((as_name,) + PATHS[path_id])
+    return result
+
+def prefix_id(prefix):
+    result = _prefix_ids.get(prefix)
+    if result is None:
+        result = _prefix_ids[prefix] = len(PREFIXES)
+        PREFIXES.append(prefix)
+    return result
+
+def reset_tables():
+    # Forgets every interned path and prefix ID. RIB arrays are sized by the
+    # number of prefix IDs, so call this between unrelated simulations;
+    # AS objects built before it must not be used afterwards.
+    del PATHS[1:]
+    _path_ids.clear()
+    _prepended.clear()
+    del PREFIXES[:]
+    _prefix_ids.clear()
+
+def _fit(rib):
+    # Grows a RIB array to cover every prefix ID handed out so far.
+    missing = len(PREFIXES) - len(rib)
+    if missing > 0:
+        rib.frombytes(bytes(missing * rib.itemsize))
+
 
 class AS:
     def __init__(self, name):
         self.name = name
         self.neighbors = []
-        # Routing table: {prefix: as_path}
-        self.routing_table = {}
-        # We simulate one prefix, 'Network_X'
-        self.best_path = []
+        # Adj-RIB-In: neighbor name -> path IDs as received from it
+        self.adj_rib_in = {}
+        # Loc-RIB: best path ID per prefix, with this AS prepended
+        self.loc_rib = array('I')
+        # Adj-RIB-Out: neighbor name -> path IDs last advertised to it
+        self.adj_rib_out = {}
+        self.originated = set()
 
     def add_neighbor(self, neighbor):
         self.neighbors.append(neighbor)
-    
-    def announce_self(self):
-        self.best_path = [self.name]
-        self.routing_table['Network_X'] = [self.name]
-
-    def receive_announcement(self, neighbor, announced_path):
-        # 3. Loop Prevention
-        if self.name in announced_path:
-            return False # Loop detected, discard
-            
-        new_path = [self.name] + announced_path
-        
-        # 2. Path Selection
-        if not self.best_path or len(new_path) < len(self.best_path):
-            self.best_path = new_path
-            self.routing_table['Network_X'] = new_path
-            return True # Path was updated
-        return False
-
-    def print_table(self):
+        self.adj_rib_in[neighbor.name] = array('I')
+        self.adj_rib_out[neighbor.name] = array('I')
+
+    def remove_neighbor(self, neighbor):
+        # Session down: everything learned from the neighbor is withdrawn.
+        # Returns the prefix IDs whose best path changed.
+        rib_in = self.adj_rib_in[neighbor.name]
+        changed = self.receive_update(neighbor, (), [pid for pid, path_id in enumerate(rib_in) if path_id])
+        self.neighbors.remove(neighbor)
+        del self.adj_rib_in[neighbor.name]
+        del self.adj_rib_out[neighbor.name]
+        return changed
+
+    def announce_self(self, prefixes=('Network_X',)):
+        # Originates prefixes; returns their prefix IDs.
+        path_id = intern_path((self.name,))
+        ids = [prefix_id(prefix) for prefix in prefixes]
+        _fit(self.loc_rib)
+        for pid in ids:
+            self.loc_rib[pid] = path_id
+            self.originated.add(pid)
+        return ids
+
+    def withdraw_self(self, prefixes):
+        # Stops originating prefixes; returns the prefix IDs whose best path
+        # changed (normally all of them).
+        changed = set()
+        for prefix in prefixes:
+            pid = prefix_id(prefix)
+            self.originated.discard(pid)
+            if self._select(pid):
+                changed.add(pid)
+        return changed
+
+    @property
+    def routing_table(self):
+        # {prefix: AS path tuple} view of the Loc-RIB
+        return {PREFIXES[pid]: PATHS[path_id]
+                for pid, path_id in enumerate(self.loc_rib) if path_id}
+
+    def receive_update(self, neighbor, announcements=(), withdrawals=()):
+        # Applies one UPDATE from neighbor: announcements are (prefix ID,
+        # path ID) pairs with the path as the neighbor advertised it, and
+        # withdrawals are prefix IDs. The decision process runs once per
+        # affected prefix after the whole message is stored. Returns the set
+        # of prefix IDs whose best path changed.
+        rib_in = self.adj_rib_in[neighbor.name]
+        loc_rib = self.loc_rib
+        _fit(rib_in)
+        _fit(loc_rib)
+        changed = set()
+        rescan = set()
+
+        for pid in withdrawals:
+            if rib_in[pid]:
+                rib_in[pid] = 0
+                if self._best_neighbor(pid) == neighbor.name:
+                    rescan.add(pid)
+
+        for pid, path_id in announcements:
+            path = PATHS[path_id]
+            # 3. Loop Prevention: a path through us counts as a withdrawal
+            if self.name in path:
+                if rib_in[pid]:
+                    rib_in[pid] = 0
+                    if self._best_neighbor(pid) == neighbor.name:
+                        rescan.add(pid)
+                continue
+            rib_in[pid] = path_id
+            if pid in self.originated:
+                continue
+
+            # 2. Path Selection: shortest AS path, keeping the current best
+            # on a tie. Only a worse path from the current best neighbor
+            # needs the other neighbors compared again.
+            best = loc_rib[pid]
+            if not best:
+                loc_rib[pid] = prepend(self.name, path_id)
+                changed.add(pid)
+            elif PATHS[best][1] == neighbor.name:
+                if len(path) + 1 <= len(PATHS[best]):
+                    new_best = prepend(self.name, path_id)
+                    if new_best != best:
+                        loc_rib[pid] = new_best
+                        changed.add(pid)
+                else:
+                    rescan.add(pid)
+            elif len(path) + 1 < len(PATHS[best]):
+                loc_rib[pid] = prepend(self.name, path_id)
+                changed.add(pid)
+
+        for pid in rescan:
+            if self._select(pid):
+                changed.add(pid)
+        return changed
+
+    def _best_neighbor(self, pid):
+        path = PATHS[self.loc_rib[pid]]
+        return path[1] if path and len(path) > 1 else None
+
+    def _select(self, pid):
+        # Full decision for one prefix over every Adj-RIB-In. Ties go to the
+        # lowest neighbor name. Returns True if the best path changed.
+        if pid in self.originated:
+            return False
+        best_key, best_id = None, 0
+        for name, rib_in in self.adj_rib_in.items():
+            if pid < len(rib_in) and rib_in[pid]:
+                key = (len(PATHS[rib_in[pid]]), name)
+                if best_key is None or key < best_key:
+                    best_key, best_id = key, rib_in[pid]
+        new_best = prepend(self.name, best_id) if best_id else 0
+        if new_best == self.loc_rib[pid]:
+            return False
+        self.loc_rib[pid] = new_best
+        return True
+
+    def advertise_to(self, neighbor, prefix_ids=None):
+        # Diffs the Loc-RIB against the Adj-RIB-Out for neighbor (over
+        # prefix_ids, or every prefix) and returns the (announcements,
+        # withdrawals) to send. Routes learned from the neighbor are not
+        # sent back to it; it would discard them as loops anyway.
+        rib_out = self.adj_rib_out[neighbor.name]
+        loc_rib = self.loc_rib
+        _fit(rib_out)
+        _fit(loc_rib)
+        announcements, withdrawals = [], []
+        for pid in range(len(loc_rib)) if prefix_ids is None else prefix_ids:
+            path_id = loc_rib[pid]
+            if path_id and len(PATHS[path_id]) > 1 and PATHS[path_id][1] == neighbor.name:
+                path_id = 0
+            if path_id != rib_out[pid]:
+                rib_out[pid] = path_id
+                if path_id:
+                    announcements.append((pid, path_id))
+                else:
+                    withdrawals.append(pid)
+        return announcements, withdrawals
+
+    def print_table(self, limit=10):
         print(f"--- BGP Table for {self.name} ---")
-        if not self.best_path:
-            print("No path to Network_X")
-        else:
-            print(f"Dest: Network_X | Path: {' -> '.join(self.best_path)}")
+        table = self.routing_table
+        if not table:
+            print("No path to Network_X" if len(PREFIXES) <= 1 else "No routes")
+        for prefix, path in list(table.items())[:limit]:
+            print(f"Dest: {prefix} | Path: {' -> '.join(path)}")
+        if len(table) > limit:
+            print(f"... {len(table) - limit} more prefixes")
         print("\n")
 
+
+def converge(ases):
+    # Sweeps every session until no UPDATE changes a best path. Returns the
+    # number of sweeps and UPDATE messages.
+    sweeps = messages = 0
+    converged = False
+    while not converged:
+        sweeps += 1
+        converged = True
+        for as_node in ases:
+            for neighbor in as_node.neighbors:
+                announcements, withdrawals = as_node.advertise_to(neighbor)
+                if announcements or withdrawals:
+                    messages += 1
+                    if neighbor.receive_update(as_node, announcements, withdrawals):
+                        converged = False
+    return {"sweeps": sweeps, "messages": messages}
+
+
+def propagate(ases, changes, mrai=30.0, link_delay=0.01):
+    # Event-driven UPDATE propagation in simulated seconds. changes maps an
+    # AS to the prefix IDs whose best path just changed there (e.g. what
+    # announce_self returned). An AS only sends when a best path changed.
+    # Changes queued for a neighbor while its MRAI timer runs are coalesced
+    # into one UPDATE, diffed against the Adj-RIB-Out, when it expires; a
+    # prefix that flapped back meanwhile is not sent at all. The timer
+    # covers withdrawals as well.
+    pending = {}   # (sender name, neighbor name) -> prefix IDs to send
+    ready_at = {}  # (sender name, neighbor name) -> when MRAI allows a send
+    events = []    # (time, seq, sender, receiver, UPDATE or None for a send)
+    seq = count()
+    stats = {"messages": 0, "entries": 0, "best_path_changes": 0, "convergence_time": 0.0}
+
+    def queue_changes(as_node, prefix_ids, now):
+        for neighbor in as_node.neighbors:
+            key = (as_node.name, neighbor.name)
+            queued = pending.get(key)
+            if queued is None:
+                pending[key] = set(prefix_ids)
+                send_at = max(now, ready_at.get(key, 0.0))
+                heapq.heappush(events, (send_at, next(seq), as_node, neighbor, None))
+            else:
+                queued.update(prefix_ids)
+
+    for as_node, prefix_ids in changes.items():
+        queue_changes(as_node, prefix_ids, 0.0)
+
+    while events:
+        now, _, sender, receiver, update = heapq.heappop(events)
+        if update is None:
+            key = (sender.name, receiver.name)
+            announcements, withdrawals = sender.advertise_to(receiver, sorted(pending.pop(key)))
+            if announcements or withdrawals:
+                stats["messages"] += 1
+                stats["entries"] += len(announcements) + len(withdrawals)
+                ready_at[key] = now + mrai
+                heapq.heappush(events, (now + link_delay, next(seq), sender, receiver,
+                                        (announcements, withdrawals)))
+        else:
+            changed = receiver.receive_update(sender, *update)
+            if changed:
+                stats["best_path_changes"] += len(changed)
+                stats["convergence_time"] = now
+                queue_changes(receiver, changed, now)
+    return stats
+
+
+def build_ases(graph, prefix="AS"):
+    # AS objects wired like graph, a {node: {neighbor: cost}} topology.
+    ases = {node: AS(f"{prefix}{node}") for node in graph}
+    for node, links in graph.items():
+        for neighbor in links:
+            ases[node].add_neighbor(ases[neighbor])
+    return ases
+
+
 # --- Simulation ---
 if __name__ == "__main__":
     # 1. Define AS-level topology
@@ -48,38 +304,75 @@ if __name__ == "__main__":
 
     as1.add_neighbor(as2)
     as1.add_neighbor(as3)
-    
+
     as2.add_neighbor(as1)
     as2.add_neighbor(as3)
-    
+
     as3.add_neighbor(as1)
     as3.add_neighbor(as2)
     as3.add_neighbor(as4)
-    
+
     as4.add_neighbor(as3)
 
     ases = [as1, as2, as3, as4]
-    
+
     # AS4 originates the prefix
-    as4.announce_self()
+    originated = as4.announce_self()
 
-    # 2. Simulate BGP UPDATE exchanges
-    converged = False
-    while not converged:
-        updated = False
-        for as_node in ases:
-            if not as_node.best_path:
-                continue
-            
-            for neighbor in as_node.neighbors:
-                if neighbor.receive_announcement(as_node, as_node.best_path):
-                    updated = True
-        
-        if not updated:
-            converged = True
+    # 2. Simulate BGP UPDATE exchanges, sent only when a best path changes
+    propagate(ases, {as4: originated})
 
     print("--- BGP CONVERGENCE REACHED ---\n")
-    
+
     # 4. Show final routing tables
     for as_node in ases:
-        as_node.print_table()
\ No newline at end of file
+        as_node.print_table()
+
+    # 5. Full-table scale: 200k prefixes spread over a 10-AS topology
+    import time
+    import tracemalloc
+
+    from topologies import isp_graph, random_graph
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    big = build_ases(random_graph(10, average_degree=3, seed=1), "BIG")
+    prefix_count = 200000
+    changes = {}
+    for node, as_node in big.items():
+        changes[as_node] = as_node.announce_self(f"{(i >> 16) + 1}.{(i >> 8) & 255}.{i & 255}.0/24"
+                                                 for i in range(node, prefix_count, len(big)))
+    stats = propagate(list(big.values()), changes, mrai=0.0)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"--- {prefix_count} prefixes, {len(big)} ASes: converged in {seconds:.1f} s, "
+          f"{stats['messages']} UPDATEs, {len(PATHS) - 1} distinct AS paths, "
+          f"peak memory {peak / 1e6:.0f} MB ---\n")
+
+    # 6. Sweeps vs delta propagation on a 300-AS graph, 5 prefixes per AS,
+    # then one origin withdraws its prefixes
+    del big, changes
+    reset_tables()
+    print("--- 300 ASes, 1500 prefixes ---")
+    graph = isp_graph(300, seed=2)
+    for mrai in (None, 0.0, 5.0, 30.0):
+        ases = build_ases(graph)
+        changes = {as_node: as_node.announce_self(f"{node}/{k}" for k in range(5))
+                   for node, as_node in ases.items()}
+        withdrawn = [f"150/{k}" for k in range(5)]
+        start = time.perf_counter()
+        if mrai is None:
+            stats = converge(list(ases.values()))
+            ases[150].withdraw_self(withdrawn)
+            withdrawal = converge(list(ases.values()))
+            print(f"full sweeps:     {stats['messages']} UPDATEs in {stats['sweeps']} sweeps; "
+                  f"withdrawal {withdrawal['messages']} UPDATEs in {withdrawal['sweeps']} sweeps; "
+                  f"{time.perf_counter() - start:.2f} s wall")
+            continue
+        stats = propagate(list(ases.values()), changes, mrai)
+        withdrawal = propagate(list(ases.values()), {ases[150]: ases[150].withdraw_self(withdrawn)}, mrai)
+        print(f"delta, MRAI {mrai:>4}: {stats['messages']} UPDATEs ({stats['entries']} prefixes), "
+              f"converged at t={stats['convergence_time']:.2f} s; withdrawal {withdrawal['messages']} "
+              f"UPDATEs, t={withdrawal['convergence_time']:.2f} s; "
+              f"{time.perf_counter() - start:.2f} s wall")
\ No newline at end of file
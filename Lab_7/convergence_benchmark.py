@@ -0,0 +1,223 @@
+# convergence_benchmark.py
+# Runs the RIP, OSPF, IS-IS and BGP models of des.py over synthetic
+# topologies of growing size and records wall time, message and event
+# counts and peak memory as JSON, to show where each model stops scaling
+# and to catch regressions against an earlier report.
+import argparse
+import json
+import math
+import platform
+import random
+import time
+import tracemalloc
+
+import bgp_simulation
+from des import BGPProtocol, Network, RIPProtocol, Simulator, converge, isis, measure_failure, ospf
+from topologies import barabasi_albert_graph, grid_graph, isp_graph, waxman_graph
+
+GENERATORS = {
+    "waxman": waxman_graph,
+    "barabasi-albert": barabasi_albert_graph,
+    "grid": grid_graph,
+    "isp": isp_graph,
+}
+
+# Cold start floods every router's LSA, so the link-state models start
+# unsynchronized there; the failure scenario starts them from a converged
+# LSDB instead.
+PROTOCOLS = {
+    "rip": lambda network, cold: RIPProtocol(network),
+    "ospf": lambda network, cold: ospf(network, synchronized=not cold),
+    "isis": lambda network, cold: isis(network, synchronized=not cold),
+    "bgp": lambda network, cold: BGPProtocol(network, mrai=30.0),
+}
+
+SCENARIOS = ("cold_start", "link_failure")
+
+
+def bench_protocol(graph, protocol_name, scenario, failures=5, seed=0, trace=False,
+                   delay=0.005, detect_delay=0.05):
+    # One run of one protocol on one topology. cold_start measures the
+    # protocol converging from empty tables; link_failure converges first
+    # (timed separately as setup) and then fails and restores `failures`
+    # random links. With trace=True the run is under tracemalloc and also
+    # reports the peak bytes allocated, which slows it down several times.
+    bgp_simulation.reset_tables()
+    record = {"protocol": protocol_name, "scenario": scenario}
+    cold = scenario == "cold_start"
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    sim = Simulator()
+    protocol = PROTOCOLS[protocol_name](Network(sim, graph, delay, detect_delay), cold)
+    simulated = converge(protocol)
+
+    messages = events = dropped = spf_runs = 0
+    if cold:
+        record["convergence"] = simulated
+    else:
+        links = [(a, b) for a in graph for b in graph[a] if a < b]
+        rng = random.Random(seed)
+        sim.run(until=sim.now + 1.0)
+        messages, events, dropped = protocol.messages, sim.processed, protocol.network.dropped
+        spf_runs = getattr(protocol, "spf_runs", 0)
+        record["setup_seconds"] = time.perf_counter() - start
+        start = time.perf_counter()
+        times = []
+        for a, b in rng.sample(links, min(failures, len(links))):
+            times.append(measure_failure(protocol, a, b)[0])
+            measure_failure(protocol, a, b, up=True)
+        record["failures"] = len(times)
+        record["mean_convergence"] = sum(times) / len(times) if times else 0.0
+        record["max_convergence"] = max(times, default=0.0)
+    record["wall_seconds"] = time.perf_counter() - start
+    if trace:
+        # The peak covers the whole run, so it is the model's footprint.
+        record["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    record["messages"] = protocol.messages - messages
+    record["events"] = sim.processed - events
+    record["dropped"] = protocol.network.dropped - dropped
+    if hasattr(protocol, "spf_runs"):
+        record["spf_runs"] = protocol.spf_runs - spf_runs
+    bgp_simulation.reset_tables()
+    return record
+
+
+def _predict(history, nodes, key):
+    # Extrapolates key(run) to `nodes` from the last two runs (power law), or
+    # quadratically from a single run.
+    points = [(run["nodes"], key(run)) for run in history if key(run)]
+    if not points:
+        return 0.0
+    n1, y1 = points[-1]
+    exponent = 2.0
+    if len(points) > 1:
+        n0, y0 = points[-2]
+        if n1 > n0 and y0 > 0:
+            exponent = max(1.0, math.log(y1 / y0) / math.log(n1 / n0))
+    return y1 * (nodes / n1) ** exponent
+
+
+def _run_seconds(run):
+    return run["wall_seconds"] + run.get("setup_seconds", 0.0)
+
+
+def run(sizes, topologies, protocols, scenarios=SCENARIOS, failures=5, budget=60.0,
+        max_memory=4e9, memory=True, seed=0):
+    # Every protocol and scenario on every topology, smallest size first.
+    # A combination stops at the first size predicted to take more than
+    # budget seconds (untraced, setup included) or max_memory bytes; that
+    # size and the larger ones are reported as skipped, which is where the
+    # model stops scaling. The traced run for memory comes on top.
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": seed,
+        "memory_traced": memory,
+        "topologies": [],
+        "runs": [],
+    }
+    history = {}
+    stopped = {}
+    for nodes in sorted(sizes):
+        for topology in topologies:
+            start = time.perf_counter()
+            graph = GENERATORS[topology](nodes, seed=seed)
+            report["topologies"].append({
+                "topology": topology,
+                "nodes": nodes,
+                "links": sum(len(links) for links in graph.values()) // 2,
+                "generate_seconds": time.perf_counter() - start,
+            })
+            for protocol in protocols:
+                for scenario in scenarios:
+                    key = (topology, protocol, scenario)
+                    record = {"topology": topology, "nodes": nodes, "protocol": protocol,
+                              "scenario": scenario}
+                    past = history.setdefault(key, [])
+                    predicted = _predict(past, nodes, _run_seconds)
+                    predicted_memory = _predict(past, nodes, lambda run: run.get("peak_bytes"))
+                    if key in stopped:
+                        record["skipped"] = stopped[key]
+                    elif predicted > budget:
+                        record["skipped"] = stopped[key] = (
+                            f"predicted {predicted:.0f} s at {nodes} nodes > {budget:.0f} s budget")
+                    elif predicted_memory > max_memory:
+                        record["skipped"] = stopped[key] = (
+                            f"predicted {predicted_memory / 1e9:.1f} GB at {nodes} nodes "
+                            f"> {max_memory / 1e9:.1f} GB")
+                    else:
+                        record.update(bench_protocol(graph, protocol, scenario, failures, seed))
+                        if memory:
+                            # A second, traced run, so wall times stay unskewed.
+                            traced = bench_protocol(graph, protocol, scenario, failures, seed, trace=True)
+                            record["peak_bytes"] = traced["peak_bytes"]
+                        past.append(record)
+                    report["runs"].append(record)
+    return report
+
+
+_METRICS = ("wall_seconds", "messages", "events", "peak_bytes")
+
+def _record_key(record):
+    return record["topology"], record["nodes"], record["protocol"], record["scenario"]
+
+def compare(baseline, current, tolerance):
+    # Returns human-readable regressions where a metric grew by more than
+    # tolerance (a fraction) over the baseline report, or a run that used
+    # to complete is now skipped.
+    previous = {_record_key(record): record for record in baseline.get("runs", [])}
+    regressions = []
+    for record in current.get("runs", []):
+        old = previous.get(_record_key(record))
+        if old is None or "skipped" in old:
+            continue
+        if "skipped" in record:
+            regressions.append(f"{_record_key(record)} now skipped: {record['skipped']}")
+            continue
+        for key in _METRICS:
+            if key in old and key in record and record[key] > old[key] * (1 + tolerance):
+                regressions.append(f"{_record_key(record)} {key}: "
+                                   f"{old[key]:,.3f} -> {record[key]:,.3f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark convergence of the Lab_7 routing models.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--topologies", nargs="+", default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument("--protocols", nargs="+", default=list(PROTOCOLS), choices=list(PROTOCOLS))
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--failures", type=int, default=5, help="links failed per link_failure run")
+    parser.add_argument("--budget", type=float, default=60.0,
+                        help="skip runs predicted to take longer than this many seconds")
+    parser.add_argument("--max-memory", type=float, default=4e9,
+                        help="skip runs predicted to need more bytes than this")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the traced run that measures peak memory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report to check for regressions against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.topologies, args.protocols, args.scenarios, args.failures,
+                 args.budget, args.max_memory, not args.no_memory, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,521 @@
+# des.py
+# Discrete-event simulation kernel for the Lab_7 routing protocols. Protocol
+# messages, timers and link up/down events are scheduled on one virtual
+# clock, so convergence is measured in simulated seconds.
+import heapq
+from itertools import count
+
+from bgp_simulation import AS
+from rip_simulation import Router as RIPRouter
+from spf import LinkStateGraph, change_link, shortest_path_tree
+
+
+class Simulator:
+    # Events are [time, seq, callback, args] lists in a heap; seq keeps
+    # events at the same time in scheduling order and never lets the heap
+    # compare callbacks.
+    def __init__(self):
+        self.now = 0.0
+        self.processed = 0
+        self._queue = []
+        self._seq = count()
+
+    def schedule(self, delay, callback, *args):
+        # Runs callback(*args) delay seconds from now; returns the event.
+        event = [self.now + delay, next(self._seq), callback, args]
+        heapq.heappush(self._queue, event)
+        return event
+
+    def cancel(self, event):
+        event[2] = None
+
+    def run(self, until=None):
+        # Processes events in time order until none are left (or the next
+        # one is after until). Returns the clock.
+        queue = self._queue
+        while queue and (until is None or queue[0][0] <= until):
+            time, _, callback, args = heapq.heappop(queue)
+            if callback is None:
+                continue
+            self.now = time
+            self.processed += 1
+            callback(*args)
+        if until is not None and self.now < until:
+            self.now = until
+        return self.now
+
+
+class Network:
+    # A {node: {neighbor: cost}} topology on a Simulator. Messages take
+    # delay seconds and are lost if their link goes down in flight.
+    # Protocols hear about a link change detect_delay seconds after it
+    # happens (the hello dead interval, or BFD).
+    def __init__(self, sim, graph, delay=0.001, detect_delay=0.0):
+        self.sim = sim
+        self.graph = graph
+        self.delay = delay
+        self.detect_delay = detect_delay
+        self.down = set()  # (a, b) for both directions of every failed link
+        self.protocols = []
+        self.messages = 0
+        self.dropped = 0
+
+    def is_up(self, a, b):
+        return (a, b) not in self.down
+
+    def neighbors(self, node):
+        return [neighbor for neighbor in self.graph[node] if (node, neighbor) not in self.down]
+
+    def send(self, src, dst, handler, *args):
+        self.messages += 1
+        self.sim.schedule(self.delay, self._deliver, src, dst, handler, args)
+
+    def _deliver(self, src, dst, handler, args):
+        if (src, dst) in self.down:
+            self.dropped += 1
+            return
+        handler(*args)
+
+    def set_link(self, a, b, up, at=None):
+        # Schedules link a-b going up or down at simulated time at (now if None).
+        delay = 0.0 if at is None else max(0.0, at - self.sim.now)
+        self.sim.schedule(delay, self._set_link, a, b, up)
+
+    def _set_link(self, a, b, up):
+        if up:
+            self.down.discard((a, b))
+            self.down.discard((b, a))
+        else:
+            self.down.add((a, b))
+            self.down.add((b, a))
+        for protocol in self.protocols:
+            self.sim.schedule(self.detect_delay, protocol.link_changed, a, b, up)
+
+
+class Protocol:
+    # Base for the protocol adapters: counts messages and remembers when
+    # routing state last changed, which is the convergence time.
+    name = "protocol"
+
+    def __init__(self, network):
+        self.network = network
+        self.sim = network.sim
+        self.messages = 0
+        self.last_change = 0.0
+        network.protocols.append(self)
+
+    def send(self, src, dst, handler, *args):
+        self.messages += 1
+        self.network.send(src, dst, handler, *args)
+
+    def changed(self):
+        self.last_change = self.sim.now
+
+    def start(self):
+        pass
+
+    def link_changed(self, a, b, up):
+        pass
+
+
+class _RIPRouter(RIPRouter):
+    # A rip_simulation router whose requests travel over the network.
+    def __init__(self, name, protocol):
+        super().__init__(name)
+        self.protocol = protocol
+
+    def send_request(self, neighbor, dest):
+        self.protocol.send(self.name, neighbor.name, self.protocol._request, self, neighbor, dest)
+
+
+class RIPProtocol(Protocol):
+    # rip_simulation routers exchanging triggered updates, requests and
+    # responses as messages. trigger_delay holds a router's update back so
+    # that changes arriving meanwhile go out together (RFC 2453 suggests
+    # 1-5 s).
+    name = "RIP"
+
+    def __init__(self, network, trigger_delay=0.0):
+        super().__init__(network)
+        self.trigger_delay = trigger_delay
+        self.routers = {node: _RIPRouter(node, self) for node in network.graph}
+        for node, links in network.graph.items():
+            for neighbor in links:
+                self.routers[node].add_neighbor(self.routers[neighbor])
+        self._scheduled = set()
+
+    def start(self):
+        for router in self.routers.values():
+            self._trigger(router)
+
+    def _trigger(self, router):
+        if router.name not in self._scheduled:
+            self._scheduled.add(router.name)
+            self.sim.schedule(self.trigger_delay, self._send_update, router)
+
+    def _send_update(self, router):
+        self._scheduled.discard(router.name)
+        for neighbor in router.neighbors:
+            entries = router.advertise(neighbor)
+            if entries:
+                self.send(router.name, neighbor.name, self._receive, router, neighbor, entries)
+        router.changed.clear()
+
+    def _receive(self, sender, receiver, entries):
+        if sender in receiver.neighbors and receiver.receive(sender, entries):
+            self.changed()
+            self._trigger(receiver)
+
+    def _request(self, requester, responder, dest):
+        if requester in responder.neighbors:
+            self.send(responder.name, requester.name, self._response, responder, requester, dest,
+                      responder.advertised_cost(dest, requester))
+
+    def _response(self, responder, requester, dest, cost):
+        if requester.receive_response(responder, dest, cost):
+            self.changed()
+            self._trigger(requester)
+
+    def link_changed(self, a, b, up):
+        for router, neighbor in ((self.routers[a], self.routers[b]), (self.routers[b], self.routers[a])):
+            if up and neighbor not in router.neighbors:
+                router.add_neighbor(neighbor)
+                # The new neighbor needs the whole table.
+                router.changed.update(router.routing_table)
+            elif not up and neighbor in router.neighbors:
+                # Sends requests for the routes that became unreachable.
+                router.remove_neighbor(neighbor)
+            else:
+                continue
+            self.changed()
+            self._trigger(router)
+
+    def routing_table(self, node):
+        return self.routers[node].routing_table
+
+
+class BGPProtocol(Protocol):
+    # bgp_simulation ASes, one per node, each originating prefixes_per_as
+    # prefixes. UPDATEs are only sent when a best path changes and are
+    # rate-limited per session by the MRAI timer.
+    name = "BGP"
+
+    def __init__(self, network, prefixes_per_as=1, mrai=30.0):
+        super().__init__(network)
+        self.mrai = mrai
+        self.ases = {node: AS(f"AS{node}") for node in network.graph}
+        for node, links in network.graph.items():
+            for neighbor in links:
+                self.ases[node].add_neighbor(self.ases[neighbor])
+        self.prefixes = {node: [f"{node}/{k}" for k in range(prefixes_per_as)]
+                         for node in network.graph}
+        self._pending = {}   # (AS name, neighbor name) -> prefix IDs to send
+        self._ready_at = {}  # (AS name, neighbor name) -> MRAI expiry
+
+    def start(self):
+        for node, as_node in self.ases.items():
+            self._queue(as_node, as_node.announce_self(self.prefixes[node]))
+
+    def _queue(self, as_node, prefix_ids, neighbors=None):
+        for neighbor in as_node.neighbors if neighbors is None else neighbors:
+            key = (as_node.name, neighbor.name)
+            queued = self._pending.get(key)
+            if queued is None:
+                self._pending[key] = set(prefix_ids)
+                delay = max(0.0, self._ready_at.get(key, 0.0) - self.sim.now)
+                self.sim.schedule(delay, self._send, as_node, neighbor)
+            else:
+                queued.update(prefix_ids)
+
+    def _send(self, as_node, neighbor):
+        prefix_ids = self._pending.pop((as_node.name, neighbor.name), None)
+        if prefix_ids is None or neighbor not in as_node.neighbors:
+            return
+        announcements, withdrawals = as_node.advertise_to(neighbor, sorted(prefix_ids))
+        if announcements or withdrawals:
+            self._ready_at[(as_node.name, neighbor.name)] = self.sim.now + self.mrai
+            self.send(as_node.name, neighbor.name, self._receive, as_node, neighbor,
+                      announcements, withdrawals)
+
+    def _receive(self, sender, receiver, announcements, withdrawals):
+        if sender not in receiver.neighbors:
+            return
+        changed = receiver.receive_update(sender, announcements, withdrawals)
+        if changed:
+            self.changed()
+            self._queue(receiver, changed)
+
+    def link_changed(self, a, b, up):
+        for as_node, neighbor in ((self.ases[a], self.ases[b]), (self.ases[b], self.ases[a])):
+            if up and neighbor not in as_node.neighbors:
+                # A new session starts with the full Loc-RIB.
+                as_node.add_neighbor(neighbor)
+                self._queue(as_node, [pid for pid, path_id in enumerate(as_node.loc_rib) if path_id],
+                            [neighbor])
+            elif not up and neighbor in as_node.neighbors:
+                changed = as_node.remove_neighbor(neighbor)
+                if changed:
+                    self.changed()
+                    self._queue(as_node, changed)
+
+    def routing_table(self, node):
+        return self.ases[node].routing_table
+
+
+class LinkStateProtocol(Protocol):
+    # Link-state model shared by OSPF and IS-IS. Each router originates an
+    # LSA (its up links, with a sequence number) when one of its links
+    # changes; LSAs are flooded hop by hop and a router installs one only if
+    # it is newer than its copy. A router runs SPF spf_delay seconds after
+    # the first new LSA, so a burst of LSAs costs one SPF, and installs the
+    # resulting routing table then.
+    #
+    # LSA contents are stored once, per origin and sequence number; a
+    # router's LSDB is just the sequence number it holds per origin. With
+    # synchronized=True every router starts with every router's first LSA
+    # (as after the initial database exchange) and runs its first SPF at
+    # time zero, which keeps flooding out of failure experiments.
+    #
+    # A router's first SPF runs in full and its shortest-path tree is kept;
+    # later runs apply only the links that the new LSAs changed, through the
+    # incremental SPF in spf.py. Routers holding the same LSDB share one
+    # graph, which a router edits link by link to update its tree and then
+    # restores. spf_routers limits SPF and routing tables to some routers
+    # (None for all), so large topologies fit in memory; every router still
+    # floods LSAs.
+    def __init__(self, network, name="OSPF", spf_delay=0.05, synchronized=True, spf_routers=None):
+        super().__init__(network)
+        self.name = name
+        self.spf_delay = spf_delay
+        self.lsas = {node: [dict(links)] for node, links in network.graph.items()}
+        self.initial_seq = 0 if synchronized else -1
+        self.known = {node: {} for node in network.graph}  # router -> {origin: seq}
+        self.spf_routers = set(network.graph if spf_routers is None else spf_routers)
+        self.trees = {}  # router -> ShortestPathTree over the router's own LSDB graph
+        self.tables = {}
+        self.spf_runs = 0
+        self._spf_scheduled = set()
+        self._applied = {}  # router -> {origin: seq} its tree was last updated to
+        # LSDB graphs by the frozenset of {origin: seq} items they were built
+        # from, as [graph, number of routers using it].
+        self._graphs = {}
+        self._pending = {router: [] for router in self.spf_routers}  # origins with newer LSAs
+
+    def start(self):
+        for node in self.network.graph:
+            if self.initial_seq < 0:
+                self._install(node, node, 0, None)
+            elif node in self.spf_routers:
+                self._spf_scheduled.add(node)
+                self.sim.schedule(0.0, self._run_spf, node)
+
+    def _originate(self, node):
+        network = self.network
+        links = {neighbor: cost for neighbor, cost in network.graph[node].items()
+                 if network.is_up(node, neighbor)}
+        self.lsas[node].append(links)
+        self._install(node, node, len(self.lsas[node]) - 1, None)
+
+    def _install(self, router, origin, seq, sender):
+        # Stores the LSA, floods it on every other up link and schedules SPF.
+        self.known[router][origin] = seq
+        for neighbor in self.network.neighbors(router):
+            if neighbor != sender:
+                self.send(router, neighbor, self._receive, neighbor, origin, seq, router)
+        if router not in self.spf_routers:
+            return
+        self._pending[router].append(origin)
+        if router not in self._spf_scheduled:
+            self._spf_scheduled.add(router)
+            self.sim.schedule(self.spf_delay, self._run_spf, router)
+
+    def _receive(self, router, origin, seq, sender):
+        if seq > self.known[router].get(origin, self.initial_seq):
+            self._install(router, origin, seq, sender)
+
+    def _lsa(self, origin, seq):
+        return self.lsas[origin][seq] if seq >= 0 else {}
+
+    def _run_spf(self, router):
+        self._spf_scheduled.discard(router)
+        self.spf_runs += 1
+        pending, self._pending[router] = self._pending[router], []
+        tree = self.trees.get(router)
+        if tree is None:
+            key = frozenset(self.known[router].items())
+            entry = self._graphs.get(key)
+            if entry is None:
+                entry = self._graphs[key] = [self.lsdb(router), 0]
+            entry[1] += 1
+            graph = entry[0]
+            tree = self.trees[router] = shortest_path_tree(graph, graph.ids[router])
+            self._applied[router] = dict(self.known[router])
+            self.tables[router] = tree.routing_table()
+            self.changed()
+            return
+
+        # Replays each new LSA as link changes. A link is in the graph only
+        # if both ends list it (the two-way check), so an LSA can add or
+        # remove links in both directions.
+        graph, table = tree.graph, self.tables[router]
+        applied, known = self._applied[router], self.known[router]
+        old_key = frozenset(applied.items())
+        entry = self._graphs[old_key]
+        undo = []  # (a, b, cost before) per link edited in the shared graph
+        previous = {}  # destination -> route before this run
+        for origin in pending:
+            old = self._lsa(origin, applied.get(origin, self.initial_seq))
+            new = self._lsa(origin, known[origin])
+            applied[origin] = known[origin]
+            for neighbor in list(old) + [neighbor for neighbor in new if neighbor not in old]:
+                links = self._lsa(neighbor, applied.get(neighbor, self.initial_seq))
+                two_way = neighbor in new and origin in links
+                for a, b, cost in ((origin, neighbor, new.get(neighbor)),
+                                   (neighbor, origin, links.get(origin))):
+                    cost = cost if two_way else None
+                    old_cost = graph.adjacency[graph.ids[a]].get(graph.ids[b])
+                    if old_cost == cost:
+                        continue
+                    undo.append((a, b, old_cost))
+                    for deltas in change_link(graph, (tree,), a, b, cost).values():
+                        for dest, route in deltas.items():
+                            previous.setdefault(dest, table.get(dest))
+                            if route is None:
+                                del table[dest]
+                            else:
+                                table[dest] = route
+
+        # Moves the router to the graph of its new LSDB, leaving the old one
+        # as it was if other routers still use it.
+        key = frozenset(applied.items())
+        entry[1] -= 1
+        if entry[1]:
+            copy = graph.copy() if key not in self._graphs else None
+            for a, b, cost in reversed(undo):
+                if cost is None:
+                    graph.remove_link(a, b)
+                else:
+                    graph.set_link(a, b, cost)
+        else:
+            del self._graphs[old_key]
+            copy = graph
+        new_entry = self._graphs.setdefault(key, [copy, 0])
+        new_entry[1] += 1
+        tree.graph = new_entry[0]
+        if any(table.get(dest) != route for dest, route in previous.items()):
+            self.changed()
+
+    def link_changed(self, a, b, up):
+        self._originate(a)
+        self._originate(b)
+        if up:
+            # Database exchange on the new adjacency: each side offers every
+            # LSA it holds, so LSAs missed while partitioned get through.
+            for router, neighbor in ((a, b), (b, a)):
+                for origin, seq in list(self.known[router].items()):
+                    self.send(router, neighbor, self._receive, neighbor, origin, seq, router)
+
+    def lsdb(self, router):
+        # The router's view of the topology as a new LinkStateGraph. A link
+        # is only used if both ends list it (the two-way check).
+        known = self.known[router]
+        links = {origin: self._lsa(origin, known.get(origin, self.initial_seq))
+                 for origin in self.lsas}
+        graph = LinkStateGraph()
+        for origin in links:
+            graph.add_node(origin)
+        for origin, neighbors in links.items():
+            for neighbor, cost in neighbors.items():
+                if origin in links[neighbor]:
+                    graph.set_link(origin, neighbor, cost)
+        return graph
+
+    def routing_table(self, node):
+        # The table from the router's last SPF run.
+        return self.tables.get(node, {})
+
+
+def ospf(network, **kwargs):
+    return LinkStateProtocol(network, "OSPF", **kwargs)
+
+def isis(network, **kwargs):
+    return LinkStateProtocol(network, "IS-IS", **kwargs)
+
+
+def converge(protocol):
+    # Runs the protocol from cold start; returns the simulated convergence
+    # time.
+    protocol.start()
+    protocol.sim.run()
+    return protocol.last_change
+
+def measure_failure(protocol, a, b, up=False):
+    # Fails (or restores) link a-b now and runs to quiescence. Returns the
+    # simulated time until routing state stopped changing and the number of
+    # messages it took.
+    sim = protocol.sim
+    start, messages = sim.now, protocol.messages
+    protocol.last_change = start
+    protocol.network.set_link(a, b, up)
+    sim.run()
+    return protocol.last_change - start, protocol.messages - messages
+
+
+# --- Simulation ---
+if __name__ == "__main__":
+    import random
+    import time
+
+    from topologies import isp_graph
+
+    # 1. The OSPF example network under all four protocols; B-D fails at t=10
+    network_graph = {
+        'A': {'B': 1, 'C': 5},
+        'B': {'A': 1, 'C': 2, 'D': 1},
+        'C': {'A': 5, 'B': 2, 'D': 4},
+        'D': {'B': 1, 'C': 4}
+    }
+    for make in (RIPProtocol, lambda net: BGPProtocol(net, mrai=5.0),
+                 lambda net: ospf(net, synchronized=False), lambda net: isis(net, synchronized=False)):
+        sim = Simulator()
+        protocol = make(Network(sim, network_graph, delay=0.01, detect_delay=0.05))
+        cold = converge(protocol)
+        sim.run(until=10.0)
+        failure, messages = measure_failure(protocol, 'B', 'D')
+        print(f"--- {protocol.name}: cold start {cold:.3f} s, B-D failure {failure:.3f} s "
+              f"({messages} messages) ---")
+        print(f"A's table: {dict(sorted(protocol.routing_table('A').items()))}\n")
+
+    # 2. Link failures on a 10k-router ISP-like topology. LSAs flood through
+    # every router; 100 sampled routers run SPF and keep routing tables,
+    # since a tree per router for all 10k would take gigabytes.
+    graph = isp_graph(10000, seed=1)
+    links = [(a, b) for a in graph for b in graph[a] if a < b]
+    rng = random.Random(1)
+    spf_routers = rng.sample(list(graph), 100)
+    for make in (ospf, isis):
+        sim = Simulator()
+        protocol = make(Network(sim, graph, delay=0.005, detect_delay=0.05), spf_routers=spf_routers)
+        start = time.perf_counter()
+        converge(protocol)
+        times = []
+        for a, b in rng.sample(links, 20):
+            times.append(measure_failure(protocol, a, b)[0])
+            sim.run(until=sim.now + 1.0)
+        print(f"{protocol.name}, {len(graph)} routers: 20 link failures, convergence "
+              f"mean {sum(times) / len(times) * 1000:.1f} ms, max {max(times) * 1000:.1f} ms, "
+              f"{protocol.messages} LSA messages, {protocol.spf_runs} SPF runs, "
+              f"{sim.processed} events in {time.perf_counter() - start:.2f} s wall")
+
+    # RIP and BGP keep full per-router tables, so use 1000 routers
+    graph = isp_graph(1000, seed=1)
+    links = [(a, b) for a in graph for b in graph[a] if a < b]
+    for make in (RIPProtocol, lambda net: BGPProtocol(net, mrai=0.0)):
+        sim = Simulator()
+        protocol = make(Network(sim, graph, delay=0.005, detect_delay=0.05))
+        start = time.perf_counter()
+        cold = converge(protocol)
+        times = [measure_failure(protocol, a, b)[0] for a, b in rng.sample(links, 5)]
+        print(f"{protocol.name}, {len(graph)} routers: cold start {cold:.2f} s, 5 link failures, "
+              f"convergence max {max(times) * 1000:.1f} ms, {protocol.messages} messages, "
+              f"{sim.processed} events in {time.perf_counter() - start:.2f} s wall")
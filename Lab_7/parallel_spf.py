@@ -0,0 +1,130 @@
+# parallel_spf.py
+# All-routers SPF spread over a process pool. Every router runs the same
+# Dijkstra over the same LSDB, so sources are independent tasks.
+import multiprocessing
+import os
+import time
+from array import array
+
+from spf import LinkStateGraph, shortest_path_tree
+
+# The LSDB seen by pool workers. With the fork start method the parent sets
+# it before creating the pool and workers inherit it copy-on-write; with
+# spawn it is sent once per worker through the pool initializer.
+_graph = None
+
+
+def _set_graph(graph):
+    global _graph
+    _graph = graph
+
+
+def _solve(sources):
+    # Worker side: returns (source, next-hop row, distance row) per source
+    # as packed arrays, which pickle as flat byte buffers.
+    results = []
+    for source in sources:
+        tree = shortest_path_tree(_graph, source)
+        results.append((source, array('i', tree.next_hop), array('d', tree.dist)))
+    return results
+
+
+class AllPairsRoutes:
+    # Merged result: next_hop[s][d] is the node ID source s forwards to for
+    # destination d (-1 if unreachable) and dist[s][d] its cost. One
+    # 'i' and one 'd' array per source instead of a dict of tuples.
+    def __init__(self, graph, next_hop, dist):
+        self.graph = graph
+        self.next_hop = next_hop
+        self.dist = dist
+
+    def routing_table(self, router):
+        # The {destination: (next hop, cost)} dict the simulations print.
+        names = self.graph.names
+        source = self.graph.ids[router]
+        row, costs = self.next_hop[source], self.dist[source]
+        return {names[dest]: (names[hop], costs[dest])
+                for dest, hop in enumerate(row) if hop != -1}
+
+    def memory_usage(self):
+        return sum(row.itemsize * len(row) for row in self.next_hop + self.dist)
+
+
+def all_routing_tables(graph, workers=None, chunk_size=None, start_method=None):
+    # Runs SPF from every router of graph (a LinkStateGraph or the
+    # {router: {neighbor: cost}} dict) and returns an AllPairsRoutes.
+    if not isinstance(graph, LinkStateGraph):
+        graph = LinkStateGraph.from_dict(graph)
+    workers = workers or os.cpu_count() or 1
+    size = len(graph)
+    # A few chunks per worker balances load without a task per router.
+    chunk_size = chunk_size or max(1, size // (workers * 4))
+    chunks = [range(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+
+    next_hop = [None] * size
+    dist = [None] * size
+    if workers == 1:
+        _set_graph(graph)
+        results = map(_solve, chunks)
+    else:
+        context = multiprocessing.get_context(start_method)
+        if context.get_start_method() == 'fork':
+            _set_graph(graph)
+            pool = context.Pool(workers)
+        else:
+            pool = context.Pool(workers, initializer=_set_graph, initargs=(graph,))
+        results = pool.imap_unordered(_solve, chunks)
+    try:
+        for chunk in results:
+            for source, row, costs in chunk:
+                next_hop[source] = row
+                dist[source] = costs
+    finally:
+        _set_graph(None)
+        if workers > 1:
+            pool.close()
+            pool.join()
+    return AllPairsRoutes(graph, next_hop, dist)
+
+
+def benchmark(graph, worker_counts=None):
+    # Wall time of all_routing_tables for each worker count and the speedup
+    # over one worker.
+    lsdb = LinkStateGraph.from_dict(graph)
+    results = []
+    baseline = None
+    for workers in worker_counts or sorted({1, 2, 4, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        routes = all_routing_tables(lsdb, workers)
+        seconds = time.perf_counter() - start
+        baseline = baseline or seconds
+        results.append({
+            "routers": len(lsdb),
+            "workers": workers,
+            "seconds": seconds,
+            "speedup": baseline / seconds,
+            "result_bytes": routes.memory_usage(),
+        })
+    return results
+
+
+# --- Simulation ---
+if __name__ == "__main__":
+    from ospf_simulation import print_routing_table
+    from topologies import isp_graph
+
+    network_graph = {
+        'A': {'B': 1, 'C': 5},
+        'B': {'A': 1, 'C': 2, 'D': 1},
+        'C': {'A': 5, 'B': 2, 'D': 4},
+        'D': {'B': 1, 'C': 4}
+    }
+    routes = all_routing_tables(network_graph, workers=2)
+    for router in network_graph:
+        print_routing_table(router, {dest: (hop, int(cost))
+                                     for dest, (hop, cost) in routes.routing_table(router).items()})
+
+    print(f"--- All-routers SPF scaling ({os.cpu_count()} CPUs) ---")
+    for row in benchmark(isp_graph(2000)):
+        print(f"{row['routers']} routers, {row['workers']} workers: {row['seconds']:.2f} s "
+              f"(speedup {row['speedup']:.2f}x, results {row['result_bytes'] / 1e6:.1f} MB)")
@@ -1,27 +1,104 @@
 # rip_simulation.py
+from collections import deque
+
+# RIP's "infinity": a route with this many hops is unreachable. It also
+# bounds how long a count-to-infinity loop can run.
+INFINITY = 16
 
 class Router:
-    def __init__(self, name):
+    def __init__(self, name, poisoned_reverse=True):
         self.name = name
         self.routing_table = {name: (name, 0)}  # (next_hop, cost)
         self.neighbors = []
+        # With split horizon alone, routes learned from a neighbor are left
+        # out of updates to it; poisoned reverse sends them at INFINITY.
+        self.poisoned_reverse = poisoned_reverse
+        # Destinations changed since this router last sent a triggered update.
+        self.changed = {name}
+        self.requests = 0
 
     def add_neighbor(self, neighbor):
         self.neighbors.append(neighbor)
         self.routing_table[neighbor.name] = (neighbor.name, 1)
+        self.changed.add(neighbor.name)
+
+    def remove_neighbor(self, neighbor):
+        # Link failure: every route through the neighbor becomes unreachable
+        # and the other neighbors are asked for a replacement.
+        self.neighbors.remove(neighbor)
+        for dest, (next_hop, cost) in list(self.routing_table.items()):
+            if next_hop == neighbor.name and cost < INFINITY:
+                self.routing_table[dest] = (next_hop, INFINITY)
+                self.changed.add(dest)
+                self.request_route(dest)
+
+    def advertised_cost(self, dest, neighbor):
+        # Cost of dest as advertised to neighbor, or None to leave it out.
+        next_hop, cost = self.routing_table.get(dest, (None, INFINITY))
+        if next_hop == neighbor.name and dest != self.name:
+            return INFINITY if self.poisoned_reverse else None
+        return cost
 
-    def update_table(self):
+    def advertise(self, neighbor):
+        # Triggered update: only the entries changed since the last one.
+        entries = {}
+        for dest in self.changed:
+            cost = self.advertised_cost(dest, neighbor)
+            if cost is not None:
+                entries[dest] = cost
+        return entries
+
+    def receive(self, neighbor, entries):
+        # Distance-vector update from one neighbor. Returns True if the
+        # routing table changed.
         updated = False
-        for neighbor in self.neighbors:
-            for dest, (neighbor_next_hop, neighbor_cost) in neighbor.routing_table.items():
-                new_cost = neighbor_cost + 1
-                
-                if dest not in self.routing_table or new_cost < self.routing_table[dest][1]:
-                    # Update routing table
-                    self.routing_table[dest] = (neighbor.name, new_cost)
-                    updated = True
+        for dest, neighbor_cost in entries.items():
+            new_cost = min(neighbor_cost + 1, INFINITY)
+            current = self.routing_table.get(dest)
+            if current is None:
+                if new_cost == INFINITY:
+                    continue
+            elif current[0] == neighbor.name:
+                # News from the current next hop is always taken, even if worse.
+                if new_cost == current[1]:
+                    continue
+            elif new_cost >= current[1]:
+                continue
+
+            self.routing_table[dest] = (neighbor.name, new_cost)
+            self.changed.add(dest)
+            updated = True
+            if current is not None and new_cost > current[1]:
+                self.request_route(dest)
         return updated
 
+    def request_route(self, dest):
+        # RIP request for one entry: after a route got worse, ask the other
+        # neighbors whether they have something better.
+        next_hop = self.routing_table[dest][0]
+        for neighbor in self.neighbors:
+            if neighbor.name == next_hop:
+                continue
+            self.requests += 1
+            self.send_request(neighbor, dest)
+
+    def send_request(self, neighbor, dest):
+        # Asks neighbor directly; des.py sends the request and the response
+        # as network messages instead.
+        self.receive_response(neighbor, dest, neighbor.advertised_cost(dest, self))
+
+    def receive_response(self, neighbor, dest, neighbor_cost):
+        # A neighbor's answer to a request. Returns True if it replaced the
+        # route.
+        if neighbor_cost is None or neighbor not in self.neighbors:
+            return False
+        new_cost = min(neighbor_cost + 1, INFINITY)
+        if new_cost >= self.routing_table[dest][1]:
+            return False
+        self.routing_table[dest] = (neighbor.name, new_cost)
+        self.changed.add(dest)
+        return True
+
     def print_table(self):
         print(f"--- Routing Table for {self.name} ---")
         print("Dest | Next Hop | Cost")
@@ -31,6 +108,36 @@ class Router:
         print("\n")
 
 
+def converge(routers):
+    # Runs triggered updates until no router has anything left to send.
+    # Only routers with changed entries are on the worklist, and they only
+    # send those entries, so the work follows the number of changes.
+    worklist = deque(router for router in routers if router.changed)
+    queued = set(router.name for router in worklist)
+    requests_before = sum(router.requests for router in routers)
+    updates = entries_sent = 0
+
+    while worklist:
+        router = worklist.popleft()
+        queued.discard(router.name)
+        for neighbor in router.neighbors:
+            entries = router.advertise(neighbor)
+            if not entries:
+                continue
+            updates += 1
+            entries_sent += len(entries)
+            if neighbor.receive(router, entries) and neighbor.name not in queued:
+                worklist.append(neighbor)
+                queued.add(neighbor.name)
+        router.changed.clear()
+
+    return {
+        "updates": updates,
+        "entries": entries_sent,
+        "requests": sum(router.requests for router in routers) - requests_before,
+    }
+
+
 # --- Simulation ---
 if __name__ == "__main__":
     # 1. Create network topology
@@ -41,39 +148,34 @@ if __name__ == "__main__":
 
     rA.add_neighbor(rB)
     rA.add_neighbor(rC)
-    
+
     rB.add_neighbor(rA)
     rB.add_neighbor(rC)
     rB.add_neighbor(rD)
-    
+
     rC.add_neighbor(rA)
     rC.add_neighbor(rB)
     rC.add_neighbor(rD)
-    
+
     rD.add_neighbor(rB)
     rD.add_neighbor(rC)
 
     routers = [rA, rB, rC, rD]
 
-    # 2. Simulate periodic updates until convergence
-    converged = False
-    iteration = 0
-    while not converged:
-        iteration += 1
-        print(f"--- Iteration {iteration} ---")
-        updates_made = False
-        for router in routers:
-            if router.update_table():
-                updates_made = True
-        
-        if not updates_made:
-            converged = True
-        
-        if iteration > len(routers): # Simple convergence check
-            converged = True
-    
-    print("\n--- CONVERGENCE REACHED ---\n")
+    # 2. Exchange triggered updates until no router has changes to send
+    stats = converge(routers)
+    print(f"--- CONVERGENCE REACHED after {stats['updates']} updates "
+          f"({stats['entries']} entries) ---\n")
 
     # 3. Display final routing tables
     for router in routers:
+        router.print_table()
+
+    # 4. The B-D link fails; only the affected routes are re-advertised
+    rB.remove_neighbor(rD)
+    rD.remove_neighbor(rB)
+    stats = converge(routers)
+    print(f"--- B-D link down: reconverged after {stats['updates']} updates "
+          f"({stats['entries']} entries, {stats['requests']} requests) ---\n")
+    for router in (rB, rD):
         router.print_table()
\ No newline at end of file
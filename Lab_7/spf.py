@@ -0,0 +1,378 @@
+# spf.py
+# Shortest path first engine shared by the OSPF and IS-IS simulations.
+import heapq
+from collections.abc import Mapping
+
+NO_NODE = -1
+
+
+class LinkStateGraph:
+    # The LSDB as integer node IDs. adjacency[u] maps neighbor ID -> cost,
+    # names[u] is the router name and ids maps a name back to its ID.
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+        self.adjacency = []
+        # incoming[v] maps u -> cost for every link u -> v, for iSPF.
+        self.incoming = []
+
+    @classmethod
+    def from_dict(cls, graph):
+        # graph: {router: {neighbor: cost}}, as in the simulations.
+        lsdb = cls()
+        for node in graph:
+            lsdb.add_node(node)
+        for node, links in graph.items():
+            for neighbor, cost in links.items():
+                lsdb.set_link(node, neighbor, cost)
+        return lsdb
+
+    def __len__(self):
+        return len(self.names)
+
+    def add_node(self, name):
+        node_id = self.ids.get(name)
+        if node_id is None:
+            node_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.adjacency.append({})
+            self.incoming.append({})
+        return node_id
+
+    def set_link(self, node, neighbor, cost):
+        # Adds or re-costs the directed link node -> neighbor and returns
+        # its previous cost (None if it is new).
+        u, v = self.add_node(node), self.add_node(neighbor)
+        old_cost = self.adjacency[u].get(v)
+        self.adjacency[u][v] = cost
+        self.incoming[v][u] = cost
+        return old_cost
+
+    def remove_link(self, node, neighbor):
+        # Removes node -> neighbor and returns the cost it had.
+        u, v = self.ids[node], self.ids[neighbor]
+        del self.incoming[v][u]
+        return self.adjacency[u].pop(v)
+
+    def copy(self):
+        # An independent graph with the same node IDs.
+        lsdb = LinkStateGraph()
+        lsdb.names = list(self.names)
+        lsdb.ids = dict(self.ids)
+        lsdb.adjacency = [dict(links) for links in self.adjacency]
+        lsdb.incoming = [dict(links) for links in self.incoming]
+        return lsdb
+
+    def to_dict(self):
+        names = self.names
+        return {names[u]: {names[v]: cost for v, cost in links.items()}
+                for u, links in enumerate(self.adjacency)}
+
+
+class ShortestPathTree(Mapping):
+    # Result of one SPF run. dist, pred and next_hop are lists indexed by
+    # node ID (inf / NO_NODE where unreachable); paths are only built when
+    # asked for. As a mapping it reads like the old shortest_path_tree
+    # dict: name -> (cost, path of names).
+    def __init__(self, graph, source, dist, pred, next_hop):
+        self.graph = graph
+        self.source = source
+        self.dist = dist
+        self.pred = pred
+        self.next_hop = next_hop
+        # children[u] is the set of nodes whose predecessor is u. Only built
+        # once the tree is updated incrementally.
+        self.children = None
+
+    def path_to(self, node):
+        # Node IDs from the source to node, or [] if node is unreachable.
+        if self.dist[node] == float('inf'):
+            return []
+        path = [node]
+        while node != self.source:
+            node = self.pred[node]
+            path.append(node)
+        path.reverse()
+        return path
+
+    def __getitem__(self, name):
+        node = self.graph.ids[name]
+        if self.dist[node] == float('inf'):
+            raise KeyError(name)
+        names = self.graph.names
+        return self.dist[node], [names[hop] for hop in self.path_to(node)]
+
+    def _reached(self):
+        inf = float('inf')
+        return (node for node, cost in enumerate(self.dist) if cost != inf)
+
+    def __iter__(self):
+        names = self.graph.names
+        return (names[node] for node in self._reached())
+
+    def __len__(self):
+        return sum(1 for _ in self._reached())
+
+    def routing_table(self):
+        # {destination: (next hop, cost)} by name, the source mapping to itself.
+        names = self.graph.names
+        table = {}
+        for node in self._reached():
+            hop = self.next_hop[node]
+            table[names[node]] = (names[hop], self.dist[node])
+        return table
+
+    def _build_children(self):
+        self.children = [set() for _ in self.dist]
+        for node, parent in enumerate(self.pred):
+            if parent != NO_NODE:
+                self.children[parent].add(node)
+
+    def _set_pred(self, node, parent):
+        old = self.pred[node]
+        if old != NO_NODE:
+            self.children[old].discard(node)
+        self.pred[node] = parent
+        if parent != NO_NODE:
+            self.children[parent].add(node)
+
+    def link_changed(self, node, neighbor, old_cost):
+        # Incremental SPF after the graph's link node -> neighbor (IDs) was
+        # added, removed or re-costed; old_cost is None for a new link.
+        # Only nodes whose distance can change are touched: the subtree below
+        # neighbor on an increase, the nodes the cheaper link improves on a
+        # decrease. Returns the routing-table deltas as
+        # {destination: (next hop, cost) or None if now unreachable}.
+        if self.children is None:
+            self._build_children()
+        while len(self.dist) < len(self.graph):
+            # Nodes added to the graph since the tree was built.
+            self.dist.append(float('inf'))
+            self.pred.append(NO_NODE)
+            self.next_hop.append(NO_NODE)
+            self.children.append(set())
+
+        inf = float('inf')
+        new_cost = self.graph.adjacency[node].get(neighbor, inf)
+        old_cost = inf if old_cost is None else old_cost
+        if new_cost < old_cost:
+            changed = self._decrease(node, neighbor, new_cost)
+        elif new_cost > old_cost and self.pred[neighbor] == node:
+            changed = self._increase(neighbor)
+        else:
+            return {}
+
+        names = self.graph.names
+        deltas = {}
+        for dest, (old_hop, old_dist) in changed.items():
+            dist = self.dist[dest]
+            if dist == inf:
+                if old_dist != inf:
+                    deltas[names[dest]] = None
+            elif (self.next_hop[dest], dist) != (old_hop, old_dist):
+                deltas[names[dest]] = (names[self.next_hop[dest]], dist)
+        return deltas
+
+    def _decrease(self, node, neighbor, cost):
+        # Dijkstra seeded at neighbor that only follows strict improvements.
+        if self.dist[node] + cost >= self.dist[neighbor]:
+            return {}
+        dist, next_hop, adjacency = self.dist, self.next_hop, self.graph.adjacency
+        changed = {}
+        heap = [(dist[node] + cost, neighbor, node)]
+        while heap:
+            new_dist, target, parent = heapq.heappop(heap)
+            if new_dist >= dist[target]:
+                continue
+            changed.setdefault(target, (next_hop[target], dist[target]))
+            dist[target] = new_dist
+            self._set_pred(target, parent)
+            next_hop[target] = target if parent == self.source else next_hop[parent]
+            for onward, weight in adjacency[target].items():
+                if new_dist + weight < dist[onward]:
+                    heapq.heappush(heap, (new_dist + weight, onward, target))
+        return changed
+
+    def _increase(self, root):
+        # Detaches the subtree below root and re-attaches each node through
+        # its cheapest in-link from outside the subtree, then runs Dijkstra
+        # over the subtree alone. Nodes outside it cannot get cheaper.
+        dist, next_hop = self.dist, self.next_hop
+        affected = [root]
+        for node in affected:
+            affected.extend(self.children[node])
+        changed = {node: (next_hop[node], dist[node]) for node in affected}
+
+        inf = float('inf')
+        for node in affected:
+            dist[node] = inf
+            next_hop[node] = NO_NODE
+            self._set_pred(node, NO_NODE)
+
+        heap = []
+        for node in affected:
+            best, best_parent = inf, NO_NODE
+            for parent, weight in self.graph.incoming[node].items():
+                if dist[parent] + weight < best:
+                    best, best_parent = dist[parent] + weight, parent
+            if best_parent != NO_NODE:
+                heap.append((best, node, best_parent))
+        heapq.heapify(heap)
+
+        adjacency = self.graph.adjacency
+        while heap:
+            new_dist, target, parent = heapq.heappop(heap)
+            if new_dist >= dist[target]:
+                continue
+            dist[target] = new_dist
+            self._set_pred(target, parent)
+            next_hop[target] = target if parent == self.source else next_hop[parent]
+            for onward, weight in adjacency[target].items():
+                if onward in changed and new_dist + weight < dist[onward]:
+                    heapq.heappush(heap, (new_dist + weight, onward, target))
+        return changed
+
+
+def shortest_path_tree(graph, source):
+    # Dijkstra from node ID source over a LinkStateGraph. The heap holds
+    # (cost, node) pairs only; the tree lives in the pred array.
+    size = len(graph)
+    inf = float('inf')
+    dist = [inf] * size
+    pred = [NO_NODE] * size
+    next_hop = [NO_NODE] * size
+    done = bytearray(size)
+    adjacency = graph.adjacency
+    heappush, heappop = heapq.heappush, heapq.heappop
+
+    dist[source] = 0
+    next_hop[source] = source
+    heap = [(0, source)]
+    while heap:
+        cost, node = heappop(heap)
+        if done[node]:
+            continue
+        done[node] = 1
+        # Neighbors of the source are their own next hop; everything further
+        # away inherits the next hop of its predecessor.
+        hop = next_hop[node]
+        for neighbor, weight in adjacency[node].items():
+            new_cost = cost + weight
+            if new_cost < dist[neighbor]:
+                dist[neighbor] = new_cost
+                pred[neighbor] = node
+                next_hop[neighbor] = neighbor if node == source else hop
+                heappush(heap, (new_cost, neighbor))
+
+    return ShortestPathTree(graph, source, dist, pred, next_hop)
+
+
+def calculate_dijkstra(graph, start_node):
+    # Compatibility entry point for the simulations. graph is either the
+    # {router: {neighbor: cost}} dict or a LinkStateGraph (build one once
+    # when computing many routers' tables). Returns the tree and the
+    # {destination: (next hop, cost)} routing table.
+    if not isinstance(graph, LinkStateGraph):
+        graph = LinkStateGraph.from_dict(graph)
+    tree = shortest_path_tree(graph, graph.ids[start_node])
+    return tree, tree.routing_table()
+
+
+def change_link(graph, trees, node, neighbor, cost):
+    # Applies one link event to the LSDB and updates every tree in trees
+    # incrementally. cost=None removes the link. Returns
+    # {source name: routing-table deltas} for the trees that changed.
+    if cost is None:
+        old_cost = graph.remove_link(node, neighbor)
+    else:
+        old_cost = graph.set_link(node, neighbor, cost)
+    u, v = graph.ids[node], graph.ids[neighbor]
+    deltas = {}
+    for tree in trees:
+        tree_deltas = tree.link_changed(u, v, old_cost)
+        if tree_deltas:
+            deltas[graph.names[tree.source]] = tree_deltas
+    return deltas
+
+
+def benchmark_incremental(graph, sources=10, changes=50, seed=0):
+    # Applies random link events (cost up, cost down, removal, new link) to
+    # graph, a {node: {neighbor: cost}} dict, and times change_link on the
+    # trees of `sources` routers against rerunning SPF from scratch.
+    # Both directions of a link change together, as after an LSA flood.
+    import random
+    import time
+
+    rng = random.Random(seed)
+    lsdb = LinkStateGraph.from_dict(graph)
+    nodes = list(graph)
+    trees = [shortest_path_tree(lsdb, lsdb.ids[node]) for node in rng.sample(nodes, sources)]
+    incremental_time = full_time = 0.0
+    routes_changed = 0
+
+    for _ in range(changes):
+        a = rng.choice(nodes)
+        links = lsdb.adjacency[lsdb.ids[a]]
+        kind = rng.choice(('up', 'down', 'remove', 'add')) if links else 'add'
+        if kind == 'add':
+            b, cost = rng.choice(nodes), rng.randint(1, 10)
+            if b == a:
+                continue
+        else:
+            b = lsdb.names[rng.choice(list(links))]
+            old = links[lsdb.ids[b]]
+            cost = {'up': old * 2 + 1, 'down': max(1, old // 2), 'remove': None}[kind]
+
+        start = time.perf_counter()
+        for u, v in ((a, b), (b, a)):
+            for deltas in change_link(lsdb, trees, u, v, cost).values():
+                routes_changed += len(deltas)
+        incremental_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        fresh = [shortest_path_tree(lsdb, tree.source) for tree in trees]
+        full_time += time.perf_counter() - start
+        for tree, expected in zip(trees, fresh):
+            if tree.dist != expected.dist:
+                raise AssertionError("incremental SPF disagrees with a full run")
+
+    return {
+        "nodes": len(lsdb),
+        "links": sum(len(links) for links in lsdb.adjacency),
+        "trees": sources,
+        "changes": changes,
+        "routes_changed": routes_changed,
+        "incremental_seconds": incremental_time,
+        "full_seconds": full_time,
+        "speedup": full_time / incremental_time if incremental_time else float('inf'),
+    }
+
+
+# --- Simulation ---
+if __name__ == "__main__":
+    from topologies import isp_graph, random_graph
+
+    # The OSPF example network; B-D fails, then C-D gets cheaper
+    network_graph = {
+        'A': {'B': 1, 'C': 5},
+        'B': {'A': 1, 'C': 2, 'D': 1},
+        'C': {'A': 5, 'B': 2, 'D': 4},
+        'D': {'B': 1, 'C': 4}
+    }
+    lsdb = LinkStateGraph.from_dict(network_graph)
+    trees = [shortest_path_tree(lsdb, lsdb.ids[router]) for router in network_graph]
+    for event, (a, b, cost) in (("B-D down", ('B', 'D', None)), ("C-D cost 1", ('C', 'D', 1))):
+        deltas = change_link(lsdb, trees, a, b, cost)
+        for source, changes in change_link(lsdb, trees, b, a, cost).items():
+            deltas.setdefault(source, {}).update(changes)
+        print(f"--- {event} ---")
+        for source, changes in sorted(deltas.items()):
+            print(f" {source}: {changes}")
+        print()
+
+    print("--- Incremental vs full SPF ---")
+    for name, graph in (("random", random_graph(10000)), ("ISP-like", isp_graph(10000))):
+        result = benchmark_incremental(graph)
+        print(f"{name}: {result['nodes']} nodes, {result['changes']} link events on "
+              f"{result['trees']} trees: iSPF {result['incremental_seconds']:.3f} s, "
+              f"full {result['full_seconds']:.3f} s ({result['speedup']:.0f}x)")
@@ -0,0 +1,172 @@
+# topologies.py
+# Synthetic router topologies for the Lab_7 simulations. Every generator
+# returns {node: {neighbor: cost}} with integer node names and symmetric
+# links, the same shape as the hand-written network_graph dicts.
+import math
+import random
+
+
+def _link(graph, a, b, cost):
+    graph[a][b] = cost
+    graph[b][a] = cost
+
+
+def random_graph(n, average_degree=4, max_cost=10, seed=0):
+    # Connected random graph: a random spanning tree (each node attaches to
+    # an earlier one) plus random extra links up to the average degree.
+    rng = random.Random(seed)
+    graph = {node: {} for node in range(n)}
+    for node in range(1, n):
+        _link(graph, node, rng.randrange(node), rng.randint(1, max_cost))
+    extra = max(0, n * average_degree // 2 - (n - 1))
+    # A complete graph has no room for more links.
+    extra = min(extra, n * (n - 1) // 2 - (n - 1))
+    while extra > 0 and n > 1:
+        a, b = rng.randrange(n), rng.randrange(n)
+        if a != b and b not in graph[a]:
+            _link(graph, a, b, rng.randint(1, max_cost))
+            extra -= 1
+    return graph
+
+
+def isp_graph(n, seed=0):
+    # Three-tier ISP-like topology. About 1% of the routers form a core
+    # ring with chords, 10% are aggregation routers dual-homed to the core
+    # and the rest are access routers dual-homed to aggregation routers.
+    # Link costs grow towards the edge, as with bandwidth-based metrics.
+    rng = random.Random(seed)
+    graph = {node: {} for node in range(n)}
+    core = list(range(min(n, max(4, n // 100))))
+    aggregation = list(range(len(core), min(n, len(core) + max(4, n // 10))))
+    access = range(len(core) + len(aggregation), n)
+
+    for index, node in enumerate(core):
+        if len(core) > 1:
+            _link(graph, node, core[(index + 1) % len(core)], 1)
+        if len(core) > 3:
+            # Two chords per core router keep the core diameter small.
+            for _ in range(2):
+                other = rng.choice(core)
+                if other != node:
+                    _link(graph, node, other, rng.randint(1, 3))
+    for node in aggregation:
+        for upstream in rng.sample(core, min(2, len(core))):
+            _link(graph, node, upstream, rng.randint(5, 10))
+    for node in access:
+        for upstream in rng.sample(aggregation, min(2, len(aggregation))):
+            _link(graph, node, upstream, rng.randint(20, 50))
+    return graph
+
+
+def waxman_graph(n, average_degree=4, alpha=0.4, max_cost=10, seed=0):
+    # Waxman graph: routers at random points in the unit square, each pair
+    # linked with probability alpha * exp(-d / scale). The classic
+    # scale = beta * L makes the degree grow with n; here scale shrinks with
+    # n so the average degree stays near average_degree. Pairs more than
+    # 4 * scale apart (under 2% link chance) are never tried, so only
+    # neighboring grid cells are searched. Link cost grows with distance.
+    # Routers left in small components are linked to the nearest router
+    # outside their component.
+    rng = random.Random(seed)
+    graph = {node: {} for node in range(n)}
+    if n < 2:
+        return graph
+    # Expected degree is n * alpha * 2 pi scale^2 * (1 - 5 e^-4) with the cutoff.
+    scale = math.sqrt(average_degree / (2 * math.pi * n * alpha * (1 - 5 * math.exp(-4))))
+    cutoff = 4 * scale
+    side = max(1, int(1 / cutoff))
+    points = [(rng.random(), rng.random()) for _ in range(n)]
+    cells = {}
+    for node, (x, y) in enumerate(points):
+        cells.setdefault((min(int(x * side), side - 1), min(int(y * side), side - 1)), []).append(node)
+
+    def cost_of(a, b):
+        return min(max_cost, 1 + int(max_cost * math.dist(points[a], points[b]) / cutoff))
+
+    for (cx, cy), members in cells.items():
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for a in members:
+                    for b in cells.get((cx + dx, cy + dy), ()):
+                        if a < b:
+                            d = math.dist(points[a], points[b])
+                            if d < cutoff and rng.random() < alpha * math.exp(-d / scale):
+                                _link(graph, a, b, cost_of(a, b))
+
+    # Union-find over the links, then join the smaller components.
+    parent = list(range(n))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for a, links in graph.items():
+        for b in links:
+            parent[find(a)] = find(b)
+    components = {}
+    for node in range(n):
+        components.setdefault(find(node), []).append(node)
+    for members in sorted(components.values(), key=len):
+        a = members[0]
+        x, y = points[a]
+        cx, cy = min(int(x * side), side - 1), min(int(y * side), side - 1)
+        best = None
+        # Search rings of cells outwards; one ring past the first hit is
+        # enough to find the nearest router.
+        for ring in range(side + 1):
+            for gx in range(cx - ring, cx + ring + 1):
+                for gy in range(cy - ring, cy + ring + 1):
+                    if max(abs(gx - cx), abs(gy - cy)) != ring:
+                        continue
+                    for b in cells.get((gx, gy), ()):
+                        if find(b) != find(a):
+                            d = math.dist(points[a], points[b])
+                            if best is None or d < best[0]:
+                                best = (d, b)
+            if best is not None and best[0] < ring / side:
+                break
+        if best is None:
+            break  # a is already connected to everything
+        _link(graph, a, best[1], cost_of(a, best[1]))
+        parent[find(a)] = find(best[1])
+    return graph
+
+
+def barabasi_albert_graph(n, m=2, max_cost=10, seed=0):
+    # Barabasi-Albert preferential attachment: each new router links to m
+    # distinct earlier routers picked with probability proportional to
+    # their degree, which gives the heavy-tailed degrees of AS-level maps.
+    rng = random.Random(seed)
+    graph = {node: {} for node in range(n)}
+    # Every link end once, so a uniform pick is a degree-weighted pick.
+    ends = []
+    seed_size = min(n, m + 1)
+    for a in range(seed_size):
+        for b in range(a):
+            _link(graph, a, b, rng.randint(1, max_cost))
+            ends += (a, b)
+    for node in range(seed_size, n):
+        targets = set()
+        while len(targets) < m:
+            targets.add(rng.choice(ends))
+        for other in targets:
+            _link(graph, node, other, rng.randint(1, max_cost))
+            ends += (node, other)
+    return graph
+
+
+def grid_graph(n, max_cost=10, seed=0):
+    # Mesh of n routers laid out row by row, ceil(sqrt(n)) per row, each
+    # linked to its right and lower neighbor. Its long diameter and many
+    # equal-length paths are hard on distance-vector protocols.
+    rng = random.Random(seed)
+    graph = {node: {} for node in range(n)}
+    width = math.isqrt(n - 1) + 1 if n > 1 else 1
+    for node in range(n):
+        if (node + 1) % width and node + 1 < n:
+            _link(graph, node, node + 1, rng.randint(1, max_cost))
+        if node + width < n:
+            _link(graph, node, node + width, rng.randint(1, max_cost))
+    return graph